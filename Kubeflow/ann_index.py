@@ -0,0 +1,116 @@
+"""Query the approximate nearest-neighbor index built by `build_ann_index`.
+
+The index is an inverted file (IVF) over the training vectors: the vectors
+are stored grouped by their nearest k-means centroid, and a query scans
+only the lists of its `nprobe` nearest centroids. Raising `nprobe` trades
+queries per second for recall, `nprobe` equal to the number of lists is an
+exact search. The arrays are memory-mapped, so loading the index is
+immediate and only the scanned lists are read from disk.
+
+    index = IVFIndex.load(ann_index_path)
+    labels = index.predict(X, k=5, nprobe=4)
+"""
+import json
+import os
+
+import numpy as np
+
+
+class IVFIndex:
+
+    def __init__(self, centroids, offsets, vectors, sq_norms, labels, ids, columns, classes, nprobe):
+        self.centroids = centroids
+        self.offsets = offsets
+        self.vectors = vectors
+        self.sq_norms = sq_norms
+        self.labels = labels
+        self.ids = ids
+        self.columns = columns
+        self.classes = np.asarray(classes)
+        self.nprobe = nprobe
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        with open(os.path.join(path, 'index.json')) as f:
+            meta = json.load(f)
+        if meta['format'] != 'ivf-flat' or meta['version'] != 1:
+            raise ValueError(f"Unsupported index format {meta['format']} version {meta['version']}.")
+        arrays = {name: np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r' if mmap else None) for name in ['centroids', 'offsets', 'vectors', 'sq_norms', 'labels', 'ids']}
+        # The centroids and offsets are read by every query
+        arrays['centroids'] = np.array(arrays['centroids'])
+        arrays['offsets'] = np.array(arrays['offsets'])
+        return cls(columns=meta['columns'], classes=meta['classes'], nprobe=meta['nprobe'], **arrays)
+
+    @property
+    def n_lists(self):
+        return len(self.centroids)
+
+    def _queries(self, X):
+        if hasattr(X, 'columns'):
+            if list(X.columns) != self.columns:
+                raise ValueError(f'Expected the columns {self.columns}, got {list(X.columns)}.')
+            X = X.to_numpy()
+        return np.ascontiguousarray(X, dtype=np.float32)
+
+    def _search(self, Q, k, nprobe):
+        q_norms = np.einsum('ij,ij->i', Q, Q)
+        to_centroids = q_norms[:, None] - 2 * Q @ self.centroids.T + np.einsum('ij,ij->i', self.centroids, self.centroids)
+        probes = np.argpartition(to_centroids, nprobe - 1, axis=1)[:, :nprobe].ravel()
+        # The (query, list) pairs sorted by list give the queries probing
+        #  every list
+        order = np.argsort(probes, kind='stable')
+        queries = order // nprobe
+        bounds = np.searchsorted(probes[order], np.arange(self.n_lists + 1))
+
+        best = np.full((len(Q), k), np.inf, dtype=np.float32)
+        positions = np.full((len(Q), k), -1, dtype=np.int64)
+        # The lists are scanned one at a time for all the queries probing
+        #  them, and merged into the running top k of those queries
+        for list_id in np.flatnonzero(np.diff(bounds)):
+            start, stop = self.offsets[list_id], self.offsets[list_id + 1]
+            if start == stop:
+                continue
+            rows = queries[bounds[list_id]:bounds[list_id + 1]]
+            distances = q_norms[rows, None] - 2 * Q[rows] @ self.vectors[start:stop].T + self.sq_norms[start:stop]
+            candidates = np.concatenate([best[rows], distances], axis=1)
+            candidate_positions = np.concatenate([positions[rows], np.broadcast_to(np.arange(start, stop), distances.shape)], axis=1)
+            if candidates.shape[1] > k:
+                keep = np.argpartition(candidates, k - 1, axis=1)[:, :k]
+                candidates = np.take_along_axis(candidates, keep, axis=1)
+                candidate_positions = np.take_along_axis(candidate_positions, keep, axis=1)
+            best[rows] = candidates
+            positions[rows] = candidate_positions
+
+        order = np.argsort(best, axis=1, kind='stable')
+        return np.take_along_axis(best, order, axis=1), np.take_along_axis(positions, order, axis=1)
+
+    def search(self, X, k, nprobe=None, batch_size=1024):
+        """Return the distances and training row ids of the k nearest neighbors.
+
+        Rows with fewer than k vectors in their probed lists are padded with
+        an infinite distance and the id -1.
+        """
+        nprobe = min(nprobe or self.nprobe, self.n_lists)
+        Q = self._queries(X)
+        distances = np.empty((len(Q), k), dtype=np.float32)
+        ids = np.empty((len(Q), k), dtype=np.int64)
+        for start in range(0, len(Q), batch_size):
+            batch_distances, positions = self._search(Q[start:start + batch_size], k, nprobe)
+            distances[start:start + batch_size] = np.sqrt(np.maximum(batch_distances, 0))
+            ids[start:start + batch_size] = np.where(positions >= 0, self.ids[np.maximum(positions, 0)], -1)
+        return distances, ids
+
+    def predict(self, X, k, nprobe=None, batch_size=1024):
+        """Majority vote of the labels of the approximate k nearest neighbors."""
+        nprobe = min(nprobe or self.nprobe, self.n_lists)
+        Q = self._queries(X)
+        predictions = np.empty(len(Q), dtype=self.classes.dtype)
+        for start in range(0, len(Q), batch_size):
+            _, positions = self._search(Q[start:start + batch_size], k, nprobe)
+            votes = np.zeros((len(positions), len(self.classes)), dtype=np.int64)
+            rows = np.arange(len(positions))
+            for column in positions.T:
+                found = column >= 0
+                votes[rows[found], self.labels[column[found]]] += 1
+            predictions[start:start + batch_size] = self.classes[votes.argmax(axis=1)]
+        return predictions
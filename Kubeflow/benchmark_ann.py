@@ -0,0 +1,82 @@
+"""Benchmark the IVF index of `build_ann_index` against exact KNN.
+
+A normalized dataset of Gaussian clusters is generated and written as
+Arrow IPC, like `normalize_dataset` does, and the index is built by the
+component function on its training split. The test split is queried with
+`KNeighborsClassifier.kneighbors`, which is exact, and with the index for
+every `--nprobe`. The recall@k is the fraction of the exact k nearest
+neighbors the index finds, the agreement is the fraction of identical
+predicted labels.
+
+    python benchmark_ann.py --rows 200000 --dims 16 --k 5 --nprobe 1 --nprobe 4 --nprobe 16
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+from kfp.dsl import Dataset, Model
+from sklearn.model_selection import train_test_split
+from sklearn.neighbors import KNeighborsClassifier
+
+from ann_index import IVFIndex
+from pipeline import build_ann_index
+
+
+def make_dataset(path, rows, dims, clusters=50, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(scale=3, size=(clusters, dims))
+    cluster = rng.integers(0, clusters, rows)
+    df = pd.DataFrame(centers[cluster] + rng.normal(size=(rows, dims)), columns=[f'feature_{i}' for i in range(dims)])
+    df['Labels'] = np.array(['Iris-setosa', 'Iris-versicolor', 'Iris-virginica'])[cluster % 3]
+    feather.write_feather(pa.Table.from_pandas(df, preserve_index=False), path, compression='uncompressed')
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def benchmark(rows, dims, k, nprobes, workdir):
+    path = os.path.join(workdir, f'data_{rows}_{dims}.arrow')
+    make_dataset(path, rows, dims)
+    index_path = os.path.join(workdir, f'index_{rows}_{dims}')
+    _, build_s = timed(build_ann_index.python_func, normalized_iris_dataset=Dataset(uri=path), ann_index=Model(uri=index_path))
+
+    df = feather.read_table(path).to_pandas()
+    y = df.pop('Labels')
+    X_train, X_test, y_train, y_test = train_test_split(df, y, random_state=0)
+    clf = KNeighborsClassifier(n_neighbors=k)
+    _, fit_s = timed(clf.fit, X_train, y_train)
+    exact, exact_s = timed(clf.kneighbors, X_test, return_distance=False)
+    exact_labels = clf.predict(X_test)
+
+    index = IVFIndex.load(index_path)
+    results = [{'method': 'exact', 'nprobe': None, 'build_s': round(fit_s, 3), 'qps': round(len(X_test) / exact_s), 'recall_at_k': 1.0, 'agreement': 1.0}]
+    for nprobe in nprobes:
+        (_, ids), search_s = timed(index.search, X_test, k, nprobe=nprobe)
+        recall = np.mean([len(np.intersect1d(found, expected)) / k for found, expected in zip(ids, exact)])
+        agreement = np.mean(index.predict(X_test, k, nprobe=nprobe) == exact_labels)
+        results.append({'method': 'ivf', 'nprobe': min(nprobe, index.n_lists), 'build_s': round(build_s, 3), 'qps': round(len(X_test) / search_s), 'recall_at_k': round(recall, 4), 'agreement': round(agreement, 4)})
+    for result in results:
+        result.update({'rows': rows, 'dims': dims, 'n_lists': index.n_lists})
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the IVF index against exact KNN.')
+    parser.add_argument('--rows', type=int, default=200_000, help='Dataset rows, a quarter are queries (default: 200000).')
+    parser.add_argument('--dims', type=int, action='append', help='Feature dimensions, can be repeated (default: 4 and 16).')
+    parser.add_argument('--k', type=int, default=5, help='Neighbors per query (default: 5).')
+    parser.add_argument('--nprobe', type=int, action='append', help='Lists probed per query, can be repeated (default: 1, 4, 16 and 64).')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        results = [result for dims in args.dims or [4, 16] for result in benchmark(args.rows, dims, args.k, args.nprobe or [1, 4, 16, 64], workdir)]
+    columns = ['rows', 'dims', 'n_lists', 'method', 'nprobe', 'build_s', 'qps', 'recall_at_k', 'agreement']
+    print(pd.DataFrame(results)[columns].to_string(index=False))
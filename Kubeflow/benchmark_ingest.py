@@ -0,0 +1,76 @@
+"""Benchmark the ingestion of large iris-like CSVs by `create_dataset`.
+
+The component function runs in-process on a generated CSV without header,
+once with an empty cache and once with the source already cached, and is
+compared with the previous behaviour: `read_csv` then `to_csv` with the
+index. The download of remote sources is not measured. Reading the output
+back, as the next component does, is timed too.
+
+    python benchmark_ingest.py --rows 100000 --rows 1000000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+from kfp.dsl import Dataset
+
+from pipeline import create_dataset
+
+
+def make_csv(path, rows, seed=0):
+    rng = np.random.default_rng(seed)
+    labels = np.array(['Iris-setosa', 'Iris-versicolor', 'Iris-virginica'])
+    df = pd.DataFrame(np.round(rng.uniform(0.1, 7.9, size=(rows, 4)), 1))
+    df[4] = labels[rng.integers(0, 3, rows)]
+    df.to_csv(path, header=False, index=False)
+
+
+def previous_create_dataset(source, path):
+    col_names = ["Sepal_Length", "Sepal_Width", "Petal_Length", "Petal_Width", "Labels"]
+    df = pd.read_csv(source)
+    df.columns = col_names
+    with open(path, 'w') as f:
+        df.to_csv(f)
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    func(*args, **kwargs)
+    return time.perf_counter() - start
+
+
+def benchmark(rows, workdir):
+    source = os.path.join(workdir, f'iris_{rows}.csv')
+    make_csv(source, rows)
+    cache_dir = os.path.join(workdir, 'cache')
+    previous_path = os.path.join(workdir, f'previous_{rows}.csv')
+    parquet_path = os.path.join(workdir, f'iris_{rows}.parquet')
+
+    previous_s = timed(previous_create_dataset, source, previous_path)
+    cold_s = timed(create_dataset.python_func, iris_dataset=Dataset(uri=parquet_path), source=source, cache_dir=cache_dir)
+    warm_s = timed(create_dataset.python_func, iris_dataset=Dataset(uri=parquet_path), source=source, cache_dir=cache_dir)
+    return {
+        'rows': rows,
+        'source_mb': round(os.path.getsize(source) / 2**20, 1),
+        'previous_s': round(previous_s, 3),
+        'cold_s': round(cold_s, 3),
+        'cached_s': round(warm_s, 3),
+        'speedup_cached': round(previous_s / warm_s, 1),
+        'previous_out_mb': round(os.path.getsize(previous_path) / 2**20, 1),
+        'parquet_out_mb': round(os.path.getsize(parquet_path) / 2**20, 1),
+        'read_csv_s': round(timed(pd.read_csv, previous_path), 3),
+        'read_parquet_s': round(timed(pd.read_parquet, parquet_path), 3),
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark create_dataset ingestion.')
+    parser.add_argument('--rows', type=int, action='append', help='CSV rows, can be repeated (default: 100000 and 1000000).')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        results = [benchmark(rows, workdir) for rows in sorted(args.rows or [100_000, 1_000_000])]
+    print(pd.DataFrame(results).to_string(index=False))
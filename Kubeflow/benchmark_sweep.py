@@ -0,0 +1,89 @@
+"""Benchmark the `sweep_neighbors` component against one KNN per k.
+
+An iris-like normalized dataset is generated and written as Arrow IPC, like
+`normalize_dataset` does. For every k the previous approach reads the file,
+splits it, fits a `KNeighborsClassifier` and scores it, as the `train_model`
+branches of `ParallelFor` would. The sweep scores every k with a single
+fit and query. A single fit and score at the largest k is timed as the
+reference, and the per-k accuracies of the sweep are checked against the
+per-k models.
+
+    python benchmark_sweep.py --rows 20000 --neighbors 1 50
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+from kfp.dsl import Dataset, Metrics
+from sklearn.model_selection import train_test_split
+from sklearn.neighbors import KNeighborsClassifier
+
+from pipeline import sweep_neighbors
+
+
+def make_dataset(path, rows, seed=0):
+    rng = np.random.default_rng(seed)
+    labels = np.array(['Iris-setosa', 'Iris-versicolor', 'Iris-virginica'])
+    y = rng.integers(0, 3, rows)
+    X = rng.normal(size=(rows, 4)) + y[:, None]
+    df = pd.DataFrame(X, columns=['Sepal_Length', 'Sepal_Width', 'Petal_Length', 'Petal_Width'])
+    df['Labels'] = labels[y]
+    feather.write_feather(pa.Table.from_pandas(df, preserve_index=False), path, compression='uncompressed')
+
+
+def fit_and_score(path, k):
+    df = feather.read_table(path, memory_map=True).to_pandas()
+    y = df.pop('Labels')
+    X_train, X_test, y_train, y_test = train_test_split(df, y, random_state=0)
+    clf = KNeighborsClassifier(n_neighbors=k)
+    clf.fit(X_train, y_train)
+    return float(np.mean(clf.predict(X_test) == y_test.to_numpy()))
+
+
+def benchmark(rows, ks, workdir):
+    path = os.path.join(workdir, f'iris_{rows}.arrow')
+    make_dataset(path, rows)
+
+    start = time.perf_counter()
+    single = fit_and_score(path, max(ks))
+    single_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    per_k = {k: fit_and_score(path, k) for k in ks}
+    per_k_s = time.perf_counter() - start
+
+    metrics = Metrics(uri=os.path.join(workdir, 'metrics'))
+    start = time.perf_counter()
+    sweep_neighbors.python_func(normalized_iris_dataset=Dataset(uri=path), metrics=metrics, neighbors=ks)
+    sweep_s = time.perf_counter() - start
+
+    mismatches = [k for k in ks if metrics.metadata[f'accuracy_k{k}'] != per_k[k]]
+    assert single == per_k[max(ks)]
+    return {
+        'rows': rows,
+        'n_k': len(ks),
+        'single_fit_s': round(single_s, 3),
+        'per_k_s': round(per_k_s, 3),
+        'sweep_s': round(sweep_s, 3),
+        'sweep_vs_single': round(sweep_s / single_s, 2),
+        'speedup_vs_per_k': round(per_k_s / sweep_s, 1),
+        'best_k': metrics.metadata['best_k'],
+        'accuracy_mismatches': len(mismatches),
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the sweep_neighbors component.')
+    parser.add_argument('--rows', type=int, action='append', help='Dataset rows, can be repeated (default: 10000 and 50000).')
+    parser.add_argument('--neighbors', type=int, nargs=2, default=[1, 50], metavar=('FIRST', 'LAST'), help='Range of k values swept (default: 1 50).')
+    args = parser.parse_args()
+
+    ks = list(range(args.neighbors[0], args.neighbors[1] + 1))
+    with tempfile.TemporaryDirectory() as workdir:
+        results = [benchmark(rows, ks, workdir) for rows in sorted(args.rows or [10_000, 50_000])]
+    print(pd.DataFrame(results).to_string(index=False))
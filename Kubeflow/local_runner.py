@@ -0,0 +1,334 @@
+"""Run the pipelines of `pipeline.py` locally, without a cluster or network.
+
+The pipeline is compiled to its pipeline spec and the DAG is executed by
+calling the Python functions of the `@dsl.component` tasks on local
+artifacts, in a pool of `--jobs` processes (in-process with `--jobs 1`).
+A task starts as soon as the tasks it depends on are done, so independent
+tasks and the branches of a `ParallelFor` run in parallel. The tasks of a
+`dsl.If` whose condition compares parameters with constants are skipped when
+it is false. The packages of the components are not installed, they must be
+available locally.
+
+The outputs of every task are cached under `--cache-dir`, keyed by the
+SHA-256 of the component code, its input parameters and the keys of its
+input artifacts. A parameter naming a local file also contributes the size
+and modification time of the file. A task whose key is cached is not run
+again, except when a parameter is a URL, as the remote data may have
+changed. The key of an output artifact whose metadata holds the `sha256` of
+its content, like the dataset of `create_dataset`, includes it, so the
+tasks reading it run again only when the content changed. The time of
+every task is printed at the end of the run.
+
+    python local_runner.py my_pipeline --arg neighbors='[3, 6, 9]' --arg standard_scaler=true --arg min_max_scaler=false --arg source=iris.data --jobs 3
+"""
+import argparse
+import concurrent.futures
+import hashlib
+import importlib
+import json
+import multiprocessing
+import operator
+import os
+import re
+import shutil
+import tempfile
+import time
+
+from google.protobuf import json_format
+from kfp import dsl
+
+ARTIFACT_TYPES = {cls.schema_title: cls for cls in [dsl.Artifact, dsl.Dataset, dsl.Model, dsl.Metrics, dsl.ClassificationMetrics, dsl.SlicedClassificationMetrics, dsl.HTML, dsl.Markdown]}
+PARAMETER_TYPES = {'NUMBER_INTEGER': int, 'NUMBER_DOUBLE': float, 'BOOLEAN': bool}
+# A comparison of a task input parameter with a constant, as `dsl.If` compiles it
+_COMPARISON = re.compile(r"^(?:(int|double|string|bool)\()?inputs\.parameter_values\['([^']+)'\]\)?\s*(==|!=|<=|>=|<|>)\s*(.+)$")
+_OPERATORS = {'==': operator.eq, '!=': operator.ne, '<=': operator.le, '>=': operator.ge, '<': operator.lt, '>': operator.gt}
+_CASTS = {'int': int, 'double': float, 'string': str, 'bool': bool}
+_URL = re.compile(r'^[A-Za-z][A-Za-z0-9+.-]*://')
+
+
+class UnsupportedSpecError(ValueError):
+    """A valid pipeline spec using a feature that the local runner does not implement."""
+
+
+def evaluate_condition(condition, parameters):
+    """Value of a trigger condition: comparisons of input parameters with constants, joined by `&&`."""
+    for clause in condition.split('&&'):
+        clause = clause.strip()
+        while clause.startswith('(') and clause.endswith(')'):
+            clause = clause[1:-1].strip()
+        match = _COMPARISON.match(clause)
+        if match is None:
+            raise UnsupportedSpecError(f'Unsupported condition {condition!r}.')
+        cast, name, op, constant = match.groups()
+        value = parameters[name]
+        if cast is not None:
+            value = _CASTS[cast](value)
+        constant = constant[1:-1] if constant[0] in '\'"' and constant[-1] == constant[0] else json.loads(constant)
+        if not _OPERATORS[op](value, constant):
+            return False
+    return True
+
+
+def execute(module_name, function_name, parameters, inputs, outputs):
+    func = getattr(importlib.import_module(module_name), function_name).python_func
+    artifacts = {name: ARTIFACT_TYPES[schema](uri=uri, metadata=metadata) for name, (schema, uri, metadata) in inputs.items()}
+    artifacts.update({name: ARTIFACT_TYPES[schema](uri=uri) for name, (schema, uri) in outputs.items()})
+    start = time.perf_counter()
+    returned = func(**parameters, **artifacts)
+    seconds = time.perf_counter() - start
+    if returned is None:
+        returned = {}
+    elif hasattr(returned, '_asdict'):
+        returned = returned._asdict()
+    else:
+        returned = {'Output': returned}
+    return returned, {name: artifacts[name].metadata for name in outputs}, seconds
+
+
+class _InProcessExecutor(concurrent.futures.Executor):
+
+    def submit(self, fn, *args, **kwargs):
+        future = concurrent.futures.Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except Exception as exc:
+            future.set_exception(exc)
+        return future
+
+
+class _Scope:
+    """The tasks of one DAG: the pipeline root or one `ParallelFor` branch."""
+
+    def __init__(self, path, dag, parameters, artifacts, parent=None, parent_task=None):
+        self.path = path
+        self.pending = dict(dag['tasks'])
+        self.running = {}
+        self.done = {}
+        self.parameters = parameters
+        self.artifacts = artifacts
+        self.parent = parent
+        self.parent_task = parent_task
+
+
+class LocalRunner:
+
+    def __init__(self, module, cache_dir, jobs=1, use_cache=True):
+        self.module = module
+        self.cache_dir = cache_dir
+        self.jobs = jobs
+        self.use_cache = use_cache
+
+    def run(self, pipeline_name, arguments):
+        spec = json_format.MessageToDict(getattr(self.module, pipeline_name).pipeline_spec)
+        self._components = spec['components']
+        self._executors = spec['deploymentSpec']['executors']
+        self._records = []
+        self._futures = {}
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+        parameters = dict(arguments)
+        for name, definition in spec['root'].get('inputDefinitions', {}).get('parameters', {}).items():
+            if name not in parameters:
+                if 'defaultValue' not in definition:
+                    raise ValueError(f'Missing argument {name!r} of {pipeline_name}.')
+                parameters[name] = definition['defaultValue']
+        self._scopes = [_Scope('', spec['root']['dag'], parameters, {})]
+
+        start = time.perf_counter()
+        if self.jobs > 1:
+            executor = concurrent.futures.ProcessPoolExecutor(max_workers=self.jobs, mp_context=multiprocessing.get_context('spawn'))
+        else:
+            executor = _InProcessExecutor()
+        with executor:
+            try:
+                while True:
+                    while any([self._start(scope, executor) for scope in list(self._scopes)]):
+                        pass
+                    if not self._futures:
+                        break
+                    done, _ = concurrent.futures.wait(self._futures, return_when=concurrent.futures.FIRST_COMPLETED)
+                    for future in done:
+                        self._finish(future)
+            except BaseException:
+                for future in self._futures:
+                    future.cancel()
+                raise
+        if self._scopes:
+            stuck = [scope.path + name for scope in self._scopes for name in scope.pending]
+            raise RuntimeError(f'Tasks with unresolved dependencies: {stuck}')
+        self.seconds = time.perf_counter() - start
+        return self._records
+
+    def _start(self, scope, executor):
+        progressed = False
+        for name, task in list(scope.pending.items()):
+            inputs = task.get('inputs', {})
+            producers = set(task.get('dependentTasks', []))
+            for value in list(inputs.get('parameters', {}).values()) + list(inputs.get('artifacts', {}).values()):
+                producer = value.get('taskOutputParameter', value.get('taskOutputArtifact', {})).get('producerTask')
+                if producer:
+                    producers.add(producer)
+            if not producers <= scope.done.keys():
+                continue
+            del scope.pending[name]
+            progressed = True
+            component = self._components[task['componentRef']['name']]
+            parameters, artifacts = self._inputs(scope, name, task)
+            condition = task.get('triggerPolicy', {}).get('condition')
+            if condition and not evaluate_condition(condition, parameters):
+                scope.done[name] = ({}, {})
+                self._records.append({'task': scope.path + name, 'cached': False, 'skipped': True, 'seconds': 0.0,
+                                      'key': ''})
+                continue
+            if 'dag' in component:
+                self._open(scope, name, task, component, parameters, artifacts)
+            else:
+                self._submit(scope, name, task, component, parameters, artifacts, executor)
+        if not scope.pending and not scope.running:
+            self._close(scope)
+            progressed = True
+        return progressed
+
+    def _inputs(self, scope, name, task):
+        parameters = {}
+        for key, value in task.get('inputs', {}).get('parameters', {}).items():
+            if 'runtimeValue' in value:
+                parameters[key] = value['runtimeValue']['constant']
+            elif 'componentInputParameter' in value:
+                if value['componentInputParameter'] in scope.parameters:
+                    parameters[key] = scope.parameters[value['componentInputParameter']]
+            elif 'taskOutputParameter' in value:
+                output = value['taskOutputParameter']
+                parameters[key] = scope.done[output['producerTask']][0][output['outputParameterKey']]
+            else:
+                raise UnsupportedSpecError(f'Unsupported input {key!r} of task {scope.path + name}: {value}')
+        artifacts = {}
+        for key, value in task.get('inputs', {}).get('artifacts', {}).items():
+            if 'componentInputArtifact' in value:
+                artifacts[key] = scope.artifacts[value['componentInputArtifact']]
+            elif 'taskOutputArtifact' in value:
+                output = value['taskOutputArtifact']
+                artifacts[key] = scope.done[output['producerTask']][1][output['outputArtifactKey']]
+            else:
+                raise UnsupportedSpecError(f'Unsupported input {key!r} of task {scope.path + name}: {value}')
+        return parameters, artifacts
+
+    def _open(self, scope, name, task, component, parameters, artifacts):
+        if component.get('outputDefinitions'):
+            raise UnsupportedSpecError(f'Outputs of sub-DAGs are not supported, task {scope.path + name}.')
+        iterator = task.get('parameterIterator')
+        if iterator is None:
+            branches = [(scope.path + name + '/', parameters)]
+        else:
+            items = iterator['items']
+            items = json.loads(items['raw']) if 'raw' in items else parameters[items['inputParameter']]
+            branches = [(f'{scope.path}{name}[{i}]/', dict(parameters, **{iterator['itemInput']: item})) for i, item in enumerate(items)]
+        scope.running[name] = len(branches)
+        for path, branch_parameters in branches:
+            self._scopes.append(_Scope(path, component['dag'], branch_parameters, artifacts, scope, name))
+        if not branches:
+            del scope.running[name]
+            scope.done[name] = ({}, {})
+
+    def _close(self, scope):
+        self._scopes.remove(scope)
+        parent = scope.parent
+        if parent is not None:
+            parent.running[scope.parent_task] -= 1
+            if not parent.running[scope.parent_task]:
+                del parent.running[scope.parent_task]
+                parent.done[scope.parent_task] = ({}, {})
+
+    def _submit(self, scope, name, task, component, parameters, artifacts, executor):
+        definitions = component.get('inputDefinitions', {}).get('parameters', {})
+        for key, definition in definitions.items():
+            if key not in parameters and 'defaultValue' in definition:
+                parameters[key] = definition['defaultValue']
+            if key in parameters and definition['parameterType'] in PARAMETER_TYPES:
+                parameters[key] = PARAMETER_TYPES[definition['parameterType']](parameters[key])
+
+        container = self._executors[component['executorLabel']].get('container', {})
+        args = container.get('args', [])
+        if '--function_to_execute' not in args:
+            raise UnsupportedSpecError(f'Only Python components can run locally, task {scope.path + name}.')
+        function_name = args[args.index('--function_to_execute') + 1]
+
+        # Local files named by a parameter are part of the input of the task
+        files = {value: [os.path.getsize(value), os.path.getmtime(value)] for value in parameters.values() if isinstance(value, str) and os.path.isfile(value)}
+        remote = [value for value in parameters.values() if isinstance(value, str) and _URL.match(value)]
+        key = hashlib.sha256(json.dumps({
+            'container': container,
+            'parameters': parameters,
+            'artifacts': {input_name: artifact['key'] for input_name, artifact in artifacts.items()},
+            'files': files,
+        }, sort_keys=True, default=str).encode()).hexdigest()
+        target = os.path.join(self.cache_dir, key)
+        outputs = {output_name: definition['artifactType']['schemaTitle'] for output_name, definition in component.get('outputDefinitions', {}).get('artifacts', {}).items()}
+
+        use_cache = self.use_cache and task.get('cachingOptions', {}).get('enableCache', True) and not remote
+        if use_cache and os.path.exists(os.path.join(target, 'outputs.json')):
+            with open(os.path.join(target, 'outputs.json')) as f:
+                cached = json.load(f)
+            scope.done[name] = self._outputs(key, target, outputs, cached['parameters'], cached['metadata'])
+            self._records.append({'task': scope.path + name, 'cached': True, 'seconds': 0.0, 'key': key})
+            return
+
+        staging = tempfile.mkdtemp(prefix=f'{key}.', dir=self.cache_dir)
+        future = executor.submit(
+            execute, self.module.__name__, function_name, parameters,
+            {input_name: (artifact['schema'], artifact['uri'], artifact['metadata']) for input_name, artifact in artifacts.items()},
+            {output_name: (schema, os.path.join(staging, output_name)) for output_name, schema in outputs.items()},
+        )
+        scope.running[name] = 1
+        self._futures[future] = (scope, name, key, staging, target, outputs)
+
+    def _finish(self, future):
+        scope, name, key, staging, target, outputs = self._futures.pop(future)
+        try:
+            returned, metadata, seconds = future.result()
+        except Exception as exc:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise RuntimeError(f'Task {scope.path + name} failed.') from exc
+        with open(os.path.join(staging, 'outputs.json'), 'w') as f:
+            json.dump({'parameters': returned, 'metadata': metadata, 'seconds': seconds}, f)
+        # The finished outputs replace the cache entry in a single rename
+        shutil.rmtree(target, ignore_errors=True)
+        os.replace(staging, target)
+        del scope.running[name]
+        scope.done[name] = self._outputs(key, target, outputs, returned, metadata)
+        self._records.append({'task': scope.path + name, 'cached': False, 'seconds': seconds, 'key': key})
+
+    @staticmethod
+    def _outputs(key, target, outputs, parameters, metadata):
+        artifacts = {name: {'schema': schema, 'uri': os.path.join(target, name), 'metadata': metadata[name], 'key': '/'.join([key, name, metadata[name].get('sha256', '')])} for name, schema in outputs.items()}
+        return parameters, artifacts
+
+
+def parse_argument(text):
+    name, _, value = text.partition('=')
+    try:
+        return name, json.loads(value)
+    except ValueError:
+        return name, value
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run a pipeline of pipeline.py locally.')
+    parser.add_argument('pipeline', help='Name of the pipeline function, e.g. my_pipeline.')
+    parser.add_argument('--module', default='pipeline', help='Module defining the pipeline (default: pipeline).')
+    parser.add_argument('--arg', type=parse_argument, action='append', default=[], help='Pipeline argument as name=value, the value is parsed as JSON when possible. Can be repeated.')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count(), help='Worker processes, 1 runs the tasks in-process (default: CPU count).')
+    parser.add_argument('--cache-dir', default=os.path.join(tempfile.gettempdir(), 'kfp-local-cache'), help='Directory of the cached task outputs.')
+    parser.add_argument('--no-cache', action='store_true', help='Run every task, even if its outputs are cached.')
+    args = parser.parse_args()
+
+    runner = LocalRunner(importlib.import_module(args.module), args.cache_dir, jobs=args.jobs, use_cache=not args.no_cache)
+    records = runner.run(args.pipeline, dict(args.arg))
+    width = max(len(record['task']) for record in records)
+    for record in records:
+        if record.get('skipped'):
+            print(f"{record['task']:<{width}}  {'skipped':>9}")
+            continue
+        status = 'cached' if record['cached'] else f"{record['seconds']:8.3f}s"
+        print(f"{record['task']:<{width}}  {status:>9}  {os.path.join(args.cache_dir, record['key'])}")
+    print(f"{'total':<{width}}  {runner.seconds:8.3f}s  {sum(record['seconds'] for record in records):.3f}s of task time")
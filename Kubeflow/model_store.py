@@ -0,0 +1,76 @@
+"""Load the models written by `train_model`.
+
+A model is a directory holding its large NumPy arrays as uncompressed
+`.npy` files, the rest of the estimator pickled into `skeleton.pkl` with
+references to the arrays, and a `model.json` header with the library
+versions and the SHA-256 of every file. The arrays are memory-mapped, so
+loading is immediate and the pages are read when a prediction needs them.
+The format is the one of `ZenML/utils/model_store.py`, both readers are
+tested against the model in `ZenML/tests/fixtures/compact_model`.
+
+    from model_store import load_model
+    clf = load_model(model_path)
+"""
+import hashlib
+import io
+import json
+import os
+import pickle
+import platform
+import warnings
+
+import numpy as np
+
+FORMAT = 'compact-model'
+FORMAT_VERSION = 1
+
+
+class _ArrayUnpickler(pickle.Unpickler):
+
+    def __init__(self, file, arrays):
+        super().__init__(file)
+        self.arrays = arrays
+
+    def persistent_load(self, pid):
+        kind, index = pid
+        if kind != 'ndarray':
+            raise pickle.UnpicklingError(f'Unknown persistent id {pid!r}.')
+        return self.arrays[index]
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(2**20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def read_header(path):
+    with open(os.path.join(path, 'model.json')) as f:
+        header = json.load(f)
+    if header.get('format') != FORMAT or header.get('format_version') != FORMAT_VERSION:
+        raise ValueError(f"Unsupported model format {header.get('format')} version {header.get('format_version')} in {path}.")
+    return header
+
+
+def load_model(path, mmap=True, verify=False):
+    """Load a model, checking the skeleton checksum, and the array checksums with `verify`."""
+    header = read_header(path)
+    with open(os.path.join(path, header['skeleton']['file']), 'rb') as f:
+        skeleton = f.read()
+    if hashlib.sha256(skeleton).hexdigest() != header['skeleton']['sha256']:
+        raise ValueError(f'The model skeleton in {path} does not match its checksum.')
+    if verify:
+        for array in header['arrays']:
+            if _sha256(os.path.join(path, array['file'])) != array['sha256']:
+                raise ValueError(f"{array['file']} in {path} does not match its checksum.")
+
+    import sklearn
+    current = {'python': platform.python_version(), 'numpy': np.__version__, 'sklearn': sklearn.__version__}
+    changed = {name: (version, current.get(name)) for name, version in header['versions'].items() if current.get(name) != version}
+    if changed:
+        warnings.warn(f'The model in {path} was saved with other library versions (saved, current): {changed}. Loading it anyway.')
+
+    arrays = [np.load(os.path.join(path, array['file']), mmap_mode='r' if mmap else None, allow_pickle=False) for array in header['arrays']]
+    return _ArrayUnpickler(io.BytesIO(skeleton), arrays).load()
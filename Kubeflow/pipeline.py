@@ -3,30 +3,87 @@ from kfp import Client
 from kfp import compiler
 from kfp.dsl import Dataset
 from kfp.dsl import Input
+from kfp.dsl import Metrics
 from kfp.dsl import Model
 from kfp.dsl import Output
 from typing import List
 
 
-@dsl.component(packages_to_install=['pandas==1.3.5'])
-def create_dataset(iris_dataset: Output[Dataset]):
+@dsl.component(packages_to_install=['pandas==1.3.5', 'pyarrow==6.0.1'])
+def create_dataset(iris_dataset: Output[Dataset], source: str = 'https://archive.ics.uci.edu/ml/machine-learning-databases/iris/iris.data', cache_dir: str = ''):
+    import hashlib
+    import os
+    import shutil
+    import tempfile
+    import urllib.request
     import pandas as pd
-    csv_url = "https://archive.ics.uci.edu/ml/machine-learning-databases/iris/iris.data"
-    col_names = ["Sepal_Length", "Sepal_Width", "Petal_Length", "Petal_Width", "Labels"]
-    df = pd.read_csv(csv_url)
-    df.columns = col_names
-    with open(iris_dataset.path, 'w') as f:
-        df.to_csv(f)
-
-@dsl.component(packages_to_install=['pandas==1.3.5', 'scikit-learn==1.0.2'])
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    schema = pa.schema([
+        ('Sepal_Length', pa.float64()),
+        ('Sepal_Width', pa.float64()),
+        ('Petal_Length', pa.float64()),
+        ('Petal_Width', pa.float64()),
+        ('Labels', pa.string()),
+    ])
+
+    # Local or mounted sources are read in place, others are downloaded
+    download = None
+    if os.path.exists(source):
+        path = source
+    else:
+        download = tempfile.NamedTemporaryFile(suffix='.csv', delete=False)
+        with urllib.request.urlopen(source) as response:
+            shutil.copyfileobj(response, download)
+        download.close()
+        path = download.name
+
+    try:
+        sha256 = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                sha256.update(block)
+        digest = sha256.hexdigest()
+
+        # Sources with the same content are only parsed once per cache dir
+        cached = os.path.join(cache_dir, digest + '.parquet') if cache_dir else None
+        cache_hit = cached is not None and os.path.exists(cached)
+        if not cache_hit:
+            # The source has no header row
+            df = pd.read_csv(path, header=None, names=schema.names, dtype={'Labels': str})
+            table = pa.Table.from_pandas(df, schema=schema, preserve_index=False)
+            if cached is None:
+                pq.write_table(table, iris_dataset.path)
+            else:
+                os.makedirs(cache_dir, exist_ok=True)
+                # Written aside and renamed, so concurrent runs never read a partial file
+                tmp = tempfile.NamedTemporaryFile(dir=cache_dir, suffix='.tmp', delete=False)
+                try:
+                    with tmp:
+                        pq.write_table(table, tmp)
+                    os.replace(tmp.name, cached)
+                finally:
+                    # Only left there when the write or the rename failed, e.g. on a full disk
+                    if os.path.exists(tmp.name):
+                        os.remove(tmp.name)
+        if cached is not None:
+            shutil.copyfile(cached, iris_dataset.path)
+    finally:
+        if download is not None:
+            os.remove(download.name)
+
+    iris_dataset.metadata.update({'format': 'parquet', 'sha256': digest, 'cache_hit': cache_hit})
+
+@dsl.component(packages_to_install=['pandas==1.3.5', 'pyarrow==6.0.1', 'scikit-learn==1.0.2'])
 def normalize_dataset(input_iris_dataset: Input[Dataset], normalized_iris_dataset: Output[Dataset], standard_scaler: bool, min_max_scaler: bool,):
     if standard_scaler is min_max_scaler:
-        raise Value('Exactly one of standard_scaler or min_max_scaler mustbe True.')
+        raise ValueError('Exactly one of standard_scaler or min_max_scaler must be True.')
     
     import pandas as pd
+    import pyarrow as pa
+    import pyarrow.feather as feather
     from sklearn.preprocessing import MinMaxScaler, StandardScaler
-    with open(input_iris_dataset.path) as f:
-        df = pd.read_csv(f)
+    df = pd.read_parquet(input_iris_dataset.path, memory_map=True)
     
     labels = df.pop('Labels')
     
@@ -35,22 +92,31 @@ def normalize_dataset(input_iris_dataset: Input[Dataset], normalized_iris_datase
     
     if min_max_scaler:
         scaler = MinMaxScaler()
-    df = pd.DataFrame(scaler.fit_transform(df))
+    df = pd.DataFrame(scaler.fit_transform(df), columns=df.columns)
     df['Labels'] = labels
     
-    with open(normalized_iris_dataset.path, 'w') as f:
-        df.to_csv(f)
+    # Uncompressed Arrow IPC, so that every training branch memory-maps it
+    #  instead of parsing it
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    feather.write_feather(table, normalized_iris_dataset.path, compression='uncompressed')
+    normalized_iris_dataset.metadata['format'] = 'arrow'
 
 
-@dsl.component(packages_to_install=['pandas==1.3.5', 'scikit-learn==1.0.2'])
+@dsl.component(packages_to_install=['pandas==1.3.5', 'pyarrow==6.0.1', 'scikit-learn==1.0.2'])
 def train_model(normalized_iris_dataset: Input[Dataset],model: Output[Model],n_neighbors: int,):
 
+    import hashlib
+    import io
+    import json
+    import os
     import pickle
-    import pandas as pd
+    import platform
+    import numpy as np
+    import pyarrow.feather as feather
+    import sklearn
     from sklearn.model_selection import train_test_split
     from sklearn.neighbors import KNeighborsClassifier
-    with open(normalized_iris_dataset.path) as f:
-        df = pd.read_csv(f)
+    df = feather.read_table(normalized_iris_dataset.path, memory_map=True).to_pandas()
     
     y = df.pop('Labels')
     X = df
@@ -59,25 +125,155 @@ def train_model(normalized_iris_dataset: Input[Dataset],model: Output[Model],n_n
     clf = KNeighborsClassifier(n_neighbors=n_neighbors)
     clf.fit(X_train, y_train)
     
-    with open(model.path, 'wb') as f:
-        pickle.dump(clf, f)
+
+    # Written in the compact model format of `save_model` in
+    #  ZenML/utils/model_store.py, which `model_store.load_model` reads:
+    #  large arrays as .npy files next to a pickled skeleton and a header with
+    #  versions and checksums. A lightweight component only ships its own
+    #  source, so the writer cannot be imported, and this is the only
+    #  component that writes models.
+    os.makedirs(model.path, exist_ok=True)
+    arrays, saved = [], {}
+
+    class ArrayPickler(pickle.Pickler):
+        def persistent_id(self, obj):
+            if not isinstance(obj, np.ndarray) or obj.dtype.hasobject or obj.nbytes < 64 * 1024:
+                return None
+            if id(obj) not in saved:
+                saved[id(obj)] = len(arrays)
+                arrays.append({'file': f'array_{len(arrays)}.npy', 'shape': list(obj.shape), 'dtype': obj.dtype.str})
+                np.save(os.path.join(model.path, arrays[-1]['file']), obj, allow_pickle=False)
+            return ('ndarray', saved[id(obj)])
+
+    skeleton = io.BytesIO()
+    ArrayPickler(skeleton, protocol=pickle.HIGHEST_PROTOCOL).dump(clf)
+    with open(os.path.join(model.path, 'skeleton.pkl'), 'wb') as f:
+        f.write(skeleton.getvalue())
+    for array in arrays:
+        with open(os.path.join(model.path, array['file']), 'rb') as f:
+            array['sha256'] = hashlib.sha256(f.read()).hexdigest()
+    with open(os.path.join(model.path, 'model.json'), 'w') as f:
+        json.dump({'format': 'compact-model', 'format_version': 1, 'class': f'{type(clf).__module__}.{type(clf).__qualname__}',
+                   'versions': {'python': platform.python_version(), 'numpy': np.__version__, 'sklearn': sklearn.__version__},
+                   'skeleton': {'file': 'skeleton.pkl', 'sha256': hashlib.sha256(skeleton.getvalue()).hexdigest()}, 'arrays': arrays}, f, indent=2)
+    model.metadata['format'] = 'compact-model'
+    model.metadata['n_neighbors'] = n_neighbors
+
+@dsl.component(packages_to_install=['pandas==1.3.5', 'pyarrow==6.0.1', 'scikit-learn==1.0.2'])
+def sweep_neighbors(normalized_iris_dataset: Input[Dataset], metrics: Output[Metrics], neighbors: List[int],) -> int:
+
+    import numpy as np
+    import pyarrow.feather as feather
+    from sklearn.model_selection import train_test_split
+    from sklearn.neighbors import KNeighborsClassifier
+    df = feather.read_table(normalized_iris_dataset.path, memory_map=True).to_pandas()
+
+    y = df.pop('Labels')
+    X = df
+    X_train, X_test, y_train, y_test = train_test_split(X, y,random_state=0)
+
+    ks = sorted(set(neighbors))
+    if ks[0] < 1 or ks[-1] > len(X_train):
+        raise ValueError(f'Every k must be between 1 and {len(X_train)}, got {ks}.')
+
+    # The index is built once and queried once, at the largest k. The
+    #  neighbors come sorted by distance, so the first k columns are the
+    #  k nearest neighbors for every smaller k.
+    clf = KNeighborsClassifier(n_neighbors=ks[-1])
+    clf.fit(X_train, y_train)
+    neighbor_labels = np.searchsorted(clf.classes_, y_train.to_numpy())[clf.kneighbors(X_test, return_distance=False)]
+
+    # Votes are accumulated one neighbor at a time, ties go to the first
+    #  class like in KNeighborsClassifier.predict
+    rows = np.arange(len(X_test))
+    votes = np.zeros((len(X_test), len(clf.classes_)), dtype=np.int64)
+    accuracies = {}
+    for k in range(1, ks[-1] + 1):
+        votes[rows, neighbor_labels[:, k - 1]] += 1
+        if k in ks:
+            accuracies[k] = float(np.mean(clf.classes_[votes.argmax(axis=1)] == y_test.to_numpy()))
+            metrics.log_metric(f'accuracy_k{k}', accuracies[k])
+
+    # The model of the best k is fitted and stored by `train_model`, the
+    #  only component that writes models
+    best_k = max(ks, key=lambda k: (accuracies[k], -k))
+    metrics.log_metric('best_k', best_k)
+    metrics.log_metric('best_accuracy', accuracies[best_k])
+    return best_k
+
+@dsl.component(packages_to_install=['pandas==1.3.5', 'pyarrow==6.0.1', 'scikit-learn==1.0.2'])
+def build_ann_index(normalized_iris_dataset: Input[Dataset], ann_index: Output[Model], n_lists: int = 0, nprobe: int = 0,):
+
+    import json
+    import os
+    import numpy as np
+    import pyarrow.feather as feather
+    from sklearn.cluster import KMeans
+    from sklearn.model_selection import train_test_split
+    df = feather.read_table(normalized_iris_dataset.path, memory_map=True).to_pandas()
+
+    y = df.pop('Labels')
+    X = df
+    X_train, X_test, y_train, y_test = train_test_split(X, y,random_state=0)
+
+    # Inverted file index: the training vectors are grouped by their
+    #  nearest k-means centroid, and a query only scans the lists of its
+    #  nprobe nearest centroids. The centroids are fitted on a sample.
+    vectors = X_train.to_numpy(dtype=np.float32)
+    n_lists = min(n_lists or int(np.sqrt(len(vectors))), len(vectors))
+    rng = np.random.default_rng(0)
+    sample = vectors[rng.choice(len(vectors), min(len(vectors), 256 * n_lists), replace=False)]
+    kmeans = KMeans(n_clusters=n_lists, n_init=1, random_state=0).fit(sample)
+    assignments = kmeans.predict(vectors)
+    order = np.argsort(assignments, kind='stable')
+    classes, labels = np.unique(y_train.to_numpy(), return_inverse=True)
+
+    # Every array is stored as .npy, so the index can be memory-mapped
+    os.makedirs(ann_index.path, exist_ok=True)
+    arrays = {
+        'centroids': kmeans.cluster_centers_.astype(np.float32),
+        'offsets': np.concatenate([[0], np.cumsum(np.bincount(assignments, minlength=n_lists))]).astype(np.int64),
+        'vectors': vectors[order],
+        'sq_norms': np.einsum('ij,ij->i', vectors[order], vectors[order]),
+        'labels': labels[order].astype(np.int32),
+        'ids': order.astype(np.int64),
+    }
+    for name, array in arrays.items():
+        np.save(os.path.join(ann_index.path, f'{name}.npy'), np.ascontiguousarray(array))
+    with open(os.path.join(ann_index.path, 'index.json'), 'w') as f:
+        json.dump({'format': 'ivf-flat', 'version': 1, 'columns': list(X.columns), 'classes': classes.tolist(), 'nprobe': nprobe or max(1, n_lists // 8)}, f)
+    ann_index.metadata['n_lists'] = n_lists
+    ann_index.metadata['rows'] = len(vectors)
 
 @dsl.pipeline(name='iris-training-pipeline')
-def my_pipeline(standard_scaler: bool, min_max_scaler: bool, neighbors: List[int],):
-    create_dataset_task = create_dataset()
+def my_pipeline(standard_scaler: bool, min_max_scaler: bool, neighbors: List[int], source: str = 'https://archive.ics.uci.edu/ml/machine-learning-databases/iris/iris.data', cache_dir: str = '', ann_lists: int = 0, build_index: bool = True,):
+    create_dataset_task = create_dataset(source=source, cache_dir=cache_dir)
     iris_df = create_dataset_task.outputs['iris_dataset']
     normalize_dataset_task = normalize_dataset(input_iris_dataset=iris_df,standard_scaler=True, min_max_scaler=False)
     norm_iris_df = normalize_dataset_task.outputs['normalized_iris_dataset']
     with dsl.ParallelFor(neighbors) as n_neighbors:
         train_model(normalized_iris_dataset=norm_iris_df, n_neighbors=n_neighbors)
+    # The index is only needed for approximate serving
+    with dsl.If(build_index == True):
+        build_ann_index(normalized_iris_dataset=norm_iris_df, n_lists=ann_lists)
+
+@dsl.pipeline(name='iris-sweep-pipeline')
+def sweep_pipeline(standard_scaler: bool, min_max_scaler: bool, neighbors: List[int], source: str = 'https://archive.ics.uci.edu/ml/machine-learning-databases/iris/iris.data', cache_dir: str = '',):
+    create_dataset_task = create_dataset(source=source, cache_dir=cache_dir)
+    iris_df = create_dataset_task.outputs['iris_dataset']
+    normalize_dataset_task = normalize_dataset(input_iris_dataset=iris_df, standard_scaler=standard_scaler, min_max_scaler=min_max_scaler)
+    norm_iris_df = normalize_dataset_task.outputs['normalized_iris_dataset']
+    sweep_task = sweep_neighbors(normalized_iris_dataset=norm_iris_df, neighbors=neighbors)
+    train_model(normalized_iris_dataset=norm_iris_df, n_neighbors=sweep_task.outputs['Output'])
 
 
-client = Client()
-pipeline_args = {'min_max_scaler': True,
-                 'standard_scaler': False,
-                 'neighbors': [3, 6, 9]}
+if __name__ == '__main__':
+    client = Client()
+    pipeline_args = {'min_max_scaler': True,
+                     'standard_scaler': False,
+                     'neighbors': [3, 6, 9]}
 
-run = client.create_run_from_pipeline_func(my_pipeline, arguments=pipeline_args)
+    run = client.create_run_from_pipeline_func(my_pipeline, arguments=pipeline_args)
 
 #compiler.Compiler().compile(my_pipeline, 'pipeline.yaml')
 
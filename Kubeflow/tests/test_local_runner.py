@@ -0,0 +1,61 @@
+import json
+import sys
+
+import pytest
+from kfp import dsl
+from kfp.dsl import Dataset, Input, Output
+
+from local_runner import LocalRunner, UnsupportedSpecError, evaluate_condition
+
+
+@dsl.component
+def download(source: str, data: Output[Dataset]):
+    import hashlib
+    import urllib.request
+    with urllib.request.urlopen(source) as response:
+        content = response.read()
+    with open(data.path, 'wb') as f:
+        f.write(content)
+    data.metadata['sha256'] = hashlib.sha256(content).hexdigest()
+
+
+@dsl.component
+def read(data: Input[Dataset]) -> str:
+    with open(data.path) as f:
+        return f.read()
+
+
+@dsl.pipeline
+def download_pipeline(source: str):
+    read(data=download(source=source).outputs['data'])
+
+
+def run(tmp_path, source):
+    records = LocalRunner(sys.modules[__name__], str(tmp_path / 'cache')).run('download_pipeline', {'source': source})
+    return {record['task']: record for record in records}
+
+
+def test_url_tasks_run_again_and_their_readers_only_on_new_content(tmp_path):
+    source = tmp_path / 'source.csv'
+    source.write_text('1,2,3\n')
+    url = source.as_uri()
+
+    first = run(tmp_path, url)
+    assert not first['download']['cached'] and not first['read']['cached']
+    unchanged = run(tmp_path, url)
+    assert not unchanged['download']['cached'] and unchanged['read']['cached']
+
+    source.write_text('4,5,6\n')
+    changed = run(tmp_path, url)
+    assert not changed['download']['cached'] and not changed['read']['cached']
+    with open(tmp_path / 'cache' / changed['read']['key'] / 'outputs.json') as f:
+        assert json.load(f)['parameters']['Output'] == '4,5,6\n'
+
+
+def test_conditions():
+    parameters = {'pipelinechannel--build_index': True, 'pipelinechannel--k': 5}
+    assert evaluate_condition("inputs.parameter_values['pipelinechannel--build_index'] == true", parameters)
+    assert not evaluate_condition("inputs.parameter_values['pipelinechannel--build_index'] == true && "
+                                  "int(inputs.parameter_values['pipelinechannel--k']) > 5", parameters)
+    with pytest.raises(UnsupportedSpecError):
+        evaluate_condition("inputs.parameter_values['pipelinechannel--k'] in [1, 2]", parameters)
@@ -0,0 +1,63 @@
+import json
+import os
+import warnings
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+import pytest
+from kfp.dsl import Dataset, Model
+from sklearn.model_selection import train_test_split
+from sklearn.neighbors import KNeighborsClassifier
+
+from model_store import load_model, read_header
+from pipeline import train_model
+
+# The model written by the format definition of the ZenML example, read by both readers
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, os.pardir, 'ZenML', 'tests', 'fixtures', 'compact_model')
+
+
+def write_dataset(path, rows=4000):
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(rng.standard_normal((rows, 4)), columns=['Sepal_Length', 'Sepal_Width', 'Petal_Length', 'Petal_Width'])
+    df['Labels'] = np.where(df['Petal_Length'] > 0, 'Iris-virginica', 'Iris-setosa')
+    feather.write_feather(pa.Table.from_pandas(df, preserve_index=False), path, compression='uncompressed')
+    return df
+
+
+@pytest.fixture
+def fixture_header():
+    if not os.path.isdir(FIXTURE):
+        pytest.skip('the ZenML example is not next to this one')
+    return read_header(FIXTURE)
+
+
+def test_load_model_reads_the_shared_fixture(fixture_header):
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        model = load_model(FIXTURE, verify=True)
+    np.testing.assert_array_equal(model['coef'], np.arange(6).reshape(2, 3))
+    np.testing.assert_array_equal(model['classes'], ['no', 'yes'])
+    assert model['coef_again'] is model['coef']
+
+
+def test_train_model_writes_the_format_of_the_fixture(tmp_path, fixture_header):
+    df = write_dataset(str(tmp_path / 'dataset.arrow'))
+    train_model.python_func(normalized_iris_dataset=Dataset(uri=str(tmp_path / 'dataset.arrow')),
+                            model=Model(uri=str(tmp_path / 'model')), n_neighbors=5)
+
+    with open(os.path.join(tmp_path, 'model', 'model.json')) as f:
+        header = json.load(f)
+    assert header['arrays'], 'the training vectors should be stored as an array file'
+    assert (header['format'], header['format_version']) == (fixture_header['format'], fixture_header['format_version'])
+    assert header.keys() == fixture_header.keys()
+    assert header['versions'].keys() == fixture_header['versions'].keys()
+    assert header['skeleton'].keys() == fixture_header['skeleton'].keys()
+    assert all(array.keys() == fixture_header['arrays'][0].keys() for array in header['arrays'])
+
+    y = df.pop('Labels')
+    X_train, X_test, y_train, y_test = train_test_split(df, y, random_state=0)
+    clf = KNeighborsClassifier(n_neighbors=5).fit(X_train, y_train)
+    loaded = load_model(str(tmp_path / 'model'), verify=True)
+    np.testing.assert_array_equal(loaded.predict(X_test), clf.predict(X_test))
@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as ipc
+import pytest
+from kfp.dsl import Dataset
+from sklearn.preprocessing import MinMaxScaler, StandardScaler
+
+from pipeline import create_dataset, normalize_dataset
+
+FEATURES = ['Sepal_Length', 'Sepal_Width', 'Petal_Length', 'Petal_Width']
+
+
+@pytest.fixture
+def iris_dataset(tmp_path):
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(np.round(rng.uniform(0.1, 8, (150, 4)), 1), columns=FEATURES)
+    df['Labels'] = rng.choice(['Iris-setosa', 'Iris-versicolor', 'Iris-virginica'], 150)
+    # The source has no header row
+    df.to_csv(tmp_path / 'iris.data', header=False, index=False)
+    dataset = Dataset(uri=str(tmp_path / 'iris_dataset'))
+    create_dataset.python_func(iris_dataset=dataset, source=str(tmp_path / 'iris.data'))
+    return dataset, df
+
+
+@pytest.mark.parametrize('standard_scaler, scaler', [(True, StandardScaler()), (False, MinMaxScaler())])
+def test_normalized_dataset_is_uncompressed_arrow_ipc(tmp_path, iris_dataset, standard_scaler, scaler):
+    dataset, df = iris_dataset
+    normalized = Dataset(uri=str(tmp_path / 'normalized'))
+    normalize_dataset.python_func(input_iris_dataset=dataset, normalized_iris_dataset=normalized,
+                                  standard_scaler=standard_scaler, min_max_scaler=not standard_scaler)
+
+    assert normalized.metadata['format'] == 'arrow'
+    allocated = pa.total_allocated_bytes()
+    with pa.memory_map(normalized.path) as source:
+        table = ipc.open_file(source).read_all()
+        # Uncompressed buffers are read in place from the mapped file
+        assert pa.total_allocated_bytes() == allocated
+        assert table.schema == pa.schema([(name, pa.float64()) for name in FEATURES] + [('Labels', pa.string())])
+        result = table.to_pandas()
+
+    # Scaled from the same Parquet frame, the values survive the round trip exactly
+    expected = scaler.fit_transform(pd.read_parquet(dataset.path)[FEATURES])
+    np.testing.assert_array_equal(result[FEATURES].to_numpy(), expected)
+    np.testing.assert_allclose(expected, scaler.fit_transform(df[FEATURES]), rtol=1e-12)
+    assert result['Labels'].tolist() == df['Labels'].tolist()
+
+
+def test_normalize_dataset_needs_exactly_one_scaler(tmp_path, iris_dataset):
+    dataset, _ = iris_dataset
+    for standard_scaler in (True, False):
+        with pytest.raises(ValueError, match='Exactly one'):
+            normalize_dataset.python_func(input_iris_dataset=dataset,
+                                          normalized_iris_dataset=Dataset(uri=str(tmp_path / 'normalized')),
+                                          standard_scaler=standard_scaler, min_max_scaler=standard_scaler)
+
+
+def test_failed_cache_write_leaves_no_temporary_file(tmp_path, iris_dataset, monkeypatch):
+    import pyarrow.parquet as pq
+
+    def write_table(table, where, **kwargs):
+        where.write(b'PAR1 partial')
+        raise OSError(28, 'No space left on device')
+
+    monkeypatch.setattr(pq, 'write_table', write_table)
+    cache_dir = tmp_path / 'cache'
+    with pytest.raises(OSError, match='No space left'):
+        create_dataset.python_func(iris_dataset=Dataset(uri=str(tmp_path / 'cached_dataset')),
+                                   source=str(tmp_path / 'iris.data'), cache_dir=str(cache_dir))
+    assert list(cache_dir.iterdir()) == []
+
+    monkeypatch.undo()
+    dataset = Dataset(uri=str(tmp_path / 'cached_dataset'))
+    create_dataset.python_func(iris_dataset=dataset, source=str(tmp_path / 'iris.data'), cache_dir=str(cache_dir))
+    assert [path.name for path in cache_dir.iterdir()] == [dataset.metadata['sha256'] + '.parquet']
+    assert not dataset.metadata['cache_hit']
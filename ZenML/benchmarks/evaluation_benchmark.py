@@ -0,0 +1,172 @@
+# MIT License
+# 
+# Copyright (c) ZenML GmbH 2024
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+# 
+
+"""Benchmark the approximate evaluation against scoring every test row.
+
+A model, configured as `model_trainer` does, is trained on synthetic data with
+the schema of the Breast Cancer dataset. Only a few features are used, so that
+the model is not almost always right. For every test set size and production
+accuracy, the test accuracy is computed exactly and with
+`utils.progressive.progressive_accuracy`, against the thresholds of
+`model_evaluator` in approximate mode. The time of both, the rows scored, the
+interval and whether both lead to the same promotion decision are written to
+a CSV file.
+
+Run it from the project root:
+
+    python -m benchmarks.evaluation_benchmark --test-rows 100000 --test-rows 1000000
+"""
+
+import csv
+import os
+import time
+from typing import List
+
+import click
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import SGDClassifier
+
+from steps.model_promoter import MIN_ACCURACY
+from utils.progressive import exact_accuracy, progressive_accuracy
+from utils.synthetic import make_breast_cancer_like
+
+TARGET = "target"
+MODELS = {"sgd": SGDClassifier, "rf": RandomForestClassifier}
+FIELDS = [
+    "model_type",
+    "test_rows",
+    "production_accuracy",
+    "exact_s",
+    "approximate_s",
+    "speedup",
+    "rows_scored",
+    "exact_accuracy",
+    "approximate_accuracy",
+    "lower",
+    "upper",
+    "same_decision",
+]
+
+
+def _promoted(accuracy: float, production_accuracy: float) -> bool:
+    """Decision of `model_promoter` for this accuracy."""
+    return accuracy >= MIN_ACCURACY and accuracy > production_accuracy
+
+
+@click.command(help="Benchmark the approximate evaluation against the exact one.")
+@click.option(
+    "--test-rows",
+    multiple=True,
+    type=click.IntRange(min=1),
+    default=[100_000, 1_000_000],
+    show_default=True,
+    help="Rows of the test set, can be repeated.",
+)
+@click.option(
+    "--production-accuracies",
+    multiple=True,
+    type=click.FloatRange(0.0, 1.0),
+    default=[0.5, 0.85, 0.88],
+    show_default=True,
+    help="Test accuracy of the production model, can be repeated.",
+)
+@click.option(
+    "--model-type",
+    default="rf",
+    type=click.Choice(list(MODELS)),
+    show_default=True,
+    help="The type of model to evaluate.",
+)
+@click.option(
+    "--width",
+    default=2,
+    type=click.IntRange(min=1),
+    show_default=True,
+    help="Number of feature columns, fewer make the model less accurate.",
+)
+@click.option(
+    "--output",
+    default=os.path.join(os.path.dirname(__file__), "results", "evaluation.csv"),
+    show_default=True,
+    help="CSV file the results are written to.",
+)
+def main(
+    test_rows: List[int],
+    production_accuracies: List[float],
+    model_type: str,
+    width: int,
+    output: str,
+):
+    """Benchmark entry point."""
+    dataset_trn = make_breast_cancer_like(10_000, n_features=width)
+    model = MODELS[model_type]().fit(
+        dataset_trn.drop(columns=[TARGET]), dataset_trn[TARGET]
+    )
+
+    results = []
+    for n_rows in sorted(test_rows):
+        dataset_tst = make_breast_cancer_like(
+            n_rows, n_features=width, random_state=42
+        )
+        start = time.perf_counter()
+        exact = exact_accuracy(model, dataset_tst, TARGET)
+        exact_s = time.perf_counter() - start
+        for production_accuracy in production_accuracies:
+            start = time.perf_counter()
+            estimate = progressive_accuracy(
+                model,
+                dataset_tst,
+                TARGET,
+                thresholds=[MIN_ACCURACY, production_accuracy],
+            )
+            approximate_s = time.perf_counter() - start
+            results.append(
+                {
+                    "model_type": model_type,
+                    "test_rows": n_rows,
+                    "production_accuracy": production_accuracy,
+                    "exact_s": round(exact_s, 3),
+                    "approximate_s": round(approximate_s, 3),
+                    "speedup": round(exact_s / approximate_s, 1),
+                    "rows_scored": estimate.rows,
+                    "exact_accuracy": round(exact.accuracy, 4),
+                    "approximate_accuracy": round(estimate.accuracy, 4),
+                    "lower": round(estimate.lower, 4),
+                    "upper": round(estimate.upper, 4),
+                    "same_decision": _promoted(exact.accuracy, production_accuracy)
+                    == _promoted(estimate.accuracy, production_accuracy),
+                }
+            )
+
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDS, lineterminator="\n")
+        writer.writeheader()
+        writer.writerows(results)
+    print(pd.DataFrame(results, columns=FIELDS).to_string(index=False))
+    print(f"\nResults written to {output}")
+
+
+if __name__ == "__main__":
+    main()
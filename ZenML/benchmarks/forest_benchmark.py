@@ -0,0 +1,146 @@
+# MIT License
+# 
+# Copyright (c) ZenML GmbH 2024
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+# 
+
+"""Benchmark the compact random forest against the sklearn forest.
+
+A default `RandomForestClassifier`, as trained by `model_trainer` with
+`model_type=rf`, is fitted on synthetic data with the schema of the Breast
+Cancer dataset and flattened with `CompactForest.from_sklearn`. For every
+batch size the predictions of both are checked to be identical, and the
+time per call, the speedup and the pickle sizes are written to a CSV file.
+
+Run it from the project root:
+
+    python -m benchmarks.forest_benchmark --batch-sizes 1 --batch-sizes 100
+"""
+
+import csv
+import os
+import pickle
+import time
+from typing import List
+
+import click
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+
+from utils.forest import CompactForest
+from utils.synthetic import make_breast_cancer_like
+
+TARGET = "target"
+FIELDS = [
+    "batch_size",
+    "sklearn_ms",
+    "compact_ms",
+    "speedup",
+    "identical",
+    "sklearn_pickle_mb",
+    "compact_pickle_mb",
+    "size_reduction",
+]
+
+
+def _time_per_call(predict, batch: pd.DataFrame, min_seconds: float) -> float:
+    calls, start = 0, time.perf_counter()
+    while True:
+        predict(batch)
+        calls += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_seconds:
+            return elapsed / calls
+
+
+@click.command(help="Benchmark the compact random forest against sklearn.")
+@click.option(
+    "--batch-sizes",
+    multiple=True,
+    type=click.IntRange(min=1),
+    default=[1, 100, 100_000],
+    show_default=True,
+    help="Rows per predict call, can be repeated.",
+)
+@click.option(
+    "--train-rows",
+    default=20_000,
+    type=click.IntRange(min=10),
+    show_default=True,
+    help="Rows the forest is trained on, more rows give deeper trees.",
+)
+@click.option(
+    "--min-seconds",
+    default=1.0,
+    type=click.FloatRange(min=0.0),
+    show_default=True,
+    help="Minimum time spent calling predict for each batch size.",
+)
+@click.option(
+    "--output",
+    default=os.path.join(os.path.dirname(__file__), "results", "forest.csv"),
+    show_default=True,
+    help="CSV file the results are written to.",
+)
+def main(batch_sizes: List[int], train_rows: int, min_seconds: float, output: str):
+    """Benchmark entry point."""
+    dataset_trn = make_breast_cancer_like(train_rows)
+    forest = RandomForestClassifier(random_state=17).fit(
+        dataset_trn.drop(columns=[TARGET]), dataset_trn[TARGET]
+    )
+    compact_forest = CompactForest.from_sklearn(forest)
+    sklearn_pickle_mb = len(pickle.dumps(forest)) / 2**20
+    compact_pickle_mb = len(pickle.dumps(compact_forest)) / 2**20
+
+    dataset_inf = make_breast_cancer_like(max(batch_sizes), random_state=42).drop(
+        columns=[TARGET]
+    )
+    results = []
+    for batch_size in sorted(batch_sizes):
+        batch = dataset_inf.iloc[:batch_size]
+        sklearn_s = _time_per_call(forest.predict, batch, min_seconds)
+        compact_s = _time_per_call(compact_forest.predict, batch, min_seconds)
+        results.append(
+            {
+                "batch_size": batch_size,
+                "sklearn_ms": round(sklearn_s * 1000, 3),
+                "compact_ms": round(compact_s * 1000, 3),
+                "speedup": round(sklearn_s / compact_s, 2),
+                "identical": bool(
+                    np.array_equal(forest.predict(batch), compact_forest.predict(batch))
+                ),
+                "sklearn_pickle_mb": round(sklearn_pickle_mb, 2),
+                "compact_pickle_mb": round(compact_pickle_mb, 2),
+                "size_reduction": round(sklearn_pickle_mb / compact_pickle_mb, 2),
+            }
+        )
+
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDS, lineterminator="\n")
+        writer.writeheader()
+        writer.writerows(results)
+    print(pd.DataFrame(results, columns=FIELDS).to_string(index=False))
+    print(f"\nResults written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+# MIT License
+# 
+# Copyright (c) ZenML GmbH 2024
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+# 
+
+"""Benchmark incremental retraining against a full retraining.
+
+A model of each type, configured as `model_trainer` does, is trained on a
+base dataset with the schema of the Breast Cancer dataset. Rows are then
+appended to it. The model is retrained on the whole extended dataset, and
+separately continued on the appended rows only with
+`utils.incremental.continue_training`, as `model_trainer` does with
+`incremental=True`. The time of both and their accuracy on a held-out test
+set are written to a CSV file.
+
+The features are scaled with statistics of the base dataset, as the
+preprocessing pipeline of the feature engineering does.
+
+Run it from the project root:
+
+    python -m benchmarks.incremental_benchmark --new-rows 1000 --new-rows 10000
+"""
+
+import csv
+import os
+import time
+from typing import List
+
+import click
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import SGDClassifier
+from sklearn.preprocessing import StandardScaler
+
+from utils.incremental import appended_rows, continue_training
+from utils.synthetic import make_breast_cancer_like
+
+TARGET = "target"
+MODELS = {"sgd": SGDClassifier, "rf": RandomForestClassifier}
+FIELDS = [
+    "model_type",
+    "base_rows",
+    "new_rows",
+    "full_s",
+    "incremental_s",
+    "speedup",
+    "base_accuracy",
+    "full_accuracy",
+    "incremental_accuracy",
+]
+
+
+def _scaled(dataset: pd.DataFrame, scaler: StandardScaler) -> pd.DataFrame:
+    features = dataset.drop(columns=[TARGET])
+    scaled = pd.DataFrame(
+        scaler.transform(features), columns=features.columns, index=dataset.index
+    )
+    scaled[TARGET] = dataset[TARGET]
+    return scaled
+
+
+def _accuracy(model, dataset: pd.DataFrame) -> float:
+    return round(model.score(dataset.drop(columns=[TARGET]), dataset[TARGET]), 4)
+
+
+@click.command(help="Benchmark incremental retraining against a full retraining.")
+@click.option(
+    "--base-rows",
+    default=100_000,
+    type=click.IntRange(min=10),
+    show_default=True,
+    help="Rows the first model is trained on.",
+)
+@click.option(
+    "--new-rows",
+    multiple=True,
+    type=click.IntRange(min=1),
+    default=[1_000, 10_000],
+    show_default=True,
+    help="Rows appended before retraining, can be repeated.",
+)
+@click.option(
+    "--model-types",
+    multiple=True,
+    type=click.Choice(list(MODELS)),
+    default=list(MODELS),
+    show_default=True,
+    help="Model types to benchmark, can be repeated.",
+)
+@click.option(
+    "--output",
+    default=os.path.join(os.path.dirname(__file__), "results", "incremental.csv"),
+    show_default=True,
+    help="CSV file the results are written to.",
+)
+def main(base_rows: int, new_rows: List[int], model_types: List[str], output: str):
+    """Benchmark entry point."""
+    raw = make_breast_cancer_like(base_rows + max(new_rows))
+    scaler = StandardScaler().fit(raw.iloc[:base_rows].drop(columns=[TARGET]))
+    dataset = _scaled(raw, scaler)
+    dataset_tst = _scaled(make_breast_cancer_like(20_000, random_state=42), scaler)
+    base = dataset.iloc[:base_rows]
+
+    results = []
+    for model_type in model_types:
+        model = MODELS[model_type]().fit(base.drop(columns=[TARGET]), base[TARGET])
+        for n_new in sorted(new_rows):
+            extended = dataset.iloc[: base_rows + n_new]
+
+            start = time.perf_counter()
+            full = MODELS[model_type]().fit(
+                extended.drop(columns=[TARGET]), extended[TARGET]
+            )
+            full_s = time.perf_counter() - start
+
+            # Finding the appended rows is part of the incremental training
+            start = time.perf_counter()
+            delta = appended_rows(base, extended)
+            incremental = continue_training(model, base, delta, TARGET)
+            incremental_s = time.perf_counter() - start
+
+            results.append(
+                {
+                    "model_type": model_type,
+                    "base_rows": base_rows,
+                    "new_rows": n_new,
+                    "full_s": round(full_s, 3),
+                    "incremental_s": round(incremental_s, 3),
+                    "speedup": round(full_s / incremental_s, 1),
+                    "base_accuracy": _accuracy(model, dataset_tst),
+                    "full_accuracy": _accuracy(full, dataset_tst),
+                    "incremental_accuracy": _accuracy(incremental, dataset_tst),
+                }
+            )
+
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDS, lineterminator="\n")
+        writer.writeheader()
+        writer.writerows(results)
+    print(pd.DataFrame(results, columns=FIELDS).to_string(index=False))
+    print(f"\nResults written to {output}")
+
+
+if __name__ == "__main__":
+    main()
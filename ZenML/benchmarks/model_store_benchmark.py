@@ -0,0 +1,167 @@
+# MIT License
+# 
+# Copyright (c) ZenML GmbH 2024
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+# 
+
+"""Benchmark loading models from the compact format against pickle.
+
+A KNN classifier, a random forest and its compact forest are trained on
+synthetic data with the schema of the Breast Cancer dataset and saved both
+with `pickle.dump` and with `utils.model_store.save_model`. Every model is
+loaded in a fresh process, where the load time, the resident memory added
+by the load and by a first prediction of 100 rows, and the prediction time
+are measured. The results are written to a CSV file.
+
+Run it from the project root:
+
+    python -m benchmarks.model_store_benchmark --knn-rows 1000000
+"""
+
+import csv
+import multiprocessing
+import os
+import pickle
+import tempfile
+import time
+from typing import Any, Dict
+
+import click
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.neighbors import KNeighborsClassifier
+
+from utils.forest import CompactForest
+from utils.model_store import load_model, save_model
+from utils.profiling import _current_rss
+from utils.synthetic import make_breast_cancer_like
+
+TARGET = "target"
+FIELDS = [
+    "model",
+    "format",
+    "size_mb",
+    "load_ms",
+    "load_rss_mb",
+    "predict_ms",
+    "predict_rss_mb",
+]
+
+
+def _measure(path: str, fmt: str, batch: pd.DataFrame) -> Dict[str, Any]:
+    """Load the model at `path` and predict `batch`, in a fresh process."""
+    rss = _current_rss()
+    start = time.perf_counter()
+    if fmt == "pickle":
+        with open(path, "rb") as f:
+            model = pickle.load(f)
+    else:
+        model = load_model(path)
+    load_s = time.perf_counter() - start
+    load_rss = _current_rss()
+    start = time.perf_counter()
+    model.predict(batch)
+    predict_s = time.perf_counter() - start
+    return {
+        "load_ms": round(load_s * 1000, 1),
+        "load_rss_mb": round((load_rss - rss) / 2**20, 1),
+        "predict_ms": round(predict_s * 1000, 1),
+        "predict_rss_mb": round((_current_rss() - load_rss) / 2**20, 1),
+    }
+
+
+def _size(path: str) -> int:
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+
+
+@click.command(help="Benchmark loading models from the compact format.")
+@click.option(
+    "--knn-rows",
+    default=1_000_000,
+    type=click.IntRange(min=10),
+    show_default=True,
+    help="Rows the KNN classifier is fitted on.",
+)
+@click.option(
+    "--forest-rows",
+    default=100_000,
+    type=click.IntRange(min=10),
+    show_default=True,
+    help="Rows the random forest is trained on.",
+)
+@click.option(
+    "--output",
+    default=os.path.join(os.path.dirname(__file__), "results", "model_store.csv"),
+    show_default=True,
+    help="CSV file the results are written to.",
+)
+def main(knn_rows: int, forest_rows: int, output: str):
+    """Benchmark entry point."""
+    batch = make_breast_cancer_like(100, random_state=42).drop(columns=[TARGET])
+    knn_trn = make_breast_cancer_like(knn_rows)
+    forest_trn = make_breast_cancer_like(forest_rows)
+    forest = RandomForestClassifier(random_state=17).fit(
+        forest_trn.drop(columns=[TARGET]), forest_trn[TARGET]
+    )
+    models = {
+        "knn": KNeighborsClassifier().fit(
+            knn_trn.drop(columns=[TARGET]), knn_trn[TARGET]
+        ),
+        "rf": forest,
+        "compact_forest": CompactForest.from_sklearn(forest),
+    }
+    del knn_trn, forest_trn
+
+    results = []
+    context = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory() as workdir:
+        for name, model in models.items():
+            paths = {
+                "pickle": os.path.join(workdir, f"{name}.pkl"),
+                "compact": os.path.join(workdir, name),
+            }
+            with open(paths["pickle"], "wb") as f:
+                pickle.dump(model, f, protocol=pickle.HIGHEST_PROTOCOL)
+            save_model(model, paths["compact"])
+            for fmt, path in paths.items():
+                with context.Pool(1) as pool:
+                    measured = pool.apply(_measure, (path, fmt, batch))
+                results.append(
+                    {
+                        "model": name,
+                        "format": fmt,
+                        "size_mb": round(_size(path) / 2**20, 1),
+                        **measured,
+                    }
+                )
+
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDS, lineterminator="\n")
+        writer.writeheader()
+        writer.writerows(results)
+    print(pd.DataFrame(results, columns=FIELDS).to_string(index=False))
+    print(f"\nResults written to {output}")
+
+
+if __name__ == "__main__":
+    main()
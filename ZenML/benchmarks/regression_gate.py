@@ -0,0 +1,374 @@
+# MIT License
+# 
+# Copyright (c) ZenML GmbH 2024
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+# 
+
+"""Fail when a pipeline step needs more time or memory than its budget.
+
+The `feature_engineering`, `training` and `inference` pipelines are run end to
+end by `run.py`, one process per pipeline, on a synthetic dataset of a fixed
+number of rows and with every step profiled. They run on a fresh local ZenML
+store in a temporary folder, so the results neither depend on nor add to the
+runs of the project.
+
+The wall time, the peak RSS and the increase of the RSS of every step, as
+recorded in its `profile` metadata by `utils.profiling.profiled`, are compared
+with the budgets checked in to `benchmarks/budgets.yaml`. A measurement exceeds its budget when it is
+more than `tolerance` above it, relatively, and more than `min_excess` above
+it, absolutely, so that the noise of steps taking a few milliseconds or
+megabytes does not fail the gate. A per-step breakdown is printed and written
+to a CSV file, and the gate exits with an error if any budget is exceeded, or
+if a step was added or removed.
+
+Budgets are only meaningful on the machine they were measured on. Run it from
+the project root, and with `--update` to write the budgets of this machine:
+
+    python -m benchmarks.regression_gate
+    python -m benchmarks.regression_gate --update
+"""
+
+import csv
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+from typing import Any, Dict, List, Optional
+
+import click
+import pandas as pd
+import yaml
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Every pipeline runs in its own process, so that the peak memory of a step
+#  does not depend on what the previous pipelines left behind
+PIPELINE_FLAGS = {
+    "feature_engineering": "--feature-pipeline",
+    "training": "--training-pipeline",
+    "inference": "--inference-pipeline",
+}
+PIPELINE_TIMEOUT_S = 3600
+# The peak RSS of a step includes the memory of the process before it, so the
+#  memory the step itself needs is checked separately
+METRICS = ("wall_time_s", "peak_rss_mb", "peak_rss_increase_mb")
+DEFAULT_ROWS = 100_000
+DEFAULT_TOLERANCE = 0.3
+DEFAULT_MIN_EXCESS = {
+    "wall_time_s": 0.5,
+    "peak_rss_mb": 50.0,
+    "peak_rss_increase_mb": 16.0,
+}
+
+
+def _budget_field(metric: str) -> str:
+    name, unit = metric.rsplit("_", 1)
+    return f"{name}_budget_{unit}"
+
+
+def _ratio_field(metric: str) -> str:
+    return f"{metric.rsplit('_', 1)[0]}_ratio"
+
+
+FIELDS = [
+    "pipeline",
+    "step",
+    *[
+        field
+        for metric in METRICS
+        for field in (metric, _budget_field(metric), _ratio_field(metric))
+    ],
+    "status",
+]
+
+
+def run_pipelines(rows: int, zenml_folder: str) -> None:
+    """Run every pipeline with profiling on a fresh ZenML store.
+
+    Args:
+        rows: Rows of the synthetic dataset.
+        zenml_folder: Folder of the ZenML configuration and local store.
+
+    Raises:
+        click.ClickException: If a pipeline failed or timed out.
+    """
+    env = dict(
+        os.environ,
+        ZENML_CONFIG_PATH=zenml_folder,
+        ZENML_ANALYTICS_OPT_IN="false",
+    )
+    for name, flag in PIPELINE_FLAGS.items():
+        click.echo(f"Running the {name} pipeline on {rows} rows...")
+        log_path = os.path.join(zenml_folder, f"{name}.log")
+        command = [
+            sys.executable,
+            "run.py",
+            flag,
+            "--no-cache",
+            "--profile=basic",
+            f"--synthetic-rows={rows}",
+        ]
+        with open(log_path, "w") as log:
+            try:
+                result = subprocess.run(
+                    command,
+                    cwd=PROJECT_ROOT,
+                    env=env,
+                    stdout=log,
+                    stderr=subprocess.STDOUT,
+                    timeout=PIPELINE_TIMEOUT_S,
+                )
+                failure = f"exited with code {result.returncode}"
+                failed = result.returncode != 0
+            except subprocess.TimeoutExpired:
+                failure = f"did not finish in {PIPELINE_TIMEOUT_S} s"
+                failed = True
+        if failed:
+            with open(log_path) as log:
+                tail = "".join(log.readlines()[-30:])
+            raise click.ClickException(
+                f"The {name} pipeline {failure}:\n\n{tail}"
+            )
+
+
+def measured_profiles(zenml_folder: str) -> Dict[str, Dict[str, Dict[str, Any]]]:
+    """Step profiles of the runs in the ZenML store, by run key and step.
+
+    The runs of the training pipeline are keyed by the model version they
+    trained, e.g. `training_sgd`, the other runs by their pipeline name.
+    """
+    # ZenML reads its configuration path when it is first imported
+    os.environ["ZENML_CONFIG_PATH"] = zenml_folder
+    os.environ["ZENML_ANALYTICS_OPT_IN"] = "false"
+    from zenml.client import Client
+
+    from utils.profiling import step_profiles
+
+    profiles = {}
+    for run in Client().list_pipeline_runs(sort_by="asc:created", size=100):
+        key = run.pipeline.name
+        if key == "training" and run.model_version is not None:
+            key = f"training_{run.model_version.name}"
+        profiles[key] = step_profiles(run)
+    return profiles
+
+
+def _exceeds(
+    metric: str, measured: float, budget: float, tolerance: float, min_excess: Dict
+) -> bool:
+    excess = measured - budget
+    return excess > budget * tolerance and excess > min_excess[metric]
+
+
+def compare(
+    measured: Dict[str, Dict[str, Dict[str, Any]]],
+    budgets: Dict[str, Dict[str, Dict[str, float]]],
+    tolerance: float,
+    min_excess: Dict[str, float],
+) -> List[Dict[str, Any]]:
+    """Per-step breakdown of the measurements against their budgets.
+
+    Args:
+        measured: Step profiles by run key and step.
+        budgets: Budget of every metric by run key and step.
+        tolerance: Relative excess over a budget that is still accepted.
+        min_excess: Absolute excess per metric that is always accepted.
+
+    Returns:
+        One row per step, whose status is `ok`, the metrics over budget,
+        `no budget` for steps without budgets or `not run` for budgeted steps
+        that did not run.
+    """
+    rows = []
+    for key in sorted(set(measured) | set(budgets)):
+        steps = measured.get(key, {})
+        step_budgets = budgets.get(key, {})
+        for step_name in sorted(set(steps) | set(step_budgets)):
+            profile = steps.get(step_name)
+            budget = step_budgets.get(step_name)
+            row: Dict[str, Any] = {"pipeline": key, "step": step_name}
+            for metric in METRICS:
+                value = None if profile is None else profile[metric]
+                limit = None if budget is None else budget[metric]
+                row[metric] = value
+                row[_budget_field(metric)] = limit
+                row[_ratio_field(metric)] = (
+                    round(value / limit, 2) if value is not None and limit else None
+                )
+            if profile is None:
+                row["status"] = "not run"
+            elif budget is None:
+                row["status"] = "no budget"
+            else:
+                over = [
+                    metric
+                    for metric in METRICS
+                    if _exceeds(
+                        metric, profile[metric], budget[metric], tolerance, min_excess
+                    )
+                ]
+                row["status"] = "over " + ", ".join(over) if over else "ok"
+            rows.append(row)
+    return rows
+
+
+def _machine() -> Dict[str, Any]:
+    return {
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def write_budgets(
+    path: str,
+    measured: Dict[str, Dict[str, Dict[str, Any]]],
+    rows: int,
+    tolerance: float,
+    min_excess: Dict[str, float],
+) -> None:
+    """Write the measurements as the new budgets."""
+    budgets = {
+        "rows": rows,
+        "tolerance": tolerance,
+        "min_excess": min_excess,
+        "measured_on": _machine(),
+        "budgets": {
+            key: {
+                step_name: {metric: profile[metric] for metric in METRICS}
+                for step_name, profile in sorted(steps.items())
+            }
+            for key, steps in sorted(measured.items())
+        },
+    }
+    with open(path, "w") as f:
+        f.write(
+            "# Step budgets of the pipeline regression gate, written by\n"
+            "#  `python -m benchmarks.regression_gate --update`\n"
+        )
+        yaml.safe_dump(budgets, f, sort_keys=False)
+
+
+@click.command(help="Check the time and memory of every pipeline step.")
+@click.option(
+    "--budgets",
+    "budgets_path",
+    default=os.path.join(os.path.dirname(__file__), "budgets.yaml"),
+    show_default=True,
+    help="YAML file of the step budgets.",
+)
+@click.option(
+    "--tolerance",
+    default=None,
+    type=click.FloatRange(min=0.0),
+    help="Relative excess over a budget that is still accepted, instead of "
+    "the tolerance of the budgets file.",
+)
+@click.option(
+    "--rows",
+    default=None,
+    type=click.IntRange(min=20),
+    help="Rows of the synthetic dataset when updating the budgets, instead of "
+    f"those of the budgets file, or {DEFAULT_ROWS} without one.",
+)
+@click.option(
+    "--update",
+    is_flag=True,
+    default=False,
+    help="Write the measurements to the budgets file instead of checking them.",
+)
+@click.option(
+    "--output",
+    default=os.path.join(os.path.dirname(__file__), "results", "regression.csv"),
+    show_default=True,
+    help="CSV file the per-step breakdown is written to.",
+)
+def main(
+    budgets_path: str,
+    tolerance: Optional[float],
+    rows: Optional[int],
+    update: bool,
+    output: str,
+):
+    """Regression gate entry point."""
+    config: Dict[str, Any] = {}
+    if os.path.exists(budgets_path):
+        with open(budgets_path) as f:
+            config = yaml.safe_load(f) or {}
+    elif not update:
+        raise click.ClickException(
+            f"No budgets at {budgets_path}, write them with --update."
+        )
+    if rows is None:
+        rows = config.get("rows", DEFAULT_ROWS)
+    elif not update and rows != config["rows"]:
+        raise click.ClickException(
+            f"The budgets were measured on {config['rows']} rows, not {rows}."
+        )
+    if tolerance is None:
+        tolerance = config.get("tolerance", DEFAULT_TOLERANCE)
+    min_excess = {**DEFAULT_MIN_EXCESS, **config.get("min_excess", {})}
+
+    # The project configuration records the active stack of the store, which
+    #  running on another store resets
+    project_config = os.path.join(PROJECT_ROOT, ".zen", "config.yaml")
+    with open(project_config, "rb") as f:
+        project_config_content = f.read()
+    try:
+        with tempfile.TemporaryDirectory() as zenml_folder:
+            run_pipelines(rows, zenml_folder)
+            measured = measured_profiles(zenml_folder)
+    finally:
+        with open(project_config, "wb") as f:
+            f.write(project_config_content)
+
+    if update:
+        write_budgets(budgets_path, measured, rows, tolerance, min_excess)
+        click.echo(f"Budgets written to {budgets_path}")
+        return
+
+    if config.get("measured_on", {}).get("cpus") != os.cpu_count():
+        click.echo(
+            f"Warning: the budgets were measured with "
+            f"{config.get('measured_on', {}).get('cpus')} CPUs, this machine "
+            f"has {os.cpu_count()}."
+        )
+    results = compare(measured, config.get("budgets", {}), tolerance, min_excess)
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDS, lineterminator="\n")
+        writer.writeheader()
+        writer.writerows(results)
+    print(pd.DataFrame(results, columns=FIELDS).to_string(index=False))
+    print(f"\nResults written to {output}")
+
+    failed = [row for row in results if row["status"] != "ok"]
+    if failed:
+        raise click.ClickException(
+            f"{len(failed)} of {len(results)} steps are not within their "
+            f"budgets with a tolerance of {tolerance:.0%}: "
+            + ", ".join(f"{row['pipeline']}.{row['step']}" for row in failed)
+            + ". If the change is intended, update the budgets with --update."
+        )
+    print(f"All {len(results)} steps are within their budgets.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,300 @@
+# MIT License
+# 
+# Copyright (c) ZenML GmbH 2024
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+# 
+
+"""Benchmark the step functions on synthetic data of increasing size.
+
+The step functions are called directly, outside of any orchestrator, on
+synthetic datasets with the schema of the Breast Cancer dataset. For every
+step and dataset size the wall time, throughput, peak traced allocations and
+peak RSS are written to a CSV file that can be diffed between commits.
+
+Run it from the project root:
+
+    python -m benchmarks.steps_benchmark --sizes 1000 --sizes 100000
+"""
+
+import csv
+import importlib
+import os
+import time
+import tracemalloc
+from contextlib import ExitStack
+from typing import Any, Callable, Dict, List, Tuple
+from unittest import mock
+
+import click
+import pandas as pd
+
+from utils.synthetic import make_breast_cancer_like
+
+# The steps, and ZenML with them, are imported where they are used: the
+#  worker processes of the parallel preprocessor re-import this module
+
+TARGET = "target"
+FIELDS = [
+    "step",
+    "rows",
+    "width",
+    "na_rate",
+    "model_type",
+    "n_jobs",
+    "seconds",
+    "rows_per_s",
+    "peak_alloc_mb",
+    "peak_rss_mb",
+]
+
+# Outside of a pipeline run there is no step context to attach metadata to.
+#  The `steps` package shadows these modules with the step objects, so they
+#  are looked up with `importlib`.
+_METADATA_LOGGING_MODULES = [
+    "steps.data_preprocessor",
+    "steps.model_evaluator",
+    "steps.sharded_inference",
+]
+
+
+def _measure(
+    func: Callable[..., Any], repeat: int, **kwargs: Any
+) -> Tuple[Any, Dict[str, float]]:
+    from utils.profiling import StepProfiler
+
+    best: Dict[str, float] = {}
+    for _ in range(repeat):
+        tracemalloc.start()
+        with StepProfiler() as profiler:
+            start = time.perf_counter()
+            result = func(**kwargs)
+            seconds = time.perf_counter() - start
+        _, peak_alloc = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        if not best or seconds < best["seconds"]:
+            best = {
+                "seconds": seconds,
+                "peak_alloc_mb": peak_alloc / 2**20,
+                "peak_rss_mb": profiler.peak_rss / 2**20,
+            }
+    return result, best
+
+
+def benchmark_size(
+    n_rows: int,
+    width: int,
+    na_rate: float,
+    model_type: str,
+    repeat: int,
+    n_jobs: int = 1,
+) -> List[Dict[str, Any]]:
+    """Run every step once on a dataset of `n_rows` rows.
+
+    Args:
+        n_rows: Number of rows of the synthetic dataset.
+        width: Number of feature columns.
+        na_rate: Fraction of NA feature values.
+        model_type: The type of model to train, `sgd` or `rf`.
+        repeat: Number of runs per step, the fastest is reported.
+        n_jobs: Number of processes of the data preprocessor, and of row
+            shards of the sharded inference, which only runs above 1.
+
+    Returns:
+        One result record per step.
+    """
+    from steps import (
+        data_preprocessor,
+        data_splitter,
+        inference_predict,
+        inference_preprocessor,
+        model_evaluator,
+        model_trainer,
+        sharded_inference,
+    )
+
+    dataset = make_breast_cancer_like(n_rows, n_features=width, na_rate=na_rate)
+    results = []
+
+    def record(step_name: str, rows: int, measurement: Dict[str, float]):
+        results.append(
+            {
+                "step": step_name,
+                "rows": n_rows,
+                "width": width,
+                "na_rate": na_rate,
+                "model_type": model_type,
+                "n_jobs": n_jobs,
+                "seconds": round(measurement["seconds"], 4),
+                "rows_per_s": round(rows / measurement["seconds"]),
+                "peak_alloc_mb": round(measurement["peak_alloc_mb"], 1),
+                "peak_rss_mb": round(measurement["peak_rss_mb"], 1),
+            }
+        )
+
+    (dataset_trn, dataset_tst), measurement = _measure(
+        data_splitter.entrypoint, repeat, dataset=dataset
+    )
+    record("data_splitter", len(dataset), measurement)
+
+    (dataset_trn, dataset_tst, preprocess_pipeline), measurement = _measure(
+        data_preprocessor.entrypoint,
+        repeat,
+        random_state=17,
+        dataset_trn=dataset_trn,
+        dataset_tst=dataset_tst,
+        drop_na=na_rate > 0,
+        normalize=True,
+        target=TARGET,
+        n_jobs=n_jobs,
+    )
+    record("data_preprocessor", len(dataset_trn) + len(dataset_tst), measurement)
+
+    model, measurement = _measure(
+        model_trainer.entrypoint,
+        repeat,
+        dataset_trn=dataset_trn,
+        model_type=model_type,
+        target=TARGET,
+    )
+    record("model_trainer", len(dataset_trn), measurement)
+
+    _, measurement = _measure(
+        model_evaluator.entrypoint,
+        repeat,
+        model=model,
+        dataset_trn=dataset_trn,
+        dataset_tst=dataset_tst,
+        target=TARGET,
+    )
+    record("model_evaluator", len(dataset_trn) + len(dataset_tst), measurement)
+
+    dataset_inf = dataset.drop(columns=[TARGET])
+    if na_rate > 0:
+        dataset_inf = dataset_inf.dropna().reset_index(drop=True)
+    # The preprocessor adds the target column to its input
+    dataset_inf_raw = dataset_inf.copy()
+    dataset_inf, measurement = _measure(
+        inference_preprocessor.entrypoint,
+        repeat,
+        dataset_inf=dataset_inf,
+        preprocess_pipeline=preprocess_pipeline,
+        target=TARGET,
+    )
+    record("inference_preprocessor", len(dataset_inf), measurement)
+
+    _, measurement = _measure(
+        inference_predict.entrypoint, repeat, model=model, dataset_inf=dataset_inf
+    )
+    record("inference_predict", len(dataset_inf), measurement)
+
+    if n_jobs > 1:
+        # Preprocessing and prediction, compare with the sum of both steps
+        _, measurement = _measure(
+            sharded_inference.entrypoint,
+            repeat,
+            model=model,
+            dataset_inf=dataset_inf_raw,
+            preprocess_pipeline=preprocess_pipeline,
+            target=TARGET,
+            n_shards=n_jobs,
+        )
+        record("sharded_inference", len(dataset_inf_raw), measurement)
+    return results
+
+
+@click.command(help="Benchmark the ZenML steps on synthetic data.")
+@click.option(
+    "--sizes",
+    multiple=True,
+    type=click.IntRange(min=10),
+    default=[1_000, 10_000, 100_000],
+    show_default=True,
+    help="Dataset sizes in rows, can be repeated (e.g. up to 10000000).",
+)
+@click.option("--width", default=30, show_default=True, help="Feature columns.")
+@click.option(
+    "--na-rate",
+    default=0.0,
+    type=click.FloatRange(0.0, 1.0, max_open=True),
+    show_default=True,
+    help="Fraction of feature values replaced by NA.",
+)
+@click.option(
+    "--model-type",
+    default="sgd",
+    type=click.Choice(["sgd", "rf"]),
+    show_default=True,
+    help="The type of model to train.",
+)
+@click.option(
+    "--repeat",
+    default=1,
+    type=click.IntRange(min=1),
+    show_default=True,
+    help="Runs per step, the fastest run is reported.",
+)
+@click.option(
+    "--n-jobs",
+    default=1,
+    type=click.IntRange(min=1),
+    show_default=True,
+    help="Processes fitting and applying the preprocessing pipeline, and "
+    "row shards of the sharded inference.",
+)
+@click.option(
+    "--output",
+    default=os.path.join(os.path.dirname(__file__), "results", "steps.csv"),
+    show_default=True,
+    help="CSV file the results are written to.",
+)
+def main(
+    sizes: List[int],
+    width: int,
+    na_rate: float,
+    model_type: str,
+    repeat: int,
+    n_jobs: int,
+    output: str,
+):
+    """Benchmark entry point."""
+    results = []
+    with ExitStack() as stack:
+        for module in _METADATA_LOGGING_MODULES:
+            stack.enter_context(
+                mock.patch.object(
+                    importlib.import_module(module), "log_artifact_metadata"
+                )
+            )
+        for n_rows in sorted(sizes):
+            results.extend(
+                benchmark_size(n_rows, width, na_rate, model_type, repeat, n_jobs)
+            )
+
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDS, lineterminator="\n")
+        writer.writeheader()
+        writer.writerows(results)
+    print(pd.DataFrame(results, columns=FIELDS).to_string(index=False))
+    print(f"\nResults written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+# MIT License
+# 
+# Copyright (c) ZenML GmbH 2024
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+# 
+
+"""Materializer storing models in the compact format of `utils.model_store`."""
+
+import hashlib
+import os
+from typing import Any, ClassVar, Dict, Optional, Tuple, Type
+
+from sklearn.base import BaseEstimator, ClassifierMixin
+from zenml.enums import ArtifactType
+from zenml.io import fileio
+from zenml.materializers.base_materializer import BaseMaterializer
+from zenml.metadata.metadata_types import MetadataType
+
+from utils.forest import CompactForest
+from utils.model_store import HEADER_FILENAME, load_model, read_header, save_model
+
+
+class CompactModelMaterializer(BaseMaterializer):
+    """Stores models as memory-mappable arrays next to a small pickled skeleton.
+
+    On a local artifact store the model is written and memory-mapped in
+    place. On a remote one it goes through a local temporary directory,
+    which is kept until the end of the step that loads the model.
+
+    Steps select it with `@step(output_materializers=CompactModelMaterializer)`.
+    """
+
+    ASSOCIATED_TYPES: ClassVar[Tuple[Type[Any], ...]] = (
+        BaseEstimator,
+        ClassifierMixin,
+        CompactForest,
+    )
+    ASSOCIATED_ARTIFACT_TYPE: ClassVar[ArtifactType] = ArtifactType.MODEL
+    # Only used by the steps that select it with `output_materializers`
+    SKIP_REGISTRATION: ClassVar[bool] = True
+
+    _content_hash: Optional[str] = None
+
+    def load(self, data_type: Type[Any]) -> Any:
+        """Load the model, memory-mapping its arrays.
+
+        Args:
+            data_type: The type of the model.
+
+        Returns:
+            The model.
+
+        Raises:
+            RuntimeError: If the header does not match the recorded content
+                hash.
+        """
+        if self.artifact_store.config.is_local:
+            path = self.uri
+        else:
+            with self.get_temporary_directory(delete_at_exit=False) as path:
+                for filename in self.artifact_store.listdir(self.uri):
+                    fileio.copy(
+                        os.path.join(self.uri, str(filename)),
+                        os.path.join(path, str(filename)),
+                    )
+        # The header holds the checksums of every other file
+        if self.expected_content_hash is not None:
+            if self._hash_header(path) != self.expected_content_hash:
+                raise RuntimeError(
+                    f"The artifact at '{self.uri}' does not match its recorded "
+                    "content hash."
+                )
+        return load_model(path)
+
+    def save(self, data: Any) -> None:
+        """Save the model in the compact format.
+
+        Args:
+            data: The model.
+        """
+        if self.artifact_store.config.is_local:
+            save_model(data, self.uri)
+            self._content_hash = self._hash_header(self.uri)
+            return
+        with self.get_temporary_directory(delete_at_exit=True) as path:
+            save_model(data, path)
+            self._content_hash = self._hash_header(path)
+            for filename in os.listdir(path):
+                fileio.copy(
+                    os.path.join(path, filename),
+                    os.path.join(self.uri, filename),
+                    overwrite=True,
+                )
+
+    @staticmethod
+    def _hash_header(path: str) -> str:
+        with open(os.path.join(path, HEADER_FILENAME), "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()
+
+    def extract_metadata(self, data: Any) -> Dict[str, MetadataType]:
+        """Extract the format, library versions and array sizes of the model.
+
+        Args:
+            data: The model.
+
+        Returns:
+            The metadata.
+        """
+        if not self.artifact_store.config.is_local:
+            return {}
+        header = read_header(self.uri)
+        return {
+            "model_format": f"{header['format']} v{header['format_version']}",
+            "saved_with": ", ".join(
+                f"{name} {version}" for name, version in header["versions"].items()
+            ),
+            "mapped_arrays": len(header["arrays"]),
+        }
+
+    def compute_content_hash(self, data: Any) -> Optional[str]:
+        """Return the hash of the header written by `save`.
+
+        Args:
+            data: The saved model.
+
+        Returns:
+            The hash, or `None` if the model was not saved by this instance.
+        """
+        return self._content_hash
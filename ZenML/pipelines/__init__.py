@@ -21,6 +21,22 @@
 # SOFTWARE.
 # 
 
-from .feature_engineering import feature_engineering
-from .inference import inference
-from .training import training
+from typing import TYPE_CHECKING
+
+from utils.lazy import lazy_package
+
+if TYPE_CHECKING:
+    from .feature_engineering import feature_engineering
+    from .inference import inference
+    from .training import training
+
+# Pipelines are imported on first use, so that the CLI starts without
+#  importing every pipeline and step
+lazy_package(
+    __name__,
+    {
+        "feature_engineering": f"{__name__}.feature_engineering",
+        "inference": f"{__name__}.inference",
+        "training": f"{__name__}.training",
+    },
+)
@@ -30,6 +30,7 @@ from steps import (
     data_loader,
     data_preprocessor,
     data_splitter,
+    feature_sketcher,
 )
 
 logger = get_logger(__name__)
@@ -43,12 +44,17 @@ def feature_engineering(
     drop_columns: Optional[List[str]] = None,
     target: Optional[str] = "target",
     random_state: int = 17,
+    optimize_dtypes: Optional[bool] = None,
+    n_jobs: int = 1,
+    synthetic_rows: Optional[int] = None,
+    stable_split: bool = False,
 ):
     """
     Feature engineering pipeline.
 
     This is a pipeline that loads the data, processes it and splits
-    it into train and test sets.
+    it into train and test sets. The features of the raw train set are
+    sketched for drift detection at inference time.
 
     Args:
         test_size: Size of holdout set for training 0.0..1.0
@@ -57,17 +63,31 @@ def feature_engineering(
         drop_columns: List of columns to drop from dataset
         target: Name of target column in dataset
         random_state: Random state to configure the data loader
+        optimize_dtypes: If `True` columns are downcast to save memory
+        n_jobs: Number of processes preprocessing large datasets
+        synthetic_rows: If set, load a synthetic dataset of this many rows
+            instead of the Breast Cancer dataset
+        stable_split: If `True` rows are held out and split by the hash of
+            their values, so a grown dataset gives grown train and test sets,
+            as incremental training needs
 
     Returns:
         The processed datasets (dataset_trn, dataset_tst).
     """
     # Link all the steps together by calling them and passing the output
     # of one step as the input of the next step.
-    raw_data = data_loader(random_state=random_state, target=target)
+    raw_data = data_loader(
+        random_state=random_state,
+        target=target,
+        synthetic_rows=synthetic_rows,
+        stable=stable_split,
+    )
     dataset_trn, dataset_tst = data_splitter(
         dataset=raw_data,
         test_size=test_size,
+        stable=stable_split,
     )
+    feature_sketcher(dataset_trn=dataset_trn, target=target)
     dataset_trn, dataset_tst, _ = data_preprocessor(
         dataset_trn=dataset_trn,
         dataset_tst=dataset_tst,
@@ -76,5 +96,7 @@ def feature_engineering(
         drop_columns=drop_columns,
         target=target,
         random_state=random_state,
+        optimize_dtypes=optimize_dtypes,
+        n_jobs=n_jobs,
     )
     return dataset_trn, dataset_tst
@@ -21,30 +21,51 @@
 # SOFTWARE.
 # 
 
+from typing import Optional
+
 from zenml import get_pipeline_context, pipeline
 from zenml.logger import get_logger
 
 from steps import (
     data_loader,
+    drift_detector,
     inference_predict,
     inference_preprocessor,
+    sharded_inference,
 )
 
 logger = get_logger(__name__)
 
 
 @pipeline
-def inference(random_state: int, target: str):
+def inference(
+    random_state: int,
+    target: str,
+    use_compact_forest: bool = False,
+    detect_drift: bool = False,
+    n_shards: int = 1,
+    synthetic_rows: Optional[int] = None,
+):
     """
     Model inference pipeline.
 
     This is a pipeline that loads the inference data, processes it with
     the same preprocessing pipeline used in training, and runs inference
-    with the trained model.
+    with the trained model. Optionally, the inference data is compared
+    against the feature sketches of the training data to detect drift.
 
     Args:
         random_state: Random state for reproducibility.
         target: Name of target column in dataset.
+        use_compact_forest: Whether to also load the compact forest exported
+            with a random forest model, to predict small batches faster.
+        detect_drift: Whether to compare the inference data against the
+            feature sketches of the training data.
+        n_shards: Number of row shards preprocessed and predicted in parallel
+            worker processes, 1 to run the preprocessing and prediction steps
+            on the whole dataset.
+        synthetic_rows: If set, the inference data is taken from a synthetic
+            dataset of this many rows instead of the Breast Cancer dataset.
     """
     # Get the production model artifact
     model = get_pipeline_context().model.get_artifact("sklearn_classifier")
@@ -54,9 +75,32 @@ def inference(random_state: int, target: str):
         "preprocess_pipeline"
     )
 
+    # Get the compact forest exported with random forest models
+    compact_model = None
+    if use_compact_forest:
+        compact_model = get_pipeline_context().model.get_artifact("compact_forest")
+
     # Link all the steps together by calling them and passing the output
     #  of one step as the input of the next step.
-    df_inference = data_loader(random_state=random_state, is_inference=True)
+    df_inference = data_loader(
+        random_state=random_state, is_inference=True, synthetic_rows=synthetic_rows
+    )
+    if detect_drift:
+        drift_detector(
+            dataset_inf=df_inference,
+            feature_sketches=get_pipeline_context().model.get_artifact(
+                "feature_sketches"
+            ),
+        )
+    if n_shards > 1:
+        sharded_inference(
+            model=model,
+            dataset_inf=df_inference,
+            preprocess_pipeline=preprocess_pipeline,
+            target=target,
+            n_shards=n_shards,
+        )
+        return
     df_inference = inference_preprocessor(
         dataset_inf=df_inference,
         preprocess_pipeline=preprocess_pipeline,
@@ -65,4 +109,5 @@ def inference(random_state: int, target: str):
     inference_predict(
         model=model,
         dataset_inf=df_inference,
+        compact_model=compact_model,
     )
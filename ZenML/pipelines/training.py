@@ -31,7 +31,7 @@ from zenml.logger import get_logger
 from pipelines import (
     feature_engineering,
 )
-from steps import model_evaluator, model_promoter, model_trainer
+from steps import forest_exporter, model_evaluator, model_promoter, model_trainer
 
 logger = get_logger(__name__)
 
@@ -42,6 +42,10 @@ def training(
     test_dataset_id: Optional[UUID] = None,
     target: Optional[str] = "target",
     model_type: Optional[str] = "sgd",
+    incremental: bool = False,
+    approximate_evaluation: bool = False,
+    synthetic_rows: Optional[int] = None,
+    promote: bool = True,
 ):
     """
     Model training pipeline.
@@ -50,32 +54,56 @@ def training(
     trains a model on it and evaluates the model. If it is the first model
     to be trained, it will be promoted to production. If not, it will be
     promoted only if it has a higher accuracy than the current production
-    model version.
+    model version. Random forests are also exported as a compact forest.
 
     Args:
         train_dataset_id: ID of the train dataset produced by feature engineering.
         test_dataset_id: ID of the test dataset produced by feature engineering.
         target: Name of target column in dataset.
         model_type: The type of model to train.
+        incremental: Whether to continue the previous model on the rows
+            appended to its training dataset instead of training a new one.
+        approximate_evaluation: Whether to score the model only on as many
+            rows as the promotion decision needs.
+        synthetic_rows: If set, feature engineering loads a synthetic dataset
+            of this many rows instead of the Breast Cancer dataset.
+        promote: Whether to promote the model at the end of the run. Models
+            trained concurrently are promoted together once all are trained,
+            see `steps.model_promoter.promote_best_version`.
     """
     # Link all the steps together by calling them and passing the output
     # of one step as the input of the next step.
 
     # Execute Feature Engineering Pipeline
     if train_dataset_id is None or test_dataset_id is None:
-        dataset_trn, dataset_tst = feature_engineering()
+        # Incremental training needs the previous train set as a prefix of
+        #  the new one
+        dataset_trn, dataset_tst = feature_engineering(
+            synthetic_rows=synthetic_rows, stable_split=incremental
+        )
     else:
         client = Client()
         dataset_trn = client.get_artifact_version(name_id_or_prefix=train_dataset_id)
         dataset_tst = client.get_artifact_version(name_id_or_prefix=test_dataset_id)
 
-    model = model_trainer(dataset_trn=dataset_trn, target=target, model_type=model_type)
+    model = model_trainer(
+        dataset_trn=dataset_trn,
+        target=target,
+        model_type=model_type,
+        incremental=incremental,
+    )
+
+    # Random forests are also exported in a compact form for fast inference
+    if model_type == "rf":
+        forest_exporter(model=model)
 
     acc = model_evaluator(
         model=model,
         dataset_trn=dataset_trn,
         dataset_tst=dataset_tst,
         target=target,
+        approximate=approximate_evaluation,
     )
 
-    model_promoter(accuracy=acc)
+    if promote:
+        model_promoter(accuracy=acc)
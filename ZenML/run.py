@@ -21,21 +21,33 @@
 # SOFTWARE.
 # 
 
+import functools
+import logging
 import os
-from typing import Optional
+from typing import Any, Dict, List, Optional
 
 import click
 import yaml
-from zenml.client import Client
-from zenml.logger import get_logger
 
-from pipelines import (
-    feature_engineering,
-    inference,
-    training,
-)
+from utils.import_report import format_import_report
+from utils.orchestration import PipelineTask, format_timing_report, run_task_graph
+
+# ZenML, the pipelines and their steps are imported where they are used, so
+#  that `--help` does not pay for them and a single pipeline run only imports
+#  what that pipeline needs.
+
+PIPELINE_MODULES = {
+    "feature_engineering": "pipelines.feature_engineering",
+    "training": "pipelines.training",
+    "inference": "pipelines.inference",
+}
+
 
-logger = get_logger(__name__)
+@functools.lru_cache(maxsize=None)
+def _logger() -> logging.Logger:
+    from zenml.logger import get_logger
+
+    return get_logger(__name__)
 
 
 @click.command(
@@ -58,10 +70,42 @@ Examples:
   # Run the training pipeline with versioned artifacts
     python run.py --training-pipeline --train-dataset-version-name=1 --test-dataset-version-name=1
 
+  \b
+  # Continue the previous models on the rows appended to the train dataset
+    python run.py --training-pipeline --incremental
+
+  \b
+  # Score very large test sets only until the promotion decision is clear
+    python run.py --training-pipeline --approximate-evaluation
+
   \b
   # Run the inference pipeline
     python run.py --inference-pipeline
 
+  \b
+  # Preprocess and predict the inference data in 4 parallel row shards
+    python run.py --inference-pipeline --inference-shards=4
+
+  \b
+  # Run everything, training the SGD and RF models side by side
+    python run.py --feature-pipeline --training-pipeline --inference-pipeline --max-parallel=2
+
+  \b
+  # Run everything on a synthetic dataset of 10^5 rows
+    python run.py --feature-pipeline --training-pipeline --inference-pipeline --synthetic-rows=100000
+
+  \b
+  # Show where the startup time of the inference pipeline goes
+    python run.py --inference-pipeline --import-report
+
+  \b
+  # Export the production model for the online scoring service
+    python run.py --export-model-dir ../flake_example/model_store
+
+  \b
+  # Profile every step of the training pipeline and show the per-step trend
+    python run.py --training-pipeline --profile=basic --profile-report
+
 """
 )
 @click.option(
@@ -114,6 +158,75 @@ Examples:
     default=False,
     help="Disable caching for the pipeline run.",
 )
+@click.option(
+    "--incremental",
+    is_flag=True,
+    default=False,
+    help="Continue training the previous models on the rows appended to the "
+    "train dataset since they were trained, instead of training new ones. "
+    "The feature engineering then splits the data by row hash, so appended "
+    "rows extend the train dataset. Falls back to a full training when the "
+    "dataset is not append-only.",
+)
+@click.option(
+    "--approximate-evaluation",
+    is_flag=True,
+    default=False,
+    help="Score the models on stratified random batches of the datasets and "
+    "stop once the confidence intervals of the accuracies decide the "
+    "promotion, instead of scoring every row.",
+)
+@click.option(
+    "--max-parallel",
+    default=1,
+    type=click.IntRange(min=1),
+    help="Maximum number of pipelines running at the same time. Pipelines "
+    "that do not depend on each other (e.g. the SGD and RF trainings) run "
+    "concurrently in separate processes when this is above 1.",
+)
+@click.option(
+    "--inference-shards",
+    default=1,
+    type=click.IntRange(min=1),
+    help="Number of row shards the inference data is split into, each "
+    "preprocessed and predicted in its own worker process.",
+)
+@click.option(
+    "--synthetic-rows",
+    default=None,
+    type=click.IntRange(min=20),
+    help="Load a synthetic dataset of this many rows with the schema of the "
+    "Breast Cancer dataset instead of the real one, in all pipelines.",
+)
+@click.option(
+    "--profile",
+    default="off",
+    type=click.Choice(["off", "basic", "flame"]),
+    help="Record wall time, CPU time, peak RSS, rows and output bytes of every "
+    "step as `profile` artifact metadata. `flame` also records a sampled "
+    "flame profile.",
+)
+@click.option(
+    "--profile-report",
+    is_flag=True,
+    default=False,
+    help="Print the per-step performance trend of the latest profiled runs "
+    "of the selected pipelines (of all pipelines if none is selected).",
+)
+@click.option(
+    "--import-report",
+    is_flag=True,
+    default=False,
+    help="Instead of running, report where the import time of the selected "
+    "pipelines (of all pipelines if none is selected) goes.",
+)
+@click.option(
+    "--export-model-dir",
+    default=None,
+    type=click.Path(file_okay=False),
+    help="Export the production model and its preprocessing pipeline to this "
+    "folder for online serving, after the selected pipelines ran.",
+)
 def main(
     train_dataset_name: str = "dataset_trn",
     train_dataset_version_name: Optional[str] = None,
@@ -123,6 +236,15 @@ def main(
     training_pipeline: bool = False,
     inference_pipeline: bool = False,
     no_cache: bool = False,
+    incremental: bool = False,
+    approximate_evaluation: bool = False,
+    max_parallel: int = 1,
+    inference_shards: int = 1,
+    synthetic_rows: Optional[int] = None,
+    profile: str = "off",
+    profile_report: bool = False,
+    import_report: bool = False,
+    export_model_dir: Optional[str] = None,
 ):
     """Main entry point for the pipeline execution.
 
@@ -131,7 +253,8 @@ def main(
       * configuring pipeline with the required parameters
         (some of which may come from command line arguments, but most
         of which comes from the YAML config files)
-      * launching the pipeline
+      * launching the pipelines, concurrently where they do not depend
+        on each other, and reporting their critical path
 
     Args:
         train_dataset_name: The name of the train dataset produced by feature engineering.
@@ -144,36 +267,59 @@ def main(
         training_pipeline: Whether to run the pipeline that trains the model.
         inference_pipeline: Whether to run the pipeline that performs inference.
         no_cache: If `True` cache will be disabled.
+        incremental: Whether to continue training the previous models.
+        approximate_evaluation: Whether to stop scoring the models early.
+        max_parallel: Maximum number of pipelines running at the same time.
+        inference_shards: Number of parallel row shards of the inference data.
+        synthetic_rows: Rows of the synthetic dataset loaded instead of the
+            Breast Cancer dataset, `None` to load the real one.
+        profile: Step profiling mode, one of `off`, `basic` or `flame`.
+        profile_report: Whether to print the per-step performance trend.
+        import_report: Whether to only report the import time of the pipelines.
+        export_model_dir: Folder to export the production model to.
     """
-    client = Client()
+    selected = {
+        "feature_engineering": feature_pipeline,
+        "training": training_pipeline,
+        "inference": inference_pipeline,
+    }
+    if import_report:
+        modules = [
+            PIPELINE_MODULES[name]
+            for name, is_selected in selected.items()
+            if is_selected or not any(selected.values())
+        ]
+        click.echo(format_import_report(["run", *modules]))
+        return
 
     config_folder = os.path.join(
         os.path.dirname(os.path.realpath(__file__)),
         "configs",
     )
 
-    # Execute Feature Engineering Pipeline
+    if profile != "off":
+        from utils.profiling import PROFILING_ENV
+
+        # Set before any pipeline runs so that worker processes inherit it
+        os.environ[PROFILING_ENV] = "flame" if profile == "flame" else "1"
+
+    tasks = []
     if feature_pipeline:
-        pipeline_args = {}
-        if no_cache:
-            pipeline_args["enable_cache"] = False
-        pipeline_args["config_path"] = os.path.join(
-            config_folder, "feature_engineering.yaml"
-        )
-        run_args_feature = {}
-        feature_engineering.with_options(**pipeline_args)(**run_args_feature)
-        logger.info("Feature Engineering pipeline finished successfully!\n")
-
-        train_dataset_artifact = client.get_artifact_version(train_dataset_name)
-        test_dataset_artifact = client.get_artifact_version(test_dataset_name)
-        logger.info(
-            "The latest feature engineering pipeline produced the following "
-            f"artifacts: \n\n1. Train Dataset - Name: {train_dataset_name}, "
-            f"Version Name: {train_dataset_artifact.version} \n2. Test Dataset: "
-            f"Name: {test_dataset_name}, Version Name: {test_dataset_artifact.version}"
+        tasks.append(
+            PipelineTask(
+                name="feature_engineering",
+                target=run_feature_engineering,
+                kwargs={
+                    "config_folder": config_folder,
+                    "no_cache": no_cache,
+                    "train_dataset_name": train_dataset_name,
+                    "test_dataset_name": test_dataset_name,
+                    "synthetic_rows": synthetic_rows,
+                    "stable_split": incremental,
+                },
+            )
         )
 
-    # Execute Training Pipeline
     if training_pipeline:
         run_args_train = {}
 
@@ -184,6 +330,9 @@ def main(
                 train_dataset_version_name is not None
                 and test_dataset_version_name is not None
             )
+            from zenml.client import Client
+
+            client = Client()
             train_dataset_artifact_version = client.get_artifact_version(
                 train_dataset_name, train_dataset_version_name
             )
@@ -195,48 +344,250 @@ def main(
             run_args_train["train_dataset_id"] = train_dataset_artifact_version.id
             run_args_train["test_dataset_id"] = test_dataset_artifact_version.id
 
-        # Run the SGD pipeline
-        pipeline_args = {}
-        if no_cache:
-            pipeline_args["enable_cache"] = False
-        pipeline_args["config_path"] = os.path.join(config_folder, "training_sgd.yaml")
-        training.with_options(**pipeline_args)(**run_args_train)
-        logger.info("Training pipeline with SGD finished successfully!\n\n")
-
-        # Run the RF pipeline
-        pipeline_args = {}
-        if no_cache:
-            pipeline_args["enable_cache"] = False
-        pipeline_args["config_path"] = os.path.join(config_folder, "training_rf.yaml")
-        training.with_options(**pipeline_args)(**run_args_train)
-        logger.info("Training pipeline with RF finished successfully!\n\n")
+        if incremental:
+            run_args_train["incremental"] = True
+        if approximate_evaluation:
+            run_args_train["approximate_evaluation"] = True
+        if synthetic_rows is not None:
+            run_args_train["synthetic_rows"] = synthetic_rows
+        # Side by side, both trainings would compare their model with the
+        #  same production model and the last one to finish would be promoted
+        promote_separately = max_parallel > 1
+        if promote_separately:
+            run_args_train["promote"] = False
+
+        # The SGD and RF trainings only depend on the features, so they can
+        #  run side by side
+        training_configs = []
+        for model_type, label in (("sgd", "SGD"), ("rf", "RF")):
+            training_configs.append(
+                os.path.join(config_folder, f"training_{model_type}.yaml")
+            )
+            tasks.append(
+                PipelineTask(
+                    name=f"training_{model_type}",
+                    target=run_training,
+                    kwargs={
+                        "config_path": training_configs[-1],
+                        "no_cache": no_cache,
+                        "run_args_train": run_args_train,
+                        "label": label,
+                    },
+                    depends_on=["feature_engineering"] if feature_pipeline else [],
+                )
+            )
+        if promote_separately:
+            tasks.append(
+                PipelineTask(
+                    name="promotion",
+                    target=run_promotion,
+                    kwargs={"config_paths": training_configs},
+                    depends_on=[
+                        task.name
+                        for task in tasks
+                        if task.name.startswith("training")
+                    ],
+                )
+            )
 
     if inference_pipeline:
-        run_args_inference = {}
-        pipeline_args = {"enable_cache": False}
-        pipeline_args["config_path"] = os.path.join(config_folder, "inference.yaml")
+        # Inference uses the production model, which the trainings may promote
+        training_tasks = [
+            task.name
+            for task in tasks
+            if task.name.startswith("training") or task.name == "promotion"
+        ]
+        tasks.append(
+            PipelineTask(
+                name="inference",
+                target=run_inference,
+                kwargs={
+                    "config_folder": config_folder,
+                    "n_shards": inference_shards,
+                    "synthetic_rows": synthetic_rows,
+                },
+                depends_on=training_tasks,
+            )
+        )
+
+    if tasks:
+        timings = run_task_graph(tasks, max_parallel=max_parallel)
+        _logger().info(
+            "Pipeline timing report:\n\n" + format_timing_report(tasks, timings)
+        )
 
-        # Configure the pipeline
-        inference_configured = inference.with_options(**pipeline_args)
+    if export_model_dir:
+        from utils.export import export_model_version
 
-        # Fetch the production model
-        with open(pipeline_args["config_path"], "r") as f:
+        with open(os.path.join(config_folder, "inference.yaml"), "r") as f:
             config = yaml.load(f, Loader=yaml.SafeLoader)
-        zenml_model = client.get_model_version(
-            config["model"]["name"], config["model"]["version"]
+        path = export_model_version(
+            config["model"]["name"], config["model"]["version"], export_model_dir
         )
-        preprocess_pipeline_artifact = zenml_model.get_artifact("preprocess_pipeline")
-
-        # Use the metadata of feature engineering pipeline artifact
-        #  to get the random state and target column
-        random_state = preprocess_pipeline_artifact.run_metadata["random_state"].value
-        target = preprocess_pipeline_artifact.run_metadata["target"].value
-        run_args_inference["random_state"] = random_state
-        run_args_inference["target"] = target
-
-        # Run the pipeline
-        inference_configured(**run_args_inference)
-        logger.info("Inference pipeline finished successfully!")
+        _logger().info(f"Production model exported to {path}")
+
+    if profile_report:
+        from utils.profiling import step_performance_trend
+
+        for pipeline_name, is_selected in selected.items():
+            if is_selected or not any(selected.values()):
+                trend = step_performance_trend(pipeline_name)
+                if trend.empty:
+                    _logger().info(f"No profiled runs of `{pipeline_name}` found.")
+                else:
+                    _logger().info(
+                        f"Step performance trend of `{pipeline_name}`:\n\n"
+                        f"{trend.to_string()}\n"
+                    )
+
+
+def run_feature_engineering(
+    config_folder: str,
+    no_cache: bool,
+    train_dataset_name: str,
+    test_dataset_name: str,
+    synthetic_rows: Optional[int] = None,
+    stable_split: bool = False,
+):
+    """Run the feature engineering pipeline and report the produced datasets.
+
+    Args:
+        config_folder: Folder containing the pipeline YAML configs.
+        no_cache: If `True` cache will be disabled.
+        train_dataset_name: The name of the train dataset produced by feature engineering.
+        test_dataset_name: The name of the test dataset produced by feature engineering.
+        synthetic_rows: Rows of the synthetic dataset to load, `None` to load
+            the Breast Cancer dataset.
+        stable_split: Whether to hold out and split the rows by their hash,
+            for incremental training.
+    """
+    from zenml.client import Client
+
+    from pipelines import feature_engineering
+
+    pipeline_args = {}
+    if no_cache:
+        pipeline_args["enable_cache"] = False
+    pipeline_args["config_path"] = os.path.join(
+        config_folder, "feature_engineering.yaml"
+    )
+    run_args_feature = {}
+    if synthetic_rows is not None:
+        run_args_feature["synthetic_rows"] = synthetic_rows
+    if stable_split:
+        run_args_feature["stable_split"] = True
+    feature_engineering.with_options(**pipeline_args)(**run_args_feature)
+    _logger().info("Feature Engineering pipeline finished successfully!\n")
+
+    client = Client()
+    train_dataset_artifact = client.get_artifact_version(train_dataset_name)
+    test_dataset_artifact = client.get_artifact_version(test_dataset_name)
+    _logger().info(
+        "The latest feature engineering pipeline produced the following "
+        f"artifacts: \n\n1. Train Dataset - Name: {train_dataset_name}, "
+        f"Version Name: {train_dataset_artifact.version} \n2. Test Dataset: "
+        f"Name: {test_dataset_name}, Version Name: {test_dataset_artifact.version}"
+    )
+
+
+def run_training(
+    config_path: str,
+    no_cache: bool,
+    run_args_train: Dict[str, Any],
+    label: str,
+):
+    """Run the training pipeline with one of the training configs.
+
+    Args:
+        config_path: Path of the training YAML config.
+        no_cache: If `True` cache will be disabled.
+        run_args_train: Run arguments of the training pipeline.
+        label: Human readable name of the trained model type.
+    """
+    from pipelines import training
+
+    pipeline_args = {}
+    if no_cache:
+        pipeline_args["enable_cache"] = False
+    pipeline_args["config_path"] = config_path
+    training.with_options(**pipeline_args)(**run_args_train)
+    _logger().info(f"Training pipeline with {label} finished successfully!\n\n")
+
+
+def run_promotion(config_paths: List[str]):
+    """Promote the most accurate of the model versions trained side by side.
+
+    Args:
+        config_paths: Paths of the YAML configs of the trainings.
+    """
+    from steps.model_promoter import promote_best_version
+
+    models = []
+    for config_path in config_paths:
+        with open(config_path, "r") as f:
+            config = yaml.load(f, Loader=yaml.SafeLoader)
+        models.append((config["model"]["name"], config["model"]["version"]))
+    for model_name in dict.fromkeys(name for name, _ in models):
+        promote_best_version(
+            model_name, [version for name, version in models if name == model_name]
+        )
+
+
+def run_inference(
+    config_folder: str, n_shards: int = 1, synthetic_rows: Optional[int] = None
+):
+    """Run the inference pipeline with the production model.
+
+    Args:
+        config_folder: Folder containing the pipeline YAML configs.
+        n_shards: Number of parallel row shards of the inference data.
+        synthetic_rows: Rows of the synthetic dataset the inference data is
+            taken from, `None` to take it from the Breast Cancer dataset.
+    """
+    from zenml.client import Client
+
+    from pipelines import inference
+
+    run_args_inference = {}
+    pipeline_args = {"enable_cache": False}
+    pipeline_args["config_path"] = os.path.join(config_folder, "inference.yaml")
+
+    # Configure the pipeline
+    inference_configured = inference.with_options(**pipeline_args)
+
+    # Fetch the production model
+    with open(pipeline_args["config_path"], "r") as f:
+        config = yaml.load(f, Loader=yaml.SafeLoader)
+    zenml_model = Client().get_model_version(
+        config["model"]["name"], config["model"]["version"]
+    )
+    preprocess_pipeline_artifact = zenml_model.get_artifact("preprocess_pipeline")
+
+    # Use the metadata of feature engineering pipeline artifact
+    #  to get the random state and target column
+    metadata = {
+        key: getattr(value, "value", value)
+        for key, value in preprocess_pipeline_artifact.run_metadata.items()
+    }
+    random_state = metadata["random_state"]
+    target = metadata["target"]
+    run_args_inference["random_state"] = random_state
+    run_args_inference["target"] = target
+    # Random forest versions also come with a faster compact forest
+    run_args_inference["use_compact_forest"] = (
+        zenml_model.get_artifact("compact_forest") is not None
+    )
+    # Versions trained with feature engineering have training data sketches
+    run_args_inference["detect_drift"] = (
+        zenml_model.get_artifact("feature_sketches") is not None
+    )
+    run_args_inference["n_shards"] = n_shards
+    if synthetic_rows is not None:
+        run_args_inference["synthetic_rows"] = synthetic_rows
+
+    # Run the pipeline
+    inference_configured(**run_args_inference)
+    _logger().info("Inference pipeline finished successfully!")
 
 
 if __name__ == "__main__":
@@ -21,27 +21,40 @@
 # SOFTWARE.
 # 
 
-from .data_loader import (
-    data_loader,
-)
-from .data_preprocessor import (
-    data_preprocessor,
-)
-from .data_splitter import (
-    data_splitter,
-)
-from .inference_predict import (
-    inference_predict,
-)
-from .inference_preprocessor import (
-    inference_preprocessor,
-)
-from .model_evaluator import (
-    model_evaluator,
-)
-from .model_promoter import (
-    model_promoter,
-)
-from .model_trainer import (
-    model_trainer,
+from typing import TYPE_CHECKING
+
+from utils.lazy import lazy_package
+
+if TYPE_CHECKING:
+    from .data_loader import data_loader
+    from .data_preprocessor import data_preprocessor
+    from .data_splitter import data_splitter
+    from .drift_detector import drift_detector
+    from .feature_sketcher import feature_sketcher
+    from .forest_exporter import forest_exporter
+    from .inference_predict import inference_predict
+    from .inference_preprocessor import inference_preprocessor
+    from .model_evaluator import model_evaluator
+    from .model_promoter import model_promoter
+    from .model_trainer import model_trainer
+    from .sharded_inference import sharded_inference
+
+# Steps are imported on first use, so that running one pipeline does not
+#  import the dependencies of all the others
+lazy_package(
+    __name__,
+    {
+        "data_loader": f"{__name__}.data_loader",
+        "data_preprocessor": f"{__name__}.data_preprocessor",
+        "data_splitter": f"{__name__}.data_splitter",
+        "drift_detector": f"{__name__}.drift_detector",
+        "feature_sketcher": f"{__name__}.feature_sketcher",
+        "forest_exporter": f"{__name__}.forest_exporter",
+        "inference_predict": f"{__name__}.inference_predict",
+        "inference_preprocessor": f"{__name__}.inference_preprocessor",
+        "model_evaluator": f"{__name__}.model_evaluator",
+        "model_promoter": f"{__name__}.model_promoter",
+        "model_trainer": f"{__name__}.model_trainer",
+        "sharded_inference": f"{__name__}.sharded_inference",
+    },
 )
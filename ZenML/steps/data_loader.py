@@ -21,18 +21,29 @@
 # SOFTWARE.
 # 
 
+from typing import Optional
+
 import pandas as pd
 from sklearn.datasets import load_breast_cancer
 from typing_extensions import Annotated
 from zenml import step
 from zenml.logger import get_logger
 
+from utils.incremental import stable_fraction
+from utils.profiling import profiled
+from utils.synthetic import make_breast_cancer_like
+
 logger = get_logger(__name__)
 
 
 @step
+@profiled
 def data_loader(
-    random_state: int, is_inference: bool = False, target: str = "target"
+    random_state: int,
+    is_inference: bool = False,
+    target: str = "target",
+    synthetic_rows: Optional[int] = None,
+    stable: bool = False,
 ) -> Annotated[pd.DataFrame, "dataset"]:
     """Dataset reader step.
 
@@ -50,14 +61,27 @@ def data_loader(
         is_inference: If `True` subset will be returned and target column
             will be removed from dataset.
         target: Name of target columns in dataset.
+        synthetic_rows: If set, a synthetic dataset of this many rows with the
+            schema of the Breast Cancer dataset is loaded instead, see
+            `utils/synthetic.py`.
+        stable: If `True` the inference subset is chosen by the hash of every
+            row instead of sampled, so it keeps the same rows, in the same
+            order, when rows are appended to the dataset.
 
     Returns:
         The dataset artifact as Pandas DataFrame and name of target column.
     """
-    dataset = load_breast_cancer(as_frame=True)
-    inference_size = int(len(dataset.target) * 0.05)
-    dataset: pd.DataFrame = dataset.frame
-    inference_subset = dataset.sample(inference_size, random_state=random_state)
+    if synthetic_rows is None:
+        dataset: pd.DataFrame = load_breast_cancer(as_frame=True).frame
+    else:
+        dataset = make_breast_cancer_like(
+            synthetic_rows, random_state=random_state, target=target
+        )
+    if stable:
+        inference_subset = dataset[stable_fraction(dataset, "inference") < 0.05]
+    else:
+        inference_size = int(len(dataset) * 0.05)
+        inference_subset = dataset.sample(inference_size, random_state=random_state)
     if is_inference:
         dataset = inference_subset
         dataset.drop(columns=target, inplace=True)
@@ -28,11 +28,25 @@ from sklearn.pipeline import Pipeline
 from sklearn.preprocessing import MinMaxScaler
 from typing_extensions import Annotated
 from zenml import log_artifact_metadata, step
+from zenml.logger import get_logger
 
-from utils.preprocess import ColumnsDropper, DataFrameCaster, NADropper
+from utils.preprocess import (
+    ColumnsDropper,
+    DataFrameCaster,
+    DtypeOptimizer,
+    NADropper,
+)
+from utils.parallel_preprocess import ShardedPreprocessor
+from utils.profiling import profiled
+
+logger = get_logger(__name__)
+
+# Rows used to train the probe models of the accuracy-equivalence check
+_PROBE_ROWS = 100_000
 
 
 @step
+@profiled
 def data_preprocessor(
     random_state: int,
     dataset_trn: pd.DataFrame,
@@ -41,6 +55,9 @@ def data_preprocessor(
     normalize: Optional[bool] = None,
     drop_columns: Optional[List[str]] = None,
     target: Optional[str] = "target",
+    optimize_dtypes: Optional[bool] = None,
+    dtype_accuracy_tolerance: float = 0.005,
+    n_jobs: int = 1,
 ) -> Tuple[
     Annotated[pd.DataFrame, "dataset_trn"],
     Annotated[pd.DataFrame, "dataset_tst"],
@@ -57,8 +74,8 @@ def data_preprocessor(
     This step is parameterized, which allows you to configure the step
     independently of the step code, before running it in a pipeline.
     In this example, the step can be configured to drop NA values, drop some
-    columns and normalize numerical columns. See the documentation for more
-    information:
+    columns, normalize numerical columns and downcast column types to save
+    memory. See the documentation for more information:
 
         https://docs.zenml.io/how-to/build-pipelines/use-pipeline-step-parameters
 
@@ -70,6 +87,13 @@ def data_preprocessor(
         normalize: If `True` all numeric fields will be normalized.
         drop_columns: List of column names to drop.
         target: Name of target column in dataset.
+        optimize_dtypes: If `True` columns are downcast to the smallest safe
+            types (e.g. float32) and low cardinality columns to categoricals.
+        dtype_accuracy_tolerance: Maximum accuracy drop of a probe model trained
+            on the downcast data before the downcasting is rejected, checked
+            only when float columns are rounded to float32.
+        n_jobs: Number of processes fitting and applying the pipeline on row
+            shards of large datasets, with the same result as a single process.
 
     Returns:
         The processed datasets (dataset_trn, dataset_tst) and fitted `Pipeline` object.
@@ -85,8 +109,44 @@ def data_preprocessor(
         # Normalize the data
         preprocess_pipeline.steps.append(("normalize", MinMaxScaler()))
     preprocess_pipeline.steps.append(("cast", DataFrameCaster(dataset_trn.columns)))
-    dataset_trn = preprocess_pipeline.fit_transform(dataset_trn)
-    dataset_tst = preprocess_pipeline.transform(dataset_tst)
+    with ShardedPreprocessor(preprocess_pipeline, n_jobs=n_jobs) as sharded:
+        dataset_trn = sharded.fit_transform(dataset_trn)
+        dataset_tst = sharded.transform(dataset_tst)
+
+    if optimize_dtypes:
+        # The optimizer becomes the last step of the pipeline, so the
+        #  inference preprocessing applies exactly the same types
+        optimizer = DtypeOptimizer().fit(dataset_trn)
+        optimized_trn = optimizer.transform(dataset_trn)
+        optimized_tst = optimizer.transform(dataset_tst)
+        # Only rounding floats can change what a model learns, the other
+        #  conversions keep every value
+        if not optimizer.rounded_columns_ or _accuracy_equivalent(
+            (dataset_trn, dataset_tst),
+            (optimized_trn, optimized_tst),
+            target=target,
+            random_state=random_state,
+            tolerance=dtype_accuracy_tolerance,
+        ):
+            for name, before, after in (
+                ("dataset_trn", dataset_trn, optimized_trn),
+                ("dataset_tst", dataset_tst, optimized_tst),
+            ):
+                log_artifact_metadata(
+                    artifact_name=name,
+                    metadata={
+                        "memory_bytes_before": _memory_usage(before),
+                        "memory_bytes_after": _memory_usage(after),
+                    },
+                )
+            preprocess_pipeline.steps.append(("optimize_dtypes", optimizer))
+            dataset_trn, dataset_tst = optimized_trn, optimized_tst
+        else:
+            logger.warning(
+                "Downcasting the column types changes the accuracy of a probe "
+                "model by more than "
+                f"{dtype_accuracy_tolerance*100:.2f}%, keeping the original types."
+            )
 
     # Log metadata so we can load it in the inference pipeline
     log_artifact_metadata(
@@ -94,3 +154,33 @@ def data_preprocessor(
         metadata={"random_state": random_state, "target": target},
     )
     return dataset_trn, dataset_tst, preprocess_pipeline
+
+
+def _memory_usage(dataset: pd.DataFrame) -> int:
+    return int(dataset.memory_usage(deep=True).sum())
+
+
+def _accuracy_equivalent(
+    original: Tuple[pd.DataFrame, pd.DataFrame],
+    optimized: Tuple[pd.DataFrame, pd.DataFrame],
+    target: str,
+    random_state: int,
+    tolerance: float,
+) -> bool:
+    """Check that a probe model scores the same on original and downcast data."""
+    from sklearn.linear_model import SGDClassifier
+
+    accuracies = []
+    for dataset_trn, dataset_tst in (original, optimized):
+        dataset_trn = dataset_trn.head(_PROBE_ROWS)
+        dataset_tst = dataset_tst.head(_PROBE_ROWS)
+        probe = SGDClassifier(random_state=random_state)
+        probe.fit(dataset_trn.drop(columns=[target]), dataset_trn[target])
+        accuracies.append(
+            probe.score(dataset_tst.drop(columns=[target]), dataset_tst[target])
+        )
+    logger.info(
+        f"Probe accuracy with original types={accuracies[0]*100:.2f}%, "
+        f"with downcast types={accuracies[1]*100:.2f}%"
+    )
+    return accuracies[0] - accuracies[1] <= tolerance
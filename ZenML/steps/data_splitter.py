@@ -28,10 +28,14 @@ from sklearn.model_selection import train_test_split
 from typing_extensions import Annotated
 from zenml import step
 
+from utils.incremental import stable_fraction
+from utils.profiling import profiled
+
 
 @step
+@profiled
 def data_splitter(
-    dataset: pd.DataFrame, test_size: float = 0.2
+    dataset: pd.DataFrame, test_size: float = 0.2, stable: bool = False
 ) -> Tuple[
     Annotated[pd.DataFrame, "raw_dataset_trn"],
     Annotated[pd.DataFrame, "raw_dataset_tst"],
@@ -51,16 +55,24 @@ def data_splitter(
     Args:
         dataset: Dataset read from source.
         test_size: 0.0..1.0 defining portion of test set.
+        stable: If `True` every row goes to the train or test set by the hash
+            of its values and the rows keep their order, so appending rows to
+            the dataset appends rows to both sets. Used by incremental
+            training, which needs the previous train set as a prefix.
 
     Returns:
         The split dataset: dataset_trn, dataset_tst.
     """
-    dataset_trn, dataset_tst = train_test_split(
-        dataset,
-        test_size=test_size,
-        random_state=42,
-        shuffle=True,
-    )
+    if stable:
+        in_test = stable_fraction(dataset, "split") < test_size
+        dataset_trn, dataset_tst = dataset[~in_test], dataset[in_test]
+    else:
+        dataset_trn, dataset_tst = train_test_split(
+            dataset,
+            test_size=test_size,
+            random_state=42,
+            shuffle=True,
+        )
     dataset_trn = pd.DataFrame(dataset_trn, columns=dataset.columns)
     dataset_tst = pd.DataFrame(dataset_tst, columns=dataset.columns)
     return dataset_trn, dataset_tst
@@ -0,0 +1,94 @@
+# MIT License
+# 
+# Copyright (c) ZenML GmbH 2024
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+# 
+
+import pandas as pd
+from typing_extensions import Annotated
+from zenml import log_artifact_metadata, step
+from zenml.logger import get_logger
+
+from utils.profiling import profiled
+from utils.sketches import FeatureSketches
+
+logger = get_logger(__name__)
+
+
+@step
+@profiled
+def drift_detector(
+    dataset_inf: pd.DataFrame,
+    feature_sketches: FeatureSketches,
+    chunk_rows: int = 100_000,
+    psi_threshold: float = 0.2,
+    min_rows: int = 500,
+) -> Annotated[FeatureSketches, "inference_sketches"]:
+    """Compare the inference dataset against the training feature sketches.
+
+    The inference dataset is sketched in one pass over chunks of rows, with
+    the bin edges of the training sketches. The per-chunk sketches are merged,
+    so chunks could equally be sketched in parallel. The population stability
+    index, NA rates and mean shifts of the features are attached as `drift`
+    metadata to the inference sketches.
+
+    Args:
+        dataset_inf: The raw inference dataset.
+        feature_sketches: Sketches of the raw train dataset.
+        chunk_rows: Number of rows sketched at once.
+        psi_threshold: PSI above which a feature is reported as drifted.
+        min_rows: Minimum number of rows to report drifted features, the PSI
+            of smaller datasets is dominated by sampling noise.
+
+    Returns:
+        The sketches of the inference dataset.
+    """
+    inference_sketches = feature_sketches.empty_like()
+    for start in range(0, len(dataset_inf), chunk_rows):
+        chunk_sketches = feature_sketches.empty_like()
+        chunk_sketches.update(dataset_inf.iloc[start : start + chunk_rows])
+        inference_sketches.merge(chunk_sketches)
+
+    drift = inference_sketches.drift(feature_sketches)
+    drifted = []
+    if len(dataset_inf) < min_rows:
+        logger.info(
+            f"Only {len(dataset_inf)} inference rows, at least {min_rows} are "
+            "needed to report data drift."
+        )
+    else:
+        drifted = drift.index[drift["psi"] > psi_threshold].tolist()
+    if drifted:
+        logger.warning(f"Data drift detected in features: {drifted}")
+    log_artifact_metadata(
+        metadata={
+            "drift": {
+                "rows": len(dataset_inf),
+                "max_psi": round(float(drift["psi"].max()), 4) if len(drift) else 0.0,
+                "psi_threshold": psi_threshold,
+                "drifted_features": drifted,
+                "psi": drift["psi"].round(4).to_dict(),
+                "na_rate": drift["na_rate"].round(4).to_dict(),
+                "mean_shift": drift["mean_shift"].round(4).to_dict(),
+            }
+        },
+        artifact_name="inference_sketches",
+    )
+    return inference_sketches
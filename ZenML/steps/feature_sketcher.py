@@ -0,0 +1,62 @@
+# MIT License
+# 
+# Copyright (c) ZenML GmbH 2024
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+# 
+
+from typing import Optional
+
+import pandas as pd
+from typing_extensions import Annotated
+from zenml import step
+from zenml.logger import get_logger
+
+from utils.profiling import profiled
+from utils.sketches import FeatureSketches
+
+logger = get_logger(__name__)
+
+
+@step
+@profiled
+def feature_sketcher(
+    dataset_trn: pd.DataFrame,
+    target: Optional[str] = "target",
+    n_bins: int = 10,
+) -> Annotated[FeatureSketches, "feature_sketches"]:
+    """Sketch the features of the raw training dataset.
+
+    The sketches summarize every numeric feature with a histogram over
+    quantile bins, its NA rate and its moments. The inference pipeline
+    compares the inference data against them to detect data drift.
+
+    Args:
+        dataset_trn: The raw train dataset.
+        target: Name of target column in dataset.
+        n_bins: Number of equal-frequency bins of the histograms.
+
+    Returns:
+        The feature sketches.
+    """
+    feature_sketches = FeatureSketches.from_frame(
+        dataset_trn, n_bins=n_bins, exclude=[target]
+    )
+    logger.info(f"Sketched {len(feature_sketches.sketches)} features.")
+    return feature_sketches
@@ -15,20 +15,25 @@
 # limitations under the License.
 #
 
-from typing import Any
+from typing import Any, Optional
 
 import pandas as pd
 from typing_extensions import Annotated
 from zenml import step
 from zenml.logger import get_logger
 
+from utils.forest import SMALL_BATCH_ROWS, CompactForest
+from utils.profiling import profiled
+
 logger = get_logger(__name__)
 
 
 @step
+@profiled
 def inference_predict(
     model: Any,
     dataset_inf: pd.DataFrame,
+    compact_model: Optional[CompactForest] = None,
 ) -> Annotated[pd.Series, "predictions"]:
     """Predictions step.
 
@@ -45,12 +50,17 @@ def inference_predict(
     Args:
         model: Trained model.
         dataset_inf: The inference dataset.
+        compact_model: Compact form of the trained random forest, used instead
+            of the model for small batches where it is faster.
 
     Returns:
         The predictions as pandas series
     """
     # run prediction from memory
-    predictions = model.predict(dataset_inf)
+    if compact_model is not None and len(dataset_inf) <= SMALL_BATCH_ROWS:
+        predictions = compact_model.predict(dataset_inf)
+    else:
+        predictions = model.predict(dataset_inf)
 
     predictions = pd.Series(predictions, name="predicted")
     return predictions
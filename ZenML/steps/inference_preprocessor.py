@@ -20,8 +20,11 @@ from sklearn.pipeline import Pipeline
 from typing_extensions import Annotated
 from zenml import step
 
+from utils.profiling import profiled
+
 
 @step
+@profiled
 def inference_preprocessor(
     dataset_inf: pd.DataFrame,
     preprocess_pipeline: Pipeline,
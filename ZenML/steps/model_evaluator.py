@@ -21,17 +21,61 @@
 # SOFTWARE.
 # 
 
-from typing import Optional
+from typing import Any, Optional
 
 import pandas as pd
 from sklearn.base import ClassifierMixin
-from zenml import log_artifact_metadata, step
+from zenml import get_step_context, log_artifact_metadata, log_metadata, step
+from zenml.client import Client
 from zenml.logger import get_logger
+from zenml.steps.step_context import StepContext
+
+from steps.model_promoter import MIN_ACCURACY, stage_accuracy
+from utils.profiling import profiled
+from utils.progressive import AccuracyEstimate, exact_accuracy, progressive_accuracy
 
 logger = get_logger(__name__)
 
 
+def _model_artifact() -> Optional[Any]:
+    """Artifact version of the evaluated model, `None` outside of a step."""
+    # Benchmarks call the step function directly, outside of any step
+    if StepContext.get() is None:
+        return None
+    models = get_step_context().inputs.get("model")
+    if not models:
+        return None
+    return models[0] if isinstance(models, list) else models
+
+
+def _previous_model_id(model_artifact: Optional[Any]) -> Optional[str]:
+    """ID of the model the evaluated model was incrementally trained from."""
+    if model_artifact is None:
+        return None
+    previous_id = model_artifact.run_metadata.get("previous_model_id")
+    return None if previous_id is None else getattr(previous_id, "value", previous_id)
+
+
+def _production_accuracy() -> Optional[float]:
+    """Test accuracy of the production version of the current model."""
+    if StepContext.get() is None or get_step_context().model is None:
+        return None
+    return stage_accuracy(get_step_context().model.name)
+
+
+def _format(name: str, estimate: AccuracyEstimate) -> str:
+    if estimate.exact:
+        return f"{name} accuracy={estimate.accuracy*100:.2f}%"
+    return (
+        f"{name} accuracy={estimate.accuracy*100:.2f}% "
+        f"({estimate.confidence*100:.0f}% interval {estimate.lower*100:.2f}% "
+        f"to {estimate.upper*100:.2f}%, {estimate.rows} of "
+        f"{estimate.total_rows} rows scored)"
+    )
+
+
 @step
+@profiled
 def model_evaluator(
     model: ClassifierMixin,
     dataset_trn: pd.DataFrame,
@@ -39,6 +83,11 @@ def model_evaluator(
     min_train_accuracy: float = 0.0,
     min_test_accuracy: float = 0.0,
     target: Optional[str] = "target",
+    max_accuracy_drop: float = 0.01,
+    approximate: bool = False,
+    confidence: float = 0.95,
+    tolerance: float = 0.005,
+    batch_rows: int = 10_000,
 ) -> float:
     """Evaluate a trained model.
 
@@ -64,6 +113,14 @@ def model_evaluator(
 
         https://docs.zenml.io/how-to/build-pipelines/use-pipeline-step-parameters
 
+    By default every row is scored. With `approximate`, the rows are scored
+    in stratified random batches until the confidence interval of each
+    accuracy is clear of the thresholds it is compared with: the minimum
+    accuracies, and for the test accuracy the promotion threshold and the
+    accuracy of the production model. On very large datasets this scores a
+    small fraction of the rows. The interval and the number of rows scored
+    are logged with the accuracies.
+
     Args:
         model: The pre-trained model artifact.
         dataset_trn: The train dataset.
@@ -71,21 +128,51 @@ def model_evaluator(
         min_train_accuracy: Minimal acceptable training accuracy value.
         min_test_accuracy: Minimal acceptable testing accuracy value.
         target: Name of target column in dataset.
+        max_accuracy_drop: For a model trained incrementally, the largest
+            acceptable drop of test accuracy from the model it continued.
+        approximate: Whether to stop scoring as soon as the accuracies are
+            known well enough for the promotion decision.
+        confidence: Confidence level of the approximate accuracy intervals.
+        tolerance: Half-width of the interval at which approximate scoring
+            stops even if a threshold is still inside it.
+        batch_rows: Number of rows scored between two checks of the interval.
 
     Returns:
         The model accuracy on the test set.
+
+    Raises:
+        RuntimeError: If an incrementally trained model is less accurate on
+            the test set than the model it continued, by more than
+            `max_accuracy_drop`.
     """
+    def accuracy(model, dataset, thresholds) -> AccuracyEstimate:
+        if not approximate:
+            return exact_accuracy(model, dataset, target)
+        return progressive_accuracy(
+            model,
+            dataset,
+            target,
+            thresholds=thresholds,
+            confidence=confidence,
+            tolerance=tolerance,
+            batch_rows=batch_rows,
+        )
+
     # Calculate the model accuracy on the train and test set
-    trn_acc = model.score(
-        dataset_trn.drop(columns=[target]),
-        dataset_trn[target],
-    )
-    tst_acc = model.score(
-        dataset_tst.drop(columns=[target]),
-        dataset_tst[target],
+    trn = accuracy(model, dataset_trn, [min_train_accuracy])
+    tst = accuracy(
+        model,
+        dataset_tst,
+        # Production accuracy is only needed to stop approximate scoring
+        [
+            min_test_accuracy,
+            MIN_ACCURACY,
+            _production_accuracy() if approximate else None,
+        ],
     )
-    logger.info(f"Train accuracy={trn_acc*100:.2f}%")
-    logger.info(f"Test accuracy={tst_acc*100:.2f}%")
+    trn_acc, tst_acc = trn.accuracy, tst.accuracy
+    logger.info(_format("Train", trn))
+    logger.info(_format("Test", tst))
 
     messages = []
     if trn_acc < min_train_accuracy:
@@ -100,8 +187,44 @@ def model_evaluator(
         for message in messages:
             logger.warning(message)
 
-    log_artifact_metadata(
-        metadata={"train_accuracy": float(trn_acc), "test_accuracy": float(tst_acc)},
-        artifact_name="sklearn_classifier",
-    )
+    metadata = {
+        "train_accuracy": float(trn_acc),
+        "test_accuracy": float(tst_acc),
+        "evaluation_mode": "approximate" if approximate else "exact",
+    }
+    if approximate:
+        metadata["evaluation"] = {
+            name: {
+                "interval": [estimate.lower, estimate.upper],
+                "confidence": estimate.confidence,
+                "rows_scored": estimate.rows,
+                "total_rows": estimate.total_rows,
+            }
+            for name, estimate in (("train", trn), ("test", tst))
+        }
+    model_artifact = _model_artifact()
+    previous_id = _previous_model_id(model_artifact)
+    if previous_id is not None:
+        # Both models are scored on the current test set, so a drop comes
+        #  from the incremental update and not from a different test set
+        previous_model = Client().get_artifact_version(previous_id).load()
+        prev = accuracy(previous_model, dataset_tst, [tst_acc + max_accuracy_drop])
+        prev_acc = prev.accuracy
+        logger.info(_format("Previous model test", prev))
+        metadata["previous_model_test_accuracy"] = float(prev_acc)
+    if model_artifact is not None:
+        # The promoter reads the test accuracy of the production model from
+        #  its model artifact, not from the output of this step
+        log_metadata(metadata=metadata, artifact_version_id=model_artifact.id)
+    else:
+        log_artifact_metadata(
+            metadata=metadata,
+            artifact_name="sklearn_classifier",
+        )
+    if previous_id is not None and tst_acc < prev_acc - max_accuracy_drop:
+        raise RuntimeError(
+            f"Incrementally trained model test accuracy {tst_acc*100:.2f}% is "
+            f"more than {max_accuracy_drop*100:.2f}% below the "
+            f"{prev_acc*100:.2f}% of the model it continued, retrain it fully."
+        )
     return float(tst_acc)
@@ -21,14 +21,99 @@
 # SOFTWARE.
 # 
 
+from typing import List, Optional
+
 from zenml import get_step_context, step
 from zenml.client import Client
 from zenml.logger import get_logger
 
+from utils.profiling import profiled
+
 logger = get_logger(__name__)
 
+# Models with a lower test accuracy are never promoted
+MIN_ACCURACY = 0.8
+
+
+def stage_accuracy(model_name: str, stage: str = "production") -> Optional[float]:
+    """Test accuracy of the model version in `stage`.
+
+    Args:
+        model_name: Name of the model.
+        stage: Stage of the model version.
+
+    Returns:
+        The test accuracy, or `None` if no model version is in this stage or
+        it has no recorded test accuracy.
+    """
+    try:
+        stage_model = Client().get_model_version(model_name, stage)
+    except KeyError:
+        return None
+    model_artifact = stage_model.get_artifact("sklearn_classifier")
+    if model_artifact is None or "test_accuracy" not in model_artifact.run_metadata:
+        return None
+    accuracy = model_artifact.run_metadata["test_accuracy"]
+    return float(getattr(accuracy, "value", accuracy))
+
+
+def should_promote(accuracy: float, current_accuracy: Optional[float]) -> bool:
+    """Whether a model of this test accuracy replaces the one in the stage."""
+    if accuracy < MIN_ACCURACY:
+        logger.info(
+            f"Model accuracy {accuracy*100:.2f}% is below {MIN_ACCURACY*100:.0f}% ! "
+            "Not promoting model."
+        )
+        return False
+    if current_accuracy is not None and accuracy <= current_accuracy:
+        logger.info(
+            f"Model accuracy {accuracy*100:.2f}% is not above the "
+            f"{current_accuracy*100:.2f}% of the current model. Not promoting model."
+        )
+        return False
+    return True
+
+
+def promote_best_version(
+    model_name: str, versions: List[str], stage: str = "production"
+) -> Optional[str]:
+    """Promote the most accurate of several model versions.
+
+    Model versions trained concurrently would each be compared with the same
+    model in the stage, and the last one promoted would win. They are trained
+    without promotion instead, and this promotes the best of them once all
+    are trained, under the same conditions as `model_promoter`.
+
+    Args:
+        model_name: Name of the model.
+        versions: Names of the candidate model versions.
+        stage: Which stage to promote the model to.
+
+    Returns:
+        The name of the promoted version, or `None` if none was promoted.
+    """
+    accuracies = {}
+    for version in versions:
+        accuracy = stage_accuracy(model_name, version)
+        if accuracy is not None:
+            accuracies[version] = accuracy
+    if not accuracies:
+        logger.info("No model version with a test accuracy to promote.")
+        return None
+    best = max(accuracies, key=accuracies.get)
+    logger.info(
+        f"Most accurate model version is `{best}` with "
+        f"{accuracies[best]*100:.2f}%."
+    )
+    if not should_promote(accuracies[best], stage_accuracy(model_name, stage)):
+        return None
+    Client().get_model_version(model_name, best).set_stage(stage, force=True)
+    logger.info(f"Model version `{best}` promoted to {stage}!")
+    return best
+
 
 @step
+@profiled
 def model_promoter(accuracy: float, stage: str = "production") -> bool:
     """Model promoter step.
 
@@ -46,37 +131,13 @@ def model_promoter(accuracy: float, stage: str = "production") -> bool:
     Returns:
         Whether the model was promoted or not.
     """
-    is_promoted = False
+    # Get the model in the current context
+    current_model = get_step_context().model
 
-    if accuracy < 0.8:
-        logger.info(
-            f"Model accuracy {accuracy*100:.2f}% is below 80% ! Not promoting model."
-        )
-    else:
+    # Compare with the model that is in the production stage, if any
+    prod_accuracy = stage_accuracy(current_model.name, stage)
+    is_promoted = should_promote(float(accuracy), prod_accuracy)
+    if is_promoted:
+        current_model.set_stage(stage, force=True)
         logger.info(f"Model promoted to {stage}!")
-        is_promoted = True
-
-        # Get the model in the current context
-        current_model = get_step_context().model
-
-        # Get the model that is in the production stage
-        client = Client()
-        try:
-            stage_model = client.get_model_version(
-                current_model.name, stage
-            )
-            # We compare their metrics
-            prod_accuracy = (
-                stage_model.get_artifact("sklearn_classifier")
-                .run_metadata["test_accuracy"]
-                .value
-            )
-            if float(accuracy) > float(prod_accuracy):
-                # If current model has better metrics, we promote it
-                is_promoted = True
-                current_model.set_stage(stage, force=True)
-        except KeyError:
-            # If no such model exists, current one is promoted
-            is_promoted = True
-            current_model.set_stage(stage, force=True)
     return is_promoted
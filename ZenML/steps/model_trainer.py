@@ -21,24 +21,59 @@
 # SOFTWARE.
 # 
 
-from typing import Optional
+from typing import Any, Dict, Optional, Tuple
 
 import pandas as pd
 from sklearn.base import ClassifierMixin
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.linear_model import SGDClassifier
 from typing_extensions import Annotated
-from zenml import ArtifactConfig, step
+from zenml import ArtifactConfig, get_step_context, log_artifact_metadata, step
+from zenml.client import Client
 from zenml.logger import get_logger
+from zenml.steps.step_context import StepContext
+
+from materializers.compact_model_materializer import CompactModelMaterializer
+from utils.incremental import appended_rows, continue_training
+from utils.profiling import profiled
 
 logger = get_logger(__name__)
 
 
-@step
+def _previous_training() -> Optional[Tuple[ClassifierMixin, pd.DataFrame, str]]:
+    """Latest model of the current model version and the data it was trained on.
+
+    Returns:
+        The model, its training dataset and the model artifact version ID, or
+        `None` if the step runs without a model version or it has no model yet.
+    """
+    if StepContext.get() is None or get_step_context().model is None:
+        return None
+    previous = get_step_context().model.get_artifact("sklearn_classifier")
+    if previous is None:
+        return None
+    inputs = Client().get_run_step(previous.producer_step_run_id).inputs
+    datasets = inputs.get("dataset_trn")
+    if not datasets:
+        return None
+    dataset = datasets[0] if isinstance(datasets, list) else datasets
+    return previous.load(), dataset.load(), str(previous.id)
+
+
+def _log_training(metadata: Dict[str, Any]) -> None:
+    """Attach the training metadata to the trained model, inside a step only."""
+    # Benchmarks call the step function directly, where the latest model of
+    #  the store would otherwise get the metadata
+    if StepContext.get() is None:
+        return
+    log_artifact_metadata(metadata=metadata, artifact_name="sklearn_classifier")
+
+
+@step(output_materializers=CompactModelMaterializer)
+@profiled
 def model_trainer(
     dataset_trn: pd.DataFrame,
     model_type: str = "sgd",
     target: Optional[str] = "target",
+    incremental: bool = False,
 ) -> Annotated[
     ClassifierMixin, ArtifactConfig(name="sklearn_classifier", is_model_artifact=True)
 ]:
@@ -53,6 +88,11 @@ def model_trainer(
         dataset_trn: The preprocessed train dataset.
         model_type: The type of model to train.
         target: The name of the target column in the dataset.
+        incremental: Whether to continue training the previous model of the
+            model version on the rows appended to its training dataset,
+            instead of training a new model on the whole dataset. Falls back
+            to a full training when there is no previous model, or the
+            dataset is not the previous one with rows appended.
 
     Returns:
         The trained model artifact.
@@ -62,16 +102,71 @@ def model_trainer(
     """
     # Initialize the model with the hyperparameters indicated in the step
     # parameters and train it on the training set.
+    # The estimators are imported here so that only the selected one is loaded
     if model_type == "sgd":
+        from sklearn.linear_model import SGDClassifier
+
         model = SGDClassifier()
     elif model_type == "rf":
+        from sklearn.ensemble import RandomForestClassifier
+
         model = RandomForestClassifier()
     else:
         raise ValueError(f"Unknown model type {model_type}")
-    logger.info(f"Training model {model}...")
 
+    if incremental:
+        updated = _train_incrementally(model, dataset_trn, target)
+        if updated is not None:
+            return updated
+
+    logger.info(f"Training model {model}...")
     model.fit(
         dataset_trn.drop(columns=[target]),
         dataset_trn[target],
     )
+    _log_training({"training_mode": "full", "trained_rows": len(dataset_trn)})
     return model
+
+
+def _train_incrementally(
+    model: ClassifierMixin, dataset_trn: pd.DataFrame, target: str
+) -> Optional[ClassifierMixin]:
+    """Continue the previous model on the new rows, `None` to train fully."""
+    previous = _previous_training()
+    if previous is None:
+        logger.info("No previous model to continue, training a new one.")
+        return None
+    previous_model, previous_dataset, previous_id = previous
+    if type(previous_model) is not type(model):
+        logger.info(
+            f"Previous model is a {type(previous_model).__name__}, "
+            "training a new one."
+        )
+        return None
+    delta = appended_rows(previous_dataset, dataset_trn)
+    if delta is None:
+        logger.info(
+            "Training dataset is not the previous one with rows appended, "
+            "training a new model."
+        )
+        return None
+    if delta.empty:
+        logger.info("No new training rows, keeping the previous model.")
+        updated = previous_model
+    else:
+        logger.info(f"Continuing model {previous_model} on {len(delta)} new rows...")
+        updated = continue_training(previous_model, previous_dataset, delta, target)
+        if updated is None:
+            logger.info(
+                "The new rows cannot update the previous model, training a new one."
+            )
+            return None
+    _log_training(
+        {
+            "training_mode": "incremental",
+            "trained_rows": len(dataset_trn),
+            "new_rows": len(delta),
+            "previous_model_id": previous_id,
+        }
+    )
+    return updated
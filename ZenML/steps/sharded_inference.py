@@ -0,0 +1,164 @@
+# MIT License
+# 
+# Copyright (c) ZenML GmbH 2024
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+# 
+
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List
+
+import numpy as np
+import pandas as pd
+from sklearn.pipeline import Pipeline
+from typing_extensions import Annotated
+from zenml import log_artifact_metadata, step
+from zenml.logger import get_logger
+
+from utils.inference_shards import init_worker, predict_shard, wait_started
+from utils.profiling import profiled
+
+logger = get_logger(__name__)
+
+# Below this many rows per shard, a worker process costs more than it saves
+MIN_SHARD_ROWS = 10_000
+
+# Longest wait for the worker processes to start and receive the model
+START_TIMEOUT_S = 600.0
+
+
+def _shard_report(
+    bounds: np.ndarray,
+    timings: List[Dict[str, Any]],
+    finished: List[float],
+    startup_s: float,
+) -> Dict[str, Any]:
+    """Per shard timings, and how much longer the slowest shard took."""
+    shards = [
+        {
+            "shard": i,
+            "first_row": int(bounds[i]),
+            **timing,
+            "busy_s": timing["preprocess_s"] + timing["predict_s"],
+            "finished_s": finished[i],
+        }
+        for i, timing in enumerate(timings)
+    ]
+    busy = np.array([shard["busy_s"] for shard in shards])
+    return {
+        "n_shards": len(shards),
+        "startup_s": startup_s,
+        "wall_s": max(finished),
+        # The wall time is at least the slowest shard, so a skew of 1.5
+        #  means the workers waited a third of the time for the slowest one
+        "skew": float(busy.max() / busy.mean()) if busy.mean() > 0 else 1.0,
+        "shards": shards,
+    }
+
+
+@step
+@profiled
+def sharded_inference(
+    model: Any,
+    dataset_inf: pd.DataFrame,
+    preprocess_pipeline: Pipeline,
+    target: str,
+    n_shards: int = 2,
+) -> Annotated[pd.Series, "predictions"]:
+    """Preprocess and predict the inference data in parallel row shards.
+
+    Does what `inference_preprocessor` and `inference_predict` do, on `n_shards`
+    contiguous row ranges of the inference dataset, each in its own worker
+    process. The model and the preprocessing pipeline are sent to every worker
+    once, when it starts. The predictions of the shards are concatenated in
+    the order of the rows, so they are identical to the serial ones.
+
+    Shards have at least `MIN_SHARD_ROWS` rows, so small datasets use fewer
+    shards, and a single shard runs in the step process. The rows, process
+    and timings of every shard, and the skew of the slowest shard over the
+    average, are logged and attached as `shards` metadata to the predictions.
+
+    Args:
+        model: Trained model.
+        dataset_inf: The inference dataset.
+        preprocess_pipeline: Pretrained `Pipeline` to process dataset.
+        target: Name of target columns in dataset.
+        n_shards: Number of row shards and worker processes.
+
+    Returns:
+        The predictions as pandas series
+    """
+    n_shards = max(1, min(n_shards, len(dataset_inf) // MIN_SHARD_ROWS))
+    bounds = np.linspace(0, len(dataset_inf), n_shards + 1).astype(int)
+    finished = [0.0] * n_shards
+
+    startup_s = 0.0
+    if n_shards == 1:
+        start = time.perf_counter()
+        init_worker(model, preprocess_pipeline)
+        try:
+            results = [predict_shard(dataset_inf.copy(), target)]
+        finally:
+            init_worker(None, None)
+        finished[0] = time.perf_counter() - start
+    else:
+        context = multiprocessing.get_context("spawn")
+        start = time.perf_counter()
+        with ProcessPoolExecutor(
+            max_workers=n_shards,
+            mp_context=context,
+            initializer=init_worker,
+            initargs=(model, preprocess_pipeline, context.Barrier(n_shards)),
+        ) as executor:
+            pids = list(executor.map(wait_started, [START_TIMEOUT_S] * n_shards))
+            startup_s = time.perf_counter() - start
+            logger.info(
+                f"Started {len(set(pids))} inference workers in {startup_s:.2f}s."
+            )
+            start = time.perf_counter()
+            futures = []
+            for i in range(n_shards):
+                future = executor.submit(
+                    predict_shard, dataset_inf.iloc[bounds[i] : bounds[i + 1]], target
+                )
+                future.add_done_callback(
+                    lambda _, i=i: finished.__setitem__(
+                        i, time.perf_counter() - start
+                    )
+                )
+                futures.append(future)
+            results = [future.result() for future in futures]
+
+    predictions = pd.Series(
+        np.concatenate([shard_predictions for shard_predictions, _ in results]),
+        name="predicted",
+    )
+    report = _shard_report(
+        bounds, [timing for _, timing in results], finished, startup_s
+    )
+    logger.info(
+        f"Predicted {len(predictions)} rows in {n_shards} shards in "
+        f"{report['wall_s']:.2f}s after a {startup_s:.2f}s startup, "
+        f"skew {report['skew']:.2f}:\n\n"
+        + pd.DataFrame(report["shards"]).round(3).to_string(index=False)
+    )
+    log_artifact_metadata(metadata={"shards": report}, artifact_name="predictions")
+    return predictions
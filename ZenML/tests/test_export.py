@@ -0,0 +1,66 @@
+"""End-to-end test of `run.py --export-model-dir` on a throwaway ZenML store."""
+
+import json
+import os
+import subprocess
+import sys
+
+import cloudpickle
+import pytest
+from sklearn.datasets import load_breast_cancer
+
+from utils.export import (
+    CLASSIFIER_FILE,
+    METADATA_FILE,
+    PREPROCESS_PIPELINE_FILE,
+)
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODEL_NAME = "breast_cancer_classifier"
+
+
+@pytest.fixture(scope="module")
+def zenml_env(tmp_path_factory):
+    """Environment of a fresh local ZenML store, leaving the project's alone."""
+    env = dict(
+        os.environ,
+        ZENML_CONFIG_PATH=str(tmp_path_factory.mktemp("zenml")),
+        ZENML_ANALYTICS_OPT_IN="false",
+    )
+    # Running on another store resets the active stack recorded here
+    project_config = os.path.join(PROJECT_ROOT, ".zen", "config.yaml")
+    with open(project_config, "rb") as f:
+        content = f.read()
+    yield env
+    with open(project_config, "wb") as f:
+        f.write(content)
+
+
+def run(env, *args):
+    result = subprocess.run(
+        [sys.executable, "run.py", *args],
+        cwd=PROJECT_ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    assert result.returncode == 0, result.stdout[-3000:] + result.stderr[-3000:]
+
+
+def test_export_model_dir_writes_a_servable_production_model(zenml_env, tmp_path):
+    run(zenml_env, "--training-pipeline", "--export-model-dir", str(tmp_path))
+
+    path = tmp_path / MODEL_NAME / "production"
+    with open(path / METADATA_FILE) as f:
+        metadata = json.load(f)
+    assert metadata["model_name"] == MODEL_NAME
+    assert metadata["target"] == "target"
+    assert len(metadata["feature_names"]) == 30
+
+    with open(path / CLASSIFIER_FILE, "rb") as f:
+        classifier = cloudpickle.load(f)
+    with open(path / PREPROCESS_PIPELINE_FILE, "rb") as f:
+        preprocess_pipeline = cloudpickle.load(f)
+    dataset = load_breast_cancer(as_frame=True).frame.head(10)
+    features = preprocess_pipeline.transform(dataset).drop(columns=["target"])
+    assert len(classifier.predict(features)) == 10
@@ -0,0 +1,65 @@
+"""`CompactForest` predictions against the sklearn forest it was built from."""
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+
+from utils.forest import CompactForest
+
+
+def make_dataset(rows: int, seed: int) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    X = pd.DataFrame(rng.normal(size=(rows, 6)), columns=[f"f{i}" for i in range(6)])
+    # Float64 values that only differ from a threshold after the float32 cast
+    X["f5"] = np.round(X["f5"], 1) + 1e-9
+    X.loc[rng.random(rows) < 0.05, "f1"] = np.nan
+    return X
+
+
+@pytest.fixture(scope="module")
+def forest() -> RandomForestClassifier:
+    X = make_dataset(3000, seed=0)
+    score = X["f0"] + X["f1"].fillna(1.0) * X["f2"] + X["f5"]
+    y = np.select([score < -1, score < 1], ["low", "medium"], "high")
+    return RandomForestClassifier(n_estimators=25, random_state=0).fit(X, y)
+
+
+@pytest.mark.parametrize("rows", [1, 7, 2500])
+def test_predictions_are_identical_to_the_sklearn_forest(forest, rows):
+    X = make_dataset(rows, seed=rows)
+    compact = CompactForest.from_sklearn(forest)
+
+    np.testing.assert_array_equal(compact.predict_proba(X), forest.predict_proba(X))
+    np.testing.assert_array_equal(compact.predict(X), forest.predict(X))
+    # Arrays are not checked for feature names
+    np.testing.assert_array_equal(compact.predict(X.to_numpy()), forest.predict(X))
+
+
+def test_inputs_on_the_thresholds_take_the_same_branch(forest):
+    compact = CompactForest.from_sklearn(forest)
+    is_split = compact.children[::2] != np.arange(len(compact.feature))
+    # Splits of the missing values from all the others have infinite thresholds
+    is_split &= np.isfinite(compact.threshold)
+    tested, thresholds = compact.feature[is_split], compact.threshold[is_split]
+    values = np.zeros((len(thresholds), 6))
+    values[np.arange(len(thresholds)), tested] = thresholds
+    X = pd.DataFrame(values, columns=forest.feature_names_in_)
+
+    np.testing.assert_array_equal(compact.predict_proba(X), forest.predict_proba(X))
+
+
+def test_renamed_features_are_rejected(forest):
+    X = make_dataset(5, seed=1).rename(columns={"f0": "other"})
+
+    with pytest.raises(ValueError, match="feature names"):
+        CompactForest.from_sklearn(forest).predict(X)
+
+
+def test_multi_output_forests_are_not_flattened():
+    X = make_dataset(100, seed=2).fillna(0)
+    y = np.column_stack([X["f0"] > 0, X["f1"] > 0])
+    forest = RandomForestClassifier(n_estimators=2, random_state=0).fit(X, y)
+
+    with pytest.raises(ValueError, match="single-output"):
+        CompactForest.from_sklearn(forest)
@@ -0,0 +1,111 @@
+"""Appended row detection, model continuation and the stable split."""
+
+import copy
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import SGDClassifier
+
+from steps.data_loader import data_loader
+from steps.data_splitter import data_splitter
+from utils.incremental import appended_rows, continue_training, stable_fraction
+from utils.synthetic import make_breast_cancer_like
+
+
+@pytest.fixture
+def dataset() -> pd.DataFrame:
+    return make_breast_cancer_like(3000, random_state=5)
+
+
+def test_appended_rows_finds_appended_and_inserted_rows(dataset):
+    previous, delta = dataset.iloc[:2000], dataset.iloc[2000:]
+
+    assert appended_rows(previous, dataset).equals(delta)
+    shuffled = dataset.sample(frac=1, random_state=0)
+    assert appended_rows(previous, shuffled).sort_index().equals(delta)
+    assert appended_rows(previous, previous).empty
+
+
+def test_appended_rows_rejects_missing_or_modified_rows(dataset):
+    previous = dataset.iloc[:2000]
+    modified = dataset.copy()
+    modified.iloc[10, 0] += 1
+
+    assert appended_rows(previous, dataset.iloc[1:]) is None
+    assert appended_rows(previous, modified) is None
+    assert appended_rows(previous, dataset.astype({"target": float})) is None
+
+
+def test_sgd_continuation_is_a_partial_fit_on_the_new_rows(dataset):
+    previous, delta = dataset.iloc[:2000], dataset.iloc[2000:]
+    model = SGDClassifier(random_state=0).fit(
+        previous.drop(columns=["target"]), previous["target"]
+    )
+    coef = model.coef_.copy()
+
+    continued = continue_training(model, previous, delta, "target")
+    expected = copy.deepcopy(model).partial_fit(
+        delta.drop(columns=["target"]), delta["target"]
+    )
+
+    np.testing.assert_array_equal(continued.coef_, expected.coef_)
+    np.testing.assert_array_equal(continued.intercept_, expected.intercept_)
+    np.testing.assert_array_equal(model.coef_, coef)
+
+
+def test_forest_continuation_grows_trees_on_deltas_with_a_single_label(dataset):
+    previous = dataset.iloc[:2000]
+    delta = dataset.iloc[2000:][lambda rows: rows["target"] == 1].iloc[:100]
+    model = RandomForestClassifier(n_estimators=20, random_state=0).fit(
+        previous.drop(columns=["target"]), previous["target"]
+    )
+
+    continued = continue_training(model, previous, delta, "target")
+
+    # One new tree per 100 rows, at the 20 trees per 2000 rows of the model
+    assert len(continued.estimators_) == 21
+    assert continued.estimators_[:20] == model.estimators_
+    assert len(model.estimators_) == 20
+    assert all(list(tree.classes_) == [0, 1] for tree in continued.estimators_)
+
+
+def test_continuation_refuses_unknown_labels(dataset):
+    previous, delta = dataset.iloc[:2000], dataset.iloc[2000:].copy()
+    model = SGDClassifier(random_state=0).fit(
+        previous.drop(columns=["target"]), previous["target"]
+    )
+    delta.iloc[0, delta.columns.get_loc("target")] = 2
+
+    assert continue_training(model, previous, delta, "target") is None
+
+
+def test_stable_fraction_depends_on_the_values_and_the_salt(dataset):
+    fraction = stable_fraction(dataset, "split")
+
+    assert ((fraction >= 0) & (fraction < 1)).all()
+    np.testing.assert_array_equal(
+        stable_fraction(dataset.iloc[::-1], "split"), fraction[::-1]
+    )
+    assert not np.array_equal(stable_fraction(dataset, "inference"), fraction)
+
+
+def test_stable_split_of_more_rows_appends_to_both_datasets():
+    smaller = data_loader.entrypoint(random_state=17, synthetic_rows=2000, stable=True)
+    larger = data_loader.entrypoint(random_state=17, synthetic_rows=2500, stable=True)
+    train, test = data_splitter.entrypoint(smaller, stable=True)
+    larger_train, larger_test = data_splitter.entrypoint(larger, stable=True)
+
+    assert len(larger_train) > len(train) and len(larger_test) > len(test)
+    assert len(appended_rows(train, larger_train)) == len(larger_train) - len(train)
+    assert (
+        larger_train.iloc[: len(train)]
+        .reset_index(drop=True)
+        .equals(train.reset_index(drop=True))
+    )
+    assert (
+        larger_test.iloc[: len(test)]
+        .reset_index(drop=True)
+        .equals(test.reset_index(drop=True))
+    )
@@ -0,0 +1,66 @@
+"""Reading and writing of the compact model format against a fixed model.
+
+`fixtures/compact_model` was written by
+`save_model(FIXTURE_MODEL, path, min_array_bytes=1)`. The Kubeflow example
+reads the same fixture with its own copy of the reader.
+"""
+
+import os
+import warnings
+
+import numpy as np
+import pytest
+
+from utils.model_store import load_model, read_header, save_model
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "compact_model")
+COEF = np.arange(6, dtype=np.float64).reshape(2, 3)
+FIXTURE_MODEL = {
+    "name": "fixture",
+    "coef": COEF,
+    "coef_again": COEF,
+    "classes": np.array(["no", "yes"]),
+    "intercept": np.array([0.5, -0.5], dtype=np.float32),
+}
+
+
+def load_fixture(**kwargs):
+    with warnings.catch_warnings():
+        # The fixture records the library versions it was written with
+        warnings.simplefilter("ignore")
+        return load_model(FIXTURE, **kwargs)
+
+
+def test_load_model_reads_the_fixture():
+    model = load_fixture(verify=True)
+
+    assert model["name"] == "fixture"
+    np.testing.assert_array_equal(model["coef"], COEF)
+    np.testing.assert_array_equal(model["classes"], ["no", "yes"])
+    np.testing.assert_array_equal(model["intercept"], [0.5, -0.5])
+    assert isinstance(model["coef"], np.memmap)
+    # An array referenced twice is stored and loaded once
+    assert model["coef_again"] is model["coef"]
+    assert not isinstance(load_fixture(mmap=False)["coef"], np.memmap)
+
+
+def test_save_model_writes_the_fixture(tmp_path):
+    header = save_model(FIXTURE_MODEL, str(tmp_path), min_array_bytes=1)
+
+    expected = read_header(FIXTURE)
+    del header["versions"], expected["versions"]
+    assert header == expected
+
+
+def test_load_model_rejects_other_formats_and_checksums(tmp_path):
+    save_model(FIXTURE_MODEL, str(tmp_path), min_array_bytes=1)
+    with open(tmp_path / "array_0.npy", "r+b") as f:
+        f.seek(-1, os.SEEK_END)
+        f.write(b"\x01")
+    load_model(str(tmp_path))
+    with pytest.raises(ValueError, match="does not match its checksum"):
+        load_model(str(tmp_path), verify=True)
+
+    (tmp_path / "model.json").write_text('{"format": "compact-model", "format_version": 2}')
+    with pytest.raises(ValueError, match="Unsupported model format"):
+        load_model(str(tmp_path))
@@ -0,0 +1,115 @@
+"""Dependency order, parallelism limit and critical path of the task graph."""
+
+import time
+
+import pytest
+
+from utils.orchestration import (
+    PipelineTask,
+    TaskTiming,
+    critical_path,
+    format_timing_report,
+    run_task_graph,
+)
+
+
+def sleeping(seconds: float, calls: list = None, name: str = ""):
+    """Stub pipeline, defined at module level to be run by worker processes."""
+    time.sleep(seconds)
+    if calls is not None:
+        calls.append(name)
+
+
+def overlapping(timings, at: float) -> int:
+    return sum(timing.start <= at < timing.end for timing in timings.values())
+
+
+def test_serial_run_follows_the_dependencies_whatever_the_task_order():
+    calls = []
+    tasks = [
+        PipelineTask(
+            name, sleeping, {"seconds": 0, "calls": calls, "name": name}, depends_on
+        )
+        for name, depends_on in [
+            ("promote", ["train_rf", "train_sgd"]),
+            ("train_rf", ["features"]),
+            ("train_sgd", ["features"]),
+            ("features", []),
+        ]
+    ]
+
+    timings = run_task_graph(tasks)
+
+    assert calls == ["features", "train_rf", "train_sgd", "promote"]
+    assert timings.keys() == {"features", "train_rf", "train_sgd", "promote"}
+
+
+def test_parallel_run_respects_the_limit_and_the_dependencies():
+    tasks = [PipelineTask("features", sleeping, {"seconds": 0.5})] + [
+        PipelineTask(f"train_{index}", sleeping, {"seconds": 1}, ["features"])
+        for index in range(3)
+    ]
+
+    timings = run_task_graph(tasks, max_parallel=2)
+
+    trainings = [timings[f"train_{index}"] for index in range(3)]
+    assert all(timing.start >= timings["features"].end for timing in trainings)
+    starts = [timing.start for timing in timings.values()]
+    assert max(overlapping(timings, at) for at in starts) == 2
+    # Two trainings at a time, then the third one when a worker is free
+    first, second, third = sorted(trainings, key=lambda timing: timing.start)
+    assert second.start < first.end
+    assert third.start >= min(first.end, second.end)
+
+
+@pytest.mark.parametrize(
+    "tasks, message",
+    [
+        ([PipelineTask("train", sleeping, depends_on=["features"])], "unknown task"),
+        (
+            [
+                PipelineTask("a", sleeping, depends_on=["b"]),
+                PipelineTask("b", sleeping, depends_on=["a"]),
+            ],
+            "cycle",
+        ),
+    ],
+)
+def test_invalid_graphs_are_rejected_before_running(tasks, message):
+    with pytest.raises(ValueError, match=message):
+        run_task_graph(tasks)
+
+
+def test_parallelism_below_one_is_rejected():
+    with pytest.raises(ValueError, match="max_parallel"):
+        run_task_graph([PipelineTask("features", sleeping, {"seconds": 0})], 0)
+
+
+def test_critical_path_follows_the_longest_chain_of_durations():
+    tasks = [
+        PipelineTask("features", sleeping),
+        PipelineTask("train_sgd", sleeping, depends_on=["features"]),
+        PipelineTask("train_rf", sleeping, depends_on=["features"]),
+        PipelineTask("promote", sleeping, depends_on=["train_sgd", "train_rf"]),
+        PipelineTask("report", sleeping),
+    ]
+    timings = {
+        "features": TaskTiming(100.0, 102.0),
+        "train_sgd": TaskTiming(102.0, 103.0),
+        "train_rf": TaskTiming(102.0, 110.0),
+        "promote": TaskTiming(110.0, 111.0),
+        "report": TaskTiming(100.0, 109.0),
+    }
+
+    assert critical_path(tasks, timings) == [
+        "features",
+        "train_rf",
+        "promote",
+    ]
+    report = format_timing_report(tasks, timings)
+    assert "Critical path: features -> train_rf -> promote" in report
+    assert "Wall time: 11.0s (sum of stages: 21.0s, critical path: 11.0s)" in report
+    rows = {line.split()[0]: line for line in report.splitlines()[1:6]}
+    assert rows["train_rf"].endswith("*")
+    assert not rows["train_sgd"].endswith("*")
+    assert not rows["report"].endswith("*")
@@ -0,0 +1,86 @@
+"""`ShardedPreprocessor` against the serial sklearn pipeline."""
+
+import copy
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import MinMaxScaler
+
+from utils import parallel_preprocess
+from utils.parallel_preprocess import ShardedPreprocessor
+from utils.preprocess import ColumnsDropper, DataFrameCaster, NADropper
+
+
+@pytest.fixture(autouse=True)
+def small_parallel_datasets(monkeypatch):
+    # Shards of a few thousand rows take the same path as large datasets
+    monkeypatch.setattr(parallel_preprocess, "MIN_PARALLEL_ROWS", 1000)
+
+
+def make_dataset(rows: int, seed: int, dtype=np.float64) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    dataset = pd.DataFrame(
+        {
+            "small": rng.normal(0, 1e-3, rows).astype(dtype),
+            "large": rng.normal(1e6, 1e4, rows).astype(dtype),
+            "count": rng.integers(-50, 50, rows),
+            "dropped": rng.random(rows),
+            "target": rng.integers(0, 2, rows),
+        }
+    )
+    dataset.loc[rng.random(rows) < 0.02, "small"] = np.nan
+    dataset.loc[rng.random(rows) < 0.02, "dropped"] = np.nan
+    return dataset
+
+
+def make_pipeline(columns: pd.Index) -> Pipeline:
+    return Pipeline(
+        [
+            ("passthrough", "passthrough"),
+            ("drop_na", NADropper()),
+            ("drop_columns", ColumnsDropper(["dropped"])),
+            ("normalize", MinMaxScaler()),
+            ("cast", DataFrameCaster(columns.drop("dropped"))),
+        ]
+    )
+
+
+@pytest.mark.parametrize("dtype", [np.float64, np.float32])
+def test_sharded_pipeline_matches_the_serial_pipeline(dtype):
+    dataset_trn = make_dataset(5001, seed=0, dtype=dtype)
+    # Test values outside of the fitted range are scaled beyond [0, 1]
+    dataset_tst = make_dataset(2003, seed=1, dtype=dtype) * 1.5
+    serial = make_pipeline(dataset_trn.columns)
+    pipeline = copy.deepcopy(serial)
+
+    expected_trn = serial.fit_transform(dataset_trn)
+    expected_tst = serial.transform(dataset_tst)
+    with ShardedPreprocessor(pipeline, n_jobs=3) as sharded:
+        transformed_trn = sharded.fit_transform(dataset_trn)
+        transformed_tst = sharded.transform(dataset_tst)
+        assert sharded._executor is not None, "the shards should run in workers"
+
+    pd.testing.assert_frame_equal(transformed_trn, expected_trn)
+    pd.testing.assert_frame_equal(transformed_tst, expected_tst)
+    scaler, serial_scaler = pipeline["normalize"], serial["normalize"]
+    for attribute in ("data_min_", "data_max_", "data_range_", "scale_", "min_"):
+        np.testing.assert_array_equal(
+            getattr(scaler, attribute), getattr(serial_scaler, attribute)
+        )
+    assert scaler.n_samples_seen_ == serial_scaler.n_samples_seen_
+    assert scaler.feature_names_in_.tolist() == serial_scaler.feature_names_in_.tolist()
+
+
+def test_small_datasets_are_processed_by_the_pipeline_itself():
+    dataset = make_dataset(999, seed=2)
+    pipeline = make_pipeline(dataset.columns)
+
+    with ShardedPreprocessor(pipeline, n_jobs=3) as sharded:
+        transformed = sharded.fit_transform(dataset)
+        assert sharded._executor is None
+
+    pd.testing.assert_frame_equal(
+        transformed, make_pipeline(dataset.columns).fit_transform(dataset)
+    )
@@ -0,0 +1,76 @@
+"""Type rules of the `DtypeOptimizer` preprocessing stage."""
+
+import numpy as np
+import pandas as pd
+
+from utils.preprocess import DtypeOptimizer
+
+
+def test_floats_become_float32_only_when_they_survive_the_round_trip():
+    dataset = pd.DataFrame(
+        {
+            "fraction": [0.1, 0.25, np.nan],
+            "overflow": [1.0, 1e39, 2.0],
+            "underflow": [1.0, 1e-46, 2.0],
+        }
+    )
+    optimizer = DtypeOptimizer().fit(dataset)
+    optimized = optimizer.transform(dataset)
+
+    assert optimized["fraction"].dtype == np.float32
+    assert optimized["overflow"].dtype == np.float64
+    assert optimized["underflow"].dtype == np.float64
+    assert optimizer.rounded_columns_ == ["fraction"]
+    # A tolerance below the float32 precision keeps the original type
+    strict = DtypeOptimizer(rtol=1e-9).fit(dataset)
+    assert strict.transform(dataset)["fraction"].dtype == np.float64
+    assert strict.rounded_columns_ == []
+
+
+def test_integers_take_the_smallest_type_of_their_fitted_range():
+    dataset = pd.DataFrame(
+        {
+            "small": np.array([0, 100], dtype=np.int64),
+            "medium": np.array([-200, 200], dtype=np.int64),
+            "large": np.array([0, 2**40], dtype=np.int64),
+        }
+    )
+    optimizer = DtypeOptimizer().fit(dataset)
+    optimized = optimizer.transform(dataset)
+
+    assert optimized["small"].dtype == np.int8
+    assert optimized["medium"].dtype == np.int16
+    assert optimized["large"].dtype == np.int64
+    assert optimizer.rounded_columns_ == []
+
+
+def test_unseen_integers_outside_of_the_smaller_type_keep_the_original_type():
+    optimizer = DtypeOptimizer().fit(pd.DataFrame({"count": np.array([0, 100])}))
+
+    inside = optimizer.transform(pd.DataFrame({"count": np.array([-128, 127])}))
+    outside = optimizer.transform(pd.DataFrame({"count": np.array([0, 1000])}))
+
+    assert inside["count"].dtype == np.int8
+    assert outside["count"].dtype == np.int64
+    assert outside["count"].tolist() == [0, 1000]
+
+
+def test_only_non_numeric_columns_with_few_values_become_categoricals():
+    dataset = pd.DataFrame(
+        {
+            "grade": ["b", "a", "c", "a", None],
+            "flag": [0.0, 1.0, 1.0, 0.0, 1.0],
+            "done": [True, False, True, True, False],
+        }
+    )
+    optimized = DtypeOptimizer().fit(dataset).transform(dataset)
+
+    assert isinstance(optimized["grade"].dtype, pd.CategoricalDtype)
+    assert list(optimized["grade"].cat.categories) == ["a", "b", "c"]
+    assert optimized["grade"].isna().tolist() == [False] * 4 + [True]
+    assert optimized["flag"].dtype == np.float32
+    assert optimized["done"].dtype == bool
+
+    # Above the cutoff, the column is left as it is
+    capped = DtypeOptimizer(max_categories=2).fit(dataset).transform(dataset)
+    assert capped["grade"].dtype == object
@@ -0,0 +1,72 @@
+"""Stratified order and early stopping of `progressive_accuracy`."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.progressive import exact_accuracy, progressive_accuracy, stratified_order
+
+
+class Guesser:
+    """Stub classifier predicting the `guess` column."""
+
+    def predict(self, X: pd.DataFrame) -> np.ndarray:
+        return X["guess"].to_numpy()
+
+    def score(self, X: pd.DataFrame, y: pd.Series) -> float:
+        return float(np.mean(self.predict(X) == y.to_numpy()))
+
+
+def make_dataset(rows: int = 50_000, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    target = (rng.random(rows) < 0.3).astype(int)
+    # Right 90% of the time on label 0 and 70% on label 1
+    wrong = rng.random(rows) > np.where(target == 0, 0.9, 0.7)
+    return pd.DataFrame({"guess": np.where(wrong, 1 - target, target), "target": target})
+
+
+def test_stratified_order_keeps_the_label_proportions_in_every_prefix():
+    labels = np.repeat([0, 1, 2], [600, 300, 100])
+    order = stratified_order(labels, random_state=3)
+
+    assert sorted(order) == list(range(len(labels)))
+    np.testing.assert_array_equal(order, stratified_order(labels, random_state=3))
+    counts = np.cumsum(np.eye(3)[labels[order]], axis=0)
+    expected = np.arange(1, len(labels) + 1)[:, None] * np.array([0.6, 0.3, 0.1])
+    assert np.abs(counts - expected).max() <= 2
+
+
+def test_the_interval_covers_the_exact_accuracy_and_stops_early():
+    dataset = make_dataset()
+    exact = exact_accuracy(Guesser(), dataset, "target").accuracy
+
+    for random_state in range(10):
+        estimate = progressive_accuracy(
+            Guesser(),
+            dataset,
+            "target",
+            thresholds=[0.7, 0.9],
+            batch_rows=1_000,
+            random_state=random_state,
+        )
+        assert estimate.lower <= exact <= estimate.upper
+        assert estimate.decides(0.7) and estimate.decides(0.9)
+        assert not estimate.exact
+
+
+def test_a_threshold_at_the_accuracy_scores_every_row():
+    dataset = make_dataset(rows=5_000)
+    exact = exact_accuracy(Guesser(), dataset, "target").accuracy
+
+    estimate = progressive_accuracy(
+        Guesser(), dataset, "target", thresholds=[exact], tolerance=0, batch_rows=1_000
+    )
+
+    assert estimate.exact
+    assert estimate.accuracy == pytest.approx(exact)
+    assert estimate.lower == estimate.upper == estimate.accuracy
+
+
+def test_an_empty_dataset_is_rejected():
+    with pytest.raises(ValueError, match="no rows"):
+        progressive_accuracy(Guesser(), make_dataset().head(0), "target")
@@ -0,0 +1,153 @@
+"""Budget comparison of the regression gate, on hand-written step profiles."""
+
+import yaml
+from click.testing import CliRunner
+
+from benchmarks import regression_gate
+from benchmarks.regression_gate import compare, write_budgets
+
+MIN_EXCESS = {"wall_time_s": 0.5, "peak_rss_mb": 50.0, "peak_rss_increase_mb": 16.0}
+
+
+def profile(wall_time_s: float, peak_rss_mb: float, peak_rss_increase_mb: float):
+    return {
+        "wall_time_s": wall_time_s,
+        "peak_rss_mb": peak_rss_mb,
+        "peak_rss_increase_mb": peak_rss_increase_mb,
+        # Other fields of the profile metadata are ignored
+        "cpu_time_s": 1.0,
+    }
+
+
+BUDGETS = {
+    "feature_engineering": {
+        "data_loader": profile(10.0, 500.0, 100.0),
+        "data_splitter": profile(0.25, 400.0, 4.0),
+    },
+    "training_sgd": {"model_trainer": profile(2.0, 600.0, 50.0)},
+}
+
+
+def statuses(measured, tolerance=0.3):
+    rows = compare(measured, BUDGETS, tolerance, MIN_EXCESS)
+    return {(row["pipeline"], row["step"]): row["status"] for row in rows}
+
+
+def test_excess_must_pass_both_the_relative_and_the_absolute_threshold():
+    measured = {
+        "feature_engineering": {
+            # 20% over the time budget, within the tolerance
+            "data_loader": profile(12.0, 500.0, 100.0),
+            # 4 times the time budget, and 0.75 s above it
+            "data_splitter": profile(1.0, 400.0, 4.0),
+        },
+        # 40% over the memory budgets, and above both absolute thresholds
+        "training_sgd": {"model_trainer": profile(2.0, 840.0, 70.0)},
+    }
+
+    assert statuses(measured) == {
+        ("feature_engineering", "data_loader"): "ok",
+        ("feature_engineering", "data_splitter"): "over wall_time_s",
+        ("training_sgd", "model_trainer"): "over peak_rss_mb, peak_rss_increase_mb",
+    }
+    # A larger tolerance accepts what the absolute thresholds do not
+    assert set(statuses(measured, tolerance=10.0).values()) == {"ok"}
+
+
+def test_measurements_on_the_thresholds_are_within_budget():
+    # Exactly 25% or `MIN_EXCESS` above the budgets, in binary floating point
+    measured = {
+        "feature_engineering": {
+            "data_loader": profile(12.5, 625.0, 125.0),
+            "data_splitter": profile(0.75, 450.0, 20.0),
+        },
+        "training_sgd": {"model_trainer": profile(2.5, 650.0, 66.0)},
+    }
+
+    assert set(statuses(measured, tolerance=0.25).values()) == {"ok"}
+    # Only the excesses that are also above `MIN_EXCESS` count
+    over_all = "over wall_time_s, peak_rss_mb, peak_rss_increase_mb"
+    assert statuses(measured, tolerance=0.24) == {
+        ("feature_engineering", "data_loader"): over_all,
+        ("feature_engineering", "data_splitter"): "ok",
+        ("training_sgd", "model_trainer"): "ok",
+    }
+
+
+def test_added_and_removed_steps_and_pipelines_are_reported():
+    measured = {
+        "feature_engineering": {
+            "data_loader": profile(10.0, 500.0, 100.0),
+            "data_preprocessor": profile(1.0, 500.0, 10.0),
+        },
+        "training_rf": {"model_trainer": profile(20.0, 900.0, 200.0)},
+    }
+
+    assert statuses(measured) == {
+        ("feature_engineering", "data_loader"): "ok",
+        ("feature_engineering", "data_preprocessor"): "no budget",
+        ("feature_engineering", "data_splitter"): "not run",
+        ("training_rf", "model_trainer"): "no budget",
+        ("training_sgd", "model_trainer"): "not run",
+    }
+
+
+def test_breakdown_rows_hold_the_measurements_budgets_and_ratios():
+    measured = {"feature_engineering": {"data_loader": profile(15.0, 250.0, 0.0)}}
+
+    rows = compare(measured, BUDGETS, 0.3, MIN_EXCESS)
+    row = rows[0]
+
+    assert [field for field in regression_gate.FIELDS if field not in row] == []
+    assert (row["wall_time_s"], row["wall_time_budget_s"], row["wall_time_ratio"]) == (
+        15.0,
+        10.0,
+        1.5,
+    )
+    assert (row["peak_rss_ratio"], row["peak_rss_increase_ratio"]) == (0.5, 0.0)
+    not_run = rows[1]
+    assert (not_run["step"], not_run["wall_time_s"], not_run["wall_time_ratio"]) == (
+        "data_splitter",
+        None,
+        None,
+    )
+
+
+def test_written_budgets_accept_the_same_measurements(tmp_path):
+    path = str(tmp_path / "budgets.yaml")
+    write_budgets(path, BUDGETS, rows=1000, tolerance=0.3, min_excess=MIN_EXCESS)
+    with open(path) as f:
+        config = yaml.safe_load(f)
+
+    assert (config["rows"], config["tolerance"], config["min_excess"]) == (
+        1000,
+        0.3,
+        MIN_EXCESS,
+    )
+    assert "cpu_time_s" not in config["budgets"]["training_sgd"]["model_trainer"]
+    rows = compare(BUDGETS, config["budgets"], 0.0, MIN_EXCESS)
+    assert {row["status"] for row in rows} == {"ok"}
+
+
+def test_gate_exits_with_an_error_when_a_step_is_over_budget(tmp_path, monkeypatch):
+    path = str(tmp_path / "budgets.yaml")
+    write_budgets(path, BUDGETS, rows=1000, tolerance=0.3, min_excess=MIN_EXCESS)
+    measured = {
+        key: {step: dict(step_profile) for step, step_profile in steps.items()}
+        for key, steps in BUDGETS.items()
+    }
+    monkeypatch.setattr(regression_gate, "run_pipelines", lambda rows, folder: None)
+    monkeypatch.setattr(regression_gate, "measured_profiles", lambda folder: measured)
+    args = ["--budgets", path, "--output", str(tmp_path / "regression.csv")]
+
+    result = CliRunner().invoke(regression_gate.main, args)
+    assert result.exit_code == 0, result.output
+    assert "All 3 steps are within their budgets." in result.output
+
+    measured["training_sgd"]["model_trainer"]["wall_time_s"] = 5.0
+    result = CliRunner().invoke(regression_gate.main, args)
+    assert result.exit_code == 1
+    assert "1 of 3 steps are not within their budgets" in result.output
+    assert "training_sgd.model_trainer" in result.output
+    with open(tmp_path / "regression.csv") as f:
+        assert "over wall_time_s" in f.read()
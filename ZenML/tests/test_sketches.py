@@ -0,0 +1,113 @@
+"""Merging of feature sketches and the population stability index."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.sketches import FeatureSketch, FeatureSketches
+
+
+def make_frame(rows: int, seed: int, shift: float = 0.0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame(
+        {
+            "normal": rng.normal(10 + shift, 2, rows),
+            "skewed": rng.exponential(1, rows),
+            "count": rng.integers(0, 5, rows),
+            "name": rng.choice(["a", "b"], rows),
+        }
+    )
+    df.loc[rng.random(rows) < 0.1, "normal"] = np.nan
+    return df
+
+
+def assert_same_sketch(actual: FeatureSketch, expected: FeatureSketch):
+    np.testing.assert_array_equal(actual.edges, expected.edges)
+    np.testing.assert_array_equal(actual.counts, expected.counts)
+    assert (actual.n, actual.n_missing) == (expected.n, expected.n_missing)
+    assert (actual.min, actual.max) == (expected.min, expected.max)
+    assert actual.mean == pytest.approx(expected.mean, rel=1e-12)
+    assert actual.m2 == pytest.approx(expected.m2, rel=1e-9)
+
+
+def test_merged_chunk_sketches_match_the_single_pass_sketch():
+    df = make_frame(10_000, seed=0)
+    single_pass = FeatureSketches.from_frame(df, exclude=["count"])
+
+    chunks = []
+    # Uneven chunks, merged out of order
+    bounds = [0, 1, 3, 1500, 6200, 10_000]
+    for start, end in zip(bounds[:-1], bounds[1:]):
+        chunk = single_pass.empty_like()
+        chunk.update(df.iloc[start:end])
+        chunks.append(chunk)
+    # A chunk of missing values only adds to the missing count
+    chunks[1].sketches["normal"].update(np.full(4, np.nan))
+    merged = single_pass.empty_like()
+    for chunk in reversed(chunks):
+        merged.merge(chunk)
+
+    assert merged.sketches.keys() == {"normal", "skewed"}
+    assert_same_sketch(merged.sketches["skewed"], single_pass.sketches["skewed"])
+    normal = merged.sketches["normal"]
+    assert normal.n_missing == single_pass.sketches["normal"].n_missing + 4
+    normal.n_missing -= 4
+    assert_same_sketch(normal, single_pass.sketches["normal"])
+
+
+def test_sketches_summarize_the_values():
+    values = np.random.default_rng(1).normal(10, 2, 100_000)
+    values[:10_000] = np.nan
+    sketch = FeatureSketch.from_values(values)
+
+    present = values[10_000:]
+    assert sketch.na_rate == pytest.approx(0.1)
+    assert sketch.mean == pytest.approx(present.mean())
+    assert sketch.std == pytest.approx(present.std(ddof=1))
+    np.testing.assert_allclose(
+        sketch.quantiles([0.1, 0.5, 0.9]),
+        np.quantile(present, [0.1, 0.5, 0.9]),
+        atol=0.05,
+    )
+    # Equal-frequency bins
+    assert sketch.counts.min() > 0.09 * sketch.n
+
+
+def test_sketches_with_other_edges_are_not_merged():
+    sketch = FeatureSketch(np.array([0.0, 1.0]))
+
+    with pytest.raises(ValueError, match="same bin edges"):
+        sketch.merge(FeatureSketch(np.array([0.0, 2.0])))
+
+
+def test_psi_of_hand_counted_bins():
+    reference, actual = FeatureSketch(np.array([0.0])), FeatureSketch(np.array([0.0]))
+    reference.update(np.array([-1.0, -1.0, -1.0, 1.0]))
+    actual.update(np.array([-1.0, 1.0, 1.0, 1.0]))
+
+    # Counts (3, 1) against (1, 3) with the 0.5 pseudo-count
+    expected, observed = np.array([3.5, 1.5]) / 5, np.array([1.5, 3.5]) / 5
+    assert actual.psi(reference) == pytest.approx(
+        ((observed - expected) * np.log(observed / expected)).sum()
+    )
+    assert reference.psi(reference) == 0.0
+    assert FeatureSketch(np.array([0.0])).psi(reference) == 0.0
+
+
+def test_psi_and_mean_shift_separate_drift_from_sampling_noise():
+    reference = FeatureSketches.from_frame(make_frame(20_000, seed=2))
+    same = reference.empty_like()
+    same.update(make_frame(20_000, seed=3))
+    shifted = reference.empty_like()
+    # Half a standard deviation
+    shifted.update(make_frame(20_000, seed=4, shift=1.0))
+
+    drift = same.drift(reference)
+    assert (drift["psi"] < 0.01).all()
+    assert drift.loc["normal", "mean_shift"] == pytest.approx(0, abs=0.05)
+    assert drift.loc["normal", "na_rate"] == pytest.approx(0.1, abs=0.01)
+
+    drift = shifted.drift(reference)
+    assert drift.loc["normal", "psi"] > 0.1
+    assert drift.loc["normal", "mean_shift"] == pytest.approx(0.5, abs=0.05)
+    assert drift.loc["skewed", "psi"] < 0.01
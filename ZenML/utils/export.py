@@ -0,0 +1,87 @@
+# MIT License
+# 
+# Copyright (c) ZenML GmbH 2024
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+# 
+
+import json
+import os
+
+import cloudpickle
+
+import utils.preprocess
+
+# Layout shared with the file-based artifact store of the Flask service in
+#  `flake_example/resources/artifact_store.py`
+CLASSIFIER_FILE = "sklearn_classifier.pkl"
+PREPROCESS_PIPELINE_FILE = "preprocess_pipeline.pkl"
+METADATA_FILE = "metadata.json"
+
+
+def export_model_version(model_name: str, version: str, output_dir: str) -> str:
+    """Export the classifier and preprocessing pipeline of a model version.
+
+    The artifacts are written to `<output_dir>/<model_name>/<version>/` so that
+    they can be served without a ZenML server. The preprocessing classes of
+    this project are pickled by value, so loading them does not need this
+    project on the path.
+
+    Args:
+        model_name: Name of the ZenML model, e.g. `breast_cancer_classifier`.
+        version: Model version name or stage, e.g. `production`.
+        output_dir: Root folder of the exported models.
+
+    Returns:
+        The folder the model version was exported to.
+    """
+    from zenml.client import Client
+
+    zenml_model = Client().get_model_version(model_name, version)
+    classifier = zenml_model.get_artifact("sklearn_classifier").load()
+    preprocess_pipeline_artifact = zenml_model.get_artifact("preprocess_pipeline")
+    preprocess_pipeline = preprocess_pipeline_artifact.load()
+    target = preprocess_pipeline_artifact.run_metadata["target"]
+    # Older ZenML versions wrap metadata values in a response model
+    target = getattr(target, "value", target)
+
+    # The cast step knows the columns the pipeline was fitted on
+    columns = preprocess_pipeline.named_steps["cast"].columns
+    metadata = {
+        "model_name": model_name,
+        "model_version": str(zenml_model.name),
+        "target": target,
+        "feature_names": [str(column) for column in columns if column != target],
+    }
+
+    path = os.path.join(output_dir, model_name, version)
+    os.makedirs(path, exist_ok=True)
+    cloudpickle.register_pickle_by_value(utils.preprocess)
+    try:
+        for file_name, artifact in (
+            (CLASSIFIER_FILE, classifier),
+            (PREPROCESS_PIPELINE_FILE, preprocess_pipeline),
+        ):
+            with open(os.path.join(path, file_name), "wb") as f:
+                cloudpickle.dump(artifact, f)
+    finally:
+        cloudpickle.unregister_pickle_by_value(utils.preprocess)
+    with open(os.path.join(path, METADATA_FILE), "w") as f:
+        json.dump(metadata, f, indent=2)
+    return path
@@ -0,0 +1,191 @@
+# MIT License
+# 
+# Copyright (c) ZenML GmbH 2024
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+# 
+
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+
+# Rows walked at once, bounds the (trees x rows) working arrays
+_CHUNK_ROWS = 1024
+
+# Batches up to this many rows are predicted faster by `CompactForest` than
+#  by the sklearn forest, see `benchmarks/forest_benchmark.py`
+SMALL_BATCH_ROWS = 200
+
+
+class CompactForest:
+    """Random forest classifier flattened into contiguous node arrays.
+
+    The nodes of all trees are concatenated into one array per node field:
+    the tested feature, the threshold, the left and right child interleaved
+    in `children`, where missing values go, and the class distribution.
+    Child indices point into the concatenated arrays. Prediction walks every
+    tree for a whole batch of rows at once with vectorized NumPy operations.
+    This avoids the per-call and per-tree overhead of
+    `RandomForestClassifier.predict` and gives identical predictions. It is
+    faster for small batches such as online requests, while sklearn's
+    compiled tree walk stays faster for batches of many thousands of rows.
+    """
+
+    def __init__(
+        self,
+        feature: np.ndarray,
+        threshold: np.ndarray,
+        children: np.ndarray,
+        missing_go_left: np.ndarray,
+        value: np.ndarray,
+        roots: np.ndarray,
+        classes: np.ndarray,
+        max_depth: int,
+        feature_names: Optional[np.ndarray] = None,
+    ):
+        self.feature = feature
+        self.threshold = threshold
+        self.children = children
+        self.missing_go_left = missing_go_left
+        self.value = value
+        self.roots = roots
+        self.classes_ = classes
+        self.max_depth = max_depth
+        self.feature_names_in_ = feature_names
+
+    @classmethod
+    def from_sklearn(cls, forest: RandomForestClassifier) -> "CompactForest":
+        """Flatten a fitted single-output `RandomForestClassifier`.
+
+        Args:
+            forest: The fitted forest.
+
+        Returns:
+            The compact forest.
+
+        Raises:
+            ValueError: If the forest has more than one output.
+        """
+        if forest.n_outputs_ != 1:
+            raise ValueError("Only single-output forests can be flattened.")
+
+        trees = [estimator.tree_ for estimator in forest.estimators_]
+        offsets = np.cumsum([0] + [tree.node_count for tree in trees])
+        feature, threshold, children, missing_go_left, value = (
+            [] for _ in range(5)
+        )
+        for offset, tree in zip(offsets, trees):
+            is_leaf = tree.children_left == -1
+            own_index = np.arange(tree.node_count) + offset
+            # Leaves test feature 0 and have themselves as both children, so
+            #  walking past them is a no-op
+            feature.append(np.where(is_leaf, 0, tree.feature))
+            threshold.append(tree.threshold)
+            children.append(
+                np.column_stack(
+                    [
+                        np.where(is_leaf, own_index, tree.children_left + offset),
+                        np.where(is_leaf, own_index, tree.children_right + offset),
+                    ]
+                ).ravel()
+            )
+            nodes = tree.__getstate__()["nodes"]
+            # Only forests fitted with sklearn>=1.4 route missing values
+            if "missing_go_to_left" in nodes.dtype.names:
+                missing_go_left.append(nodes["missing_go_to_left"].astype(bool))
+            else:
+                missing_go_left.append(np.zeros(tree.node_count, dtype=bool))
+            # Normalized like `DecisionTreeClassifier.predict_proba` does
+            node_value = tree.value[:, 0, :]
+            normalizer = node_value.sum(axis=1)[:, np.newaxis]
+            normalizer[normalizer == 0.0] = 1.0
+            value.append(node_value / normalizer)
+
+        return cls(
+            feature=np.concatenate(feature).astype(np.int32),
+            threshold=np.concatenate(threshold).astype(np.float64),
+            children=np.concatenate(children).astype(np.int32),
+            missing_go_left=np.concatenate(missing_go_left),
+            value=np.ascontiguousarray(np.concatenate(value)),
+            roots=offsets[:-1].astype(np.int32),
+            classes=forest.classes_,
+            max_depth=max(tree.max_depth for tree in trees),
+            feature_names=getattr(forest, "feature_names_in_", None),
+        )
+
+    @property
+    def nbytes(self) -> int:
+        """Memory used by the node arrays."""
+        return sum(
+            array.nbytes
+            for array in (
+                self.feature,
+                self.threshold,
+                self.children,
+                self.missing_go_left,
+                self.value,
+                self.roots,
+            )
+        )
+
+    def _validate(self, X) -> np.ndarray:
+        if isinstance(X, pd.DataFrame) and self.feature_names_in_ is not None:
+            if list(X.columns) != list(self.feature_names_in_):
+                raise ValueError(
+                    "The feature names should match those that were passed "
+                    "during fit."
+                )
+        # Trees compare float32 inputs against float64 thresholds, like sklearn
+        return np.ascontiguousarray(X, dtype=np.float32)
+
+    def _leaves(self, X: np.ndarray) -> np.ndarray:
+        n_rows, n_features = X.shape
+        flat_X = X.ravel()
+        has_missing = np.isnan(flat_X).any()
+        node = np.repeat(self.roots, n_rows)
+        row_offset = np.tile(
+            np.arange(n_rows, dtype=np.intp) * n_features, len(self.roots)
+        )
+        # Every tree is walked to the depth of the deepest one, rows that
+        #  reached a leaf stay there
+        for _ in range(self.max_depth):
+            x = flat_X[row_offset + self.feature[node]]
+            go_right = x > self.threshold[node]
+            if has_missing:
+                missing = np.isnan(x)
+                go_right[missing] = ~self.missing_go_left[node[missing]]
+            node = self.children[2 * node + go_right]
+        return node.reshape(len(self.roots), n_rows)
+
+    def predict_proba(self, X) -> np.ndarray:
+        """Class probabilities averaged over the trees."""
+        X = self._validate(X)
+        proba = np.empty((len(X), len(self.classes_)))
+        for start in range(0, len(X), _CHUNK_ROWS):
+            chunk = slice(start, start + _CHUNK_ROWS)
+            # Summed tree by tree, in the same order as sklearn does
+            proba[chunk] = self.value[self._leaves(X[chunk])].sum(axis=0)
+        proba /= len(self.roots)
+        return proba
+
+    def predict(self, X) -> np.ndarray:
+        """Predicted classes, identical to the ones of the original forest."""
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1))
@@ -0,0 +1,81 @@
+# MIT License
+# 
+# Copyright (c) ZenML GmbH 2024
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+# 
+
+import os
+import subprocess
+import sys
+from typing import List, Tuple
+
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+
+
+def _parse_importtime(output: str) -> List[Tuple[str, int, int, int]]:
+    """Parse `-X importtime` lines into (module, depth, self us, cumulative us)."""
+    records = []
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        records.append((name.strip(), depth, int(self_us), int(cumulative_us)))
+    return records
+
+
+def format_import_report(modules: List[str], top: int = 15) -> str:
+    """Measure the import of `modules` in a fresh interpreter and summarize it.
+
+    Args:
+        modules: Modules to import, in order.
+        top: Number of entries listed per table.
+
+    Returns:
+        The total import time, the slowest top-level imports (including
+        everything they import) and the modules slowest to execute themselves.
+    """
+    code = "; ".join(f"import {module}" for module in modules)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=_PROJECT_ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    records = _parse_importtime(result.stderr)
+    top_level = sorted(
+        (record for record in records if record[1] == 0),
+        key=lambda record: record[3],
+        reverse=True,
+    )
+    total = sum(record[3] for record in top_level)
+
+    lines = [f"Import time of {', '.join(modules)}: {total / 1e6:.2f}s", ""]
+    lines.append(f"{'cumulative':>11}  top-level import")
+    for name, _, _, cumulative_us in top_level[:top]:
+        lines.append(f"{cumulative_us / 1e3:>9.1f}ms  {name}")
+    lines.append("")
+    lines.append(f"{'self':>11}  module")
+    for name, _, self_us, _ in sorted(records, key=lambda r: r[2], reverse=True)[
+        :top
+    ]:
+        lines.append(f"{self_us / 1e3:>9.1f}ms  {name}")
+    return "\n".join(lines)
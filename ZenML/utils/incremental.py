@@ -0,0 +1,143 @@
+# MIT License
+# 
+# Copyright (c) ZenML GmbH 2024
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+# 
+
+"""Continue training a model on the rows appended to its training dataset.
+
+A new version of a training dataset is treated as an extension of the
+previous one when it holds every row of it unchanged, compared by row hash.
+Only the appended rows are then used to update the model, so the training
+cost scales with the new data rather than the whole history.
+
+A random split would move rows between the train and test sets as the
+loaded data grows. `stable_fraction` places every row by the hash of its
+values instead, so the feature engineering can split an extended dataset
+into extended train and test sets.
+"""
+
+import copy
+import math
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+from sklearn.base import ClassifierMixin
+
+
+def row_hashes(dataset: pd.DataFrame) -> np.ndarray:
+    """64-bit hash of the values of every row, independent of the index."""
+    return pd.util.hash_pandas_object(dataset, index=False).to_numpy()
+
+
+def stable_fraction(dataset: pd.DataFrame, salt: str) -> np.ndarray:
+    """Position of every row in `[0, 1)`, from the hash of its values.
+
+    A row gets the same position in every dataset it appears in, so selecting
+    the rows below a fraction keeps the selection of the existing rows when
+    rows are appended. Different `salt`s give independent positions.
+    """
+    # The `hash_key` of pandas only applies to strings, so the salt is mixed
+    # into the row hashes, which are hashed again to spread the bits
+    salt_hash = pd.util.hash_array(np.array([salt], dtype=object))[0]
+    hashes = pd.util.hash_array(row_hashes(dataset) ^ salt_hash)
+    return hashes / 2.0**64
+
+
+def appended_rows(
+    previous: pd.DataFrame, current: pd.DataFrame
+) -> Optional[pd.DataFrame]:
+    """Rows of `current` that `previous` does not have.
+
+    Args:
+        previous: The dataset the model was trained on.
+        current: The new version of the dataset.
+
+    Returns:
+        The appended rows, or `None` if `current` is not an extension of
+        `previous`: its columns or dtypes differ, or some rows of `previous`
+        are missing or were modified.
+    """
+    if not previous.dtypes.equals(current.dtypes):
+        return None
+    previous_hashes = row_hashes(previous)
+    current_hashes = row_hashes(current)
+    # Rows are usually appended at the end, which is checked without sorting
+    if len(current_hashes) >= len(previous_hashes) and np.array_equal(
+        previous_hashes, current_hashes[: len(previous_hashes)]
+    ):
+        return current.iloc[len(previous_hashes) :]
+    if not np.isin(previous_hashes, current_hashes).all():
+        return None
+    return current[~np.isin(current_hashes, previous_hashes)]
+
+
+def continue_training(
+    model: ClassifierMixin,
+    previous: pd.DataFrame,
+    delta: pd.DataFrame,
+    target: str,
+) -> Optional[ClassifierMixin]:
+    """Update a fitted model with the rows appended to its training data.
+
+    An `SGDClassifier` takes one `partial_fit` pass over the new rows. A
+    `RandomForestClassifier` keeps its trees and grows new ones with
+    `warm_start`, as many as keep the number of trees per training row
+    constant, and at least one. Like every tree of the forest, they are
+    fitted on bootstrap samples of all the rows, old and new, so they do not
+    overweight the new rows. Their number, and so the cost, still grows with
+    the new rows only.
+
+    Args:
+        model: The fitted model, which is not modified.
+        previous: The rows the model was trained on.
+        delta: The appended rows.
+        target: Name of the target column.
+
+    Returns:
+        The updated model, or `None` if this model cannot be updated with
+        these rows: an unsupported model type or labels the model does not
+        know.
+    """
+    # Imported here, as the feature engineering steps only need the hashes
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.linear_model import SGDClassifier
+
+    labels = set(np.unique(delta[target]))
+    if not labels <= set(model.classes_):
+        return None
+    if isinstance(model, SGDClassifier):
+        # The loaded coefficients may be read-only memory maps
+        model = copy.deepcopy(model)
+        model.partial_fit(delta.drop(columns=[target]), delta[target])
+        return model
+    if isinstance(model, RandomForestClassifier):
+        dataset = pd.concat([previous, delta], ignore_index=True)
+        new_trees = max(
+            1, math.ceil(model.n_estimators * len(delta) / max(len(previous), 1))
+        )
+        model = copy.copy(model)
+        model.estimators_ = list(model.estimators_)
+        model.set_params(warm_start=True, n_estimators=model.n_estimators + new_trees)
+        model.fit(dataset.drop(columns=[target]), dataset[target])
+        model.set_params(warm_start=False)
+        return model
+    return None
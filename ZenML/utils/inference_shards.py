@@ -0,0 +1,95 @@
+# MIT License
+# 
+# Copyright (c) ZenML GmbH 2024
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+# 
+
+"""Worker functions of the `sharded_inference` step.
+
+Every worker process receives the model and the preprocessing pipeline once,
+when it starts, and then preprocesses and predicts the row shards it is given.
+"""
+
+import os
+import time
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from sklearn.pipeline import Pipeline
+
+# Set once per worker process by `init_worker`
+_model: Any = None
+_preprocess_pipeline: Any = None
+_started: Any = None
+
+
+def init_worker(
+    model: Any, preprocess_pipeline: Pipeline, started: Optional[Any] = None
+):
+    """Keep the model and the preprocessing pipeline for every shard.
+
+    Args:
+        model: Trained model.
+        preprocess_pipeline: Pretrained `Pipeline` to process the shards.
+        started: Barrier of all the workers, waited for by `wait_started`.
+    """
+    global _model, _preprocess_pipeline, _started
+    _model = model
+    _preprocess_pipeline = preprocess_pipeline
+    _started = started
+
+
+def wait_started(timeout: float) -> int:
+    """Wait until every worker runs this, return the process ID.
+
+    One call per worker, submitted before the shards, holds every worker
+    until all of them are started, so that each then takes one shard
+    instead of the first started worker taking several.
+    """
+    _started.wait(timeout)
+    return os.getpid()
+
+
+def predict_shard(
+    shard: pd.DataFrame, target: str
+) -> Tuple[np.ndarray, Dict[str, Any]]:
+    """Preprocess and predict one shard, like the serial inference steps.
+
+    Args:
+        shard: Rows of the inference dataset.
+        target: Name of the target column of the preprocessing pipeline.
+
+    Returns:
+        The predictions, and the process ID and timings of the shard.
+    """
+    start = time.perf_counter()
+    # The pipeline expects the target column, as in `inference_preprocessor`
+    shard[target] = 1
+    features = _preprocess_pipeline.transform(shard)
+    features.drop(columns=[target], inplace=True)
+    preprocessed = time.perf_counter()
+    predictions = _model.predict(features)
+    return predictions, {
+        "pid": os.getpid(),
+        "rows": len(shard),
+        "preprocess_s": preprocessed - start,
+        "predict_s": time.perf_counter() - preprocessed,
+    }
@@ -0,0 +1,65 @@
+# MIT License
+# 
+# Copyright (c) ZenML GmbH 2024
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+# 
+
+import importlib
+import sys
+import types
+from typing import Dict
+
+
+class _LazyPackage(types.ModuleType):
+    """Package whose exported objects are imported on first access."""
+
+    def __getattr__(self, name: str):
+        # Only called for attributes that are not bound yet
+        module_name = self.__dict__.get("_lazy_exports", {}).get(name)
+        if module_name is None:
+            raise AttributeError(
+                f"module {self.__name__!r} has no attribute {name!r}"
+            )
+        return getattr(importlib.import_module(module_name), name)
+
+    def __setattr__(self, name: str, value):
+        # Importing a submodule binds it on its package. Bind the object it
+        #  exports instead, as `from .data_loader import data_loader` would,
+        #  whoever triggers the import.
+        module_name = self.__dict__.get("_lazy_exports", {}).get(name)
+        if isinstance(value, types.ModuleType) and value.__name__ == module_name:
+            value = getattr(value, name, value)
+        super().__setattr__(name, value)
+
+    def __dir__(self):
+        return sorted(set(super().__dir__()) | set(self._lazy_exports))
+
+
+def lazy_package(package_name: str, exports: Dict[str, str]):
+    """Defer the import of the objects exported by a package.
+
+    Args:
+        package_name: Name of the package, i.e. `__name__` in its `__init__`.
+        exports: Maps every exported name to the module defining it.
+    """
+    package = sys.modules[package_name]
+    package._lazy_exports = exports
+    package.__all__ = list(exports)
+    package.__class__ = _LazyPackage
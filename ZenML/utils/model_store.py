@@ -0,0 +1,216 @@
+# MIT License
+# 
+# Copyright (c) ZenML GmbH 2024
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+# 
+
+"""Compact, versioned storage format for trained models.
+
+A model is stored in a directory: the large NumPy arrays it holds are saved
+as uncompressed `.npy` files, the rest of the object is pickled into a small
+skeleton that refers to the arrays by index, and a `model.json` header
+records the format version, the library versions and the SHA-256 of every
+file. Loading memory-maps the arrays, so only the pages a prediction reads
+are loaded from disk.
+"""
+
+import hashlib
+import io
+import json
+import os
+import pickle
+import platform
+import warnings
+from typing import Any, Dict, List
+
+import numpy as np
+
+FORMAT = "compact-model"
+FORMAT_VERSION = 1
+HEADER_FILENAME = "model.json"
+SKELETON_FILENAME = "skeleton.pkl"
+
+# Smaller arrays are cheaper to keep in the skeleton than in their own file
+MIN_ARRAY_BYTES = 64 * 1024
+
+
+def _sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(2**20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _versions() -> Dict[str, str]:
+    versions = {"python": platform.python_version(), "numpy": np.__version__}
+    try:
+        import sklearn
+
+        versions["sklearn"] = sklearn.__version__
+    except ImportError:
+        pass
+    return versions
+
+
+class _ArrayPickler(pickle.Pickler):
+    def __init__(self, file, directory: str, min_array_bytes: int):
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.directory = directory
+        self.min_array_bytes = min_array_bytes
+        self.arrays: List[Dict[str, Any]] = []
+        self._ids: Dict[int, int] = {}
+
+    def persistent_id(self, obj: Any):
+        if (
+            not isinstance(obj, np.ndarray)
+            or obj.dtype.hasobject
+            or obj.nbytes < self.min_array_bytes
+        ):
+            return None
+        # An array referenced twice is stored once
+        if id(obj) not in self._ids:
+            index = len(self.arrays)
+            filename = f"array_{index}.npy"
+            np.save(os.path.join(self.directory, filename), obj, allow_pickle=False)
+            self._ids[id(obj)] = index
+            self.arrays.append(
+                {"file": filename, "shape": list(obj.shape), "dtype": obj.dtype.str}
+            )
+        return ("ndarray", self._ids[id(obj)])
+
+
+class _ArrayUnpickler(pickle.Unpickler):
+    def __init__(self, file, arrays: List[np.ndarray]):
+        super().__init__(file)
+        self.arrays = arrays
+
+    def persistent_load(self, pid: Any):
+        kind, index = pid
+        if kind != "ndarray":
+            raise pickle.UnpicklingError(f"Unknown persistent id {pid!r}.")
+        return self.arrays[index]
+
+
+def save_model(
+    model: Any, path: str, min_array_bytes: int = MIN_ARRAY_BYTES
+) -> Dict[str, Any]:
+    """Save `model` in the compact format.
+
+    Args:
+        model: The model, any picklable object.
+        path: The directory to write, created if needed.
+        min_array_bytes: Arrays of at least this size get their own file.
+
+    Returns:
+        The header written to `model.json`.
+    """
+    os.makedirs(path, exist_ok=True)
+    skeleton = io.BytesIO()
+    pickler = _ArrayPickler(skeleton, path, min_array_bytes)
+    pickler.dump(model)
+    with open(os.path.join(path, SKELETON_FILENAME), "wb") as f:
+        f.write(skeleton.getvalue())
+
+    for array in pickler.arrays:
+        array["sha256"] = _sha256(os.path.join(path, array["file"]))
+    header = {
+        "format": FORMAT,
+        "format_version": FORMAT_VERSION,
+        "class": f"{type(model).__module__}.{type(model).__qualname__}",
+        "versions": _versions(),
+        "skeleton": {
+            "file": SKELETON_FILENAME,
+            "sha256": hashlib.sha256(skeleton.getvalue()).hexdigest(),
+        },
+        "arrays": pickler.arrays,
+    }
+    with open(os.path.join(path, HEADER_FILENAME), "w") as f:
+        json.dump(header, f, indent=2)
+    return header
+
+
+def read_header(path: str) -> Dict[str, Any]:
+    """Read the `model.json` header of a model saved by `save_model`.
+
+    Raises:
+        ValueError: If the directory does not hold a supported format.
+    """
+    with open(os.path.join(path, HEADER_FILENAME)) as f:
+        header = json.load(f)
+    if header.get("format") != FORMAT or header.get("format_version") != FORMAT_VERSION:
+        raise ValueError(
+            f"Unsupported model format {header.get('format')} "
+            f"version {header.get('format_version')} in {path}."
+        )
+    return header
+
+
+def load_model(path: str, mmap: bool = True, verify: bool = False) -> Any:
+    """Load a model saved by `save_model`.
+
+    The skeleton checksum is always checked. The arrays are memory-mapped
+    read-only unless `mmap` is False, and their checksums are only checked
+    with `verify`, as it reads them entirely.
+
+    Args:
+        path: The model directory.
+        mmap: Whether to memory-map the arrays instead of reading them.
+        verify: Whether to check the checksums of the arrays.
+
+    Returns:
+        The model.
+
+    Raises:
+        ValueError: If the format is not supported or a checksum differs.
+    """
+    header = read_header(path)
+    with open(os.path.join(path, header["skeleton"]["file"]), "rb") as f:
+        skeleton = f.read()
+    if hashlib.sha256(skeleton).hexdigest() != header["skeleton"]["sha256"]:
+        raise ValueError(f"The model skeleton in {path} does not match its checksum.")
+    if verify:
+        for array in header["arrays"]:
+            if _sha256(os.path.join(path, array["file"])) != array["sha256"]:
+                raise ValueError(
+                    f"{array['file']} in {path} does not match its checksum."
+                )
+
+    current = _versions()
+    changed = {
+        name: (version, current.get(name))
+        for name, version in header["versions"].items()
+        if current.get(name) != version
+    }
+    if changed:
+        warnings.warn(
+            f"The model in {path} was saved with other library versions "
+            f"(saved, current): {changed}. Loading it anyway."
+        )
+
+    arrays = [
+        np.load(
+            os.path.join(path, array["file"]),
+            mmap_mode="r" if mmap else None,
+            allow_pickle=False,
+        )
+        for array in header["arrays"]
+    ]
+    return _ArrayUnpickler(io.BytesIO(skeleton), arrays).load()
@@ -0,0 +1,193 @@
+# MIT License
+# 
+# Copyright (c) ZenML GmbH 2024
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+# 
+
+import multiprocessing
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Tuple
+
+
+@dataclass
+class PipelineTask:
+    """A pipeline run scheduled as one node of the orchestration graph."""
+
+    name: str
+    target: Callable[..., Any]
+    kwargs: Dict[str, Any] = field(default_factory=dict)
+    depends_on: List[str] = field(default_factory=list)
+
+
+@dataclass
+class TaskTiming:
+    """Wall clock start and end of a finished task, in seconds since epoch."""
+
+    start: float
+    end: float
+
+    @property
+    def duration(self) -> float:
+        return self.end - self.start
+
+
+def _timed_call(
+    target: Callable[..., Any], kwargs: Dict[str, Any]
+) -> Tuple[float, float]:
+    start = time.time()
+    target(**kwargs)
+    return start, time.time()
+
+
+def _topological_order(tasks: List[PipelineTask]) -> List[PipelineTask]:
+    by_name = {task.name: task for task in tasks}
+    for task in tasks:
+        for dependency in task.depends_on:
+            if dependency not in by_name:
+                raise ValueError(
+                    f"Task `{task.name}` depends on unknown task `{dependency}`."
+                )
+
+    ordered: List[PipelineTask] = []
+    visiting, done = set(), set()
+
+    def visit(task: PipelineTask):
+        if task.name in done:
+            return
+        if task.name in visiting:
+            raise ValueError(f"Dependency cycle detected at task `{task.name}`.")
+        visiting.add(task.name)
+        for dependency in task.depends_on:
+            visit(by_name[dependency])
+        visiting.discard(task.name)
+        done.add(task.name)
+        ordered.append(task)
+
+    for task in tasks:
+        visit(task)
+    return ordered
+
+
+def run_task_graph(
+    tasks: List[PipelineTask], max_parallel: int = 1
+) -> Dict[str, TaskTiming]:
+    """Run the tasks respecting their dependencies.
+
+    With `max_parallel == 1` the tasks run one after another in the current
+    process. Otherwise every task runs in its own worker process (ZenML client
+    state is process global, so pipelines are not run in threads) and as many
+    independent tasks as allowed by `max_parallel` run at the same time.
+
+    Args:
+        tasks: The tasks to run.
+        max_parallel: Maximum number of pipelines running at the same time.
+
+    Returns:
+        The timing of every task, keyed by task name.
+
+    Raises:
+        ValueError: If the graph is invalid or `max_parallel` is below 1.
+    """
+    if max_parallel < 1:
+        raise ValueError(f"`max_parallel` must be at least 1, got {max_parallel}.")
+    ordered = _topological_order(tasks)
+    timings: Dict[str, TaskTiming] = {}
+
+    if max_parallel == 1:
+        for task in ordered:
+            timings[task.name] = TaskTiming(*_timed_call(task.target, task.kwargs))
+        return timings
+
+    pending = list(ordered)
+    running = {}
+    with ProcessPoolExecutor(
+        max_workers=max_parallel, mp_context=multiprocessing.get_context("spawn")
+    ) as executor:
+        while pending or running:
+            ready = [
+                task
+                for task in pending
+                if all(dependency in timings for dependency in task.depends_on)
+            ]
+            for task in ready[: max_parallel - len(running)]:
+                pending.remove(task)
+                future = executor.submit(_timed_call, task.target, task.kwargs)
+                running[future] = task.name
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name = running.pop(future)
+                # Re-raises the error of a failed pipeline. Pipelines that are
+                # already running are waited for when leaving the executor.
+                timings[name] = TaskTiming(*future.result())
+    return timings
+
+
+def critical_path(
+    tasks: List[PipelineTask], timings: Dict[str, TaskTiming]
+) -> List[str]:
+    """Longest chain of dependent tasks, weighted by measured duration."""
+    finish: Dict[str, float] = {}
+    previous: Dict[str, str] = {}
+    for task in _topological_order(tasks):
+        start = 0.0
+        for dependency in task.depends_on:
+            if finish[dependency] > start:
+                start = finish[dependency]
+                previous[task.name] = dependency
+        finish[task.name] = start + timings[task.name].duration
+
+    name = max(finish, key=finish.get)
+    path = [name]
+    while name in previous:
+        name = previous[name]
+        path.append(name)
+    return path[::-1]
+
+
+def format_timing_report(
+    tasks: List[PipelineTask], timings: Dict[str, TaskTiming]
+) -> str:
+    """Render a per-task timing table with the critical path highlighted."""
+    path = critical_path(tasks, timings)
+    origin = min(timing.start for timing in timings.values())
+    wall_time = max(timing.end for timing in timings.values()) - origin
+    serial_time = sum(timing.duration for timing in timings.values())
+
+    width = max(len(task.name) for task in tasks)
+    lines = [
+        f"{'stage':<{width}}  {'start':>8}  {'end':>8}  {'duration':>9}  critical",
+    ]
+    for task in sorted(tasks, key=lambda task: timings[task.name].start):
+        timing = timings[task.name]
+        lines.append(
+            f"{task.name:<{width}}  {timing.start - origin:>7.1f}s  "
+            f"{timing.end - origin:>7.1f}s  {timing.duration:>8.1f}s  "
+            f"{'*' if task.name in path else ''}".rstrip()
+        )
+    lines.append("")
+    lines.append(f"Critical path: {' -> '.join(path)}")
+    lines.append(
+        f"Wall time: {wall_time:.1f}s (sum of stages: {serial_time:.1f}s, "
+        f"critical path: {sum(timings[name].duration for name in path):.1f}s)"
+    )
+    return "\n".join(lines)
@@ -0,0 +1,221 @@
+# MIT License
+# 
+# Copyright (c) ZenML GmbH 2024
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+# 
+
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Any, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_numeric_dtype
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import MinMaxScaler
+
+from utils.preprocess import ColumnsDropper, NADropper
+from utils.shards import shard_statistics, shard_transform
+
+# Below this many rows the process pool costs more than it saves
+MIN_PARALLEL_ROWS = 100_000
+
+
+class _Plan:
+    """What the row-wise steps of a pipeline do, up to its MinMaxScaler."""
+
+    def __init__(
+        self,
+        drop_na: bool,
+        columns: List[int],
+        column_names: pd.Index,
+        scaler: MinMaxScaler,
+        remaining_steps: List[Any],
+    ):
+        self.drop_na = drop_na
+        self.columns = columns
+        self.column_names = column_names
+        self.scaler = scaler
+        self.remaining_steps = remaining_steps
+
+
+def _make_plan(pipeline: Pipeline, dataset: pd.DataFrame) -> Optional[_Plan]:
+    if not all(is_numeric_dtype(dtype) for dtype in dataset.dtypes):
+        return None
+    drop_na = False
+    columns = dataset.columns
+    for i, (_, step) in enumerate(pipeline.steps):
+        if step == "passthrough" or step is None:
+            continue
+        if isinstance(step, NADropper):
+            drop_na = True
+        elif isinstance(step, ColumnsDropper):
+            columns = columns.drop(step.columns)
+        elif isinstance(step, MinMaxScaler):
+            return _Plan(
+                drop_na=drop_na,
+                columns=[dataset.columns.get_loc(column) for column in columns],
+                column_names=columns,
+                scaler=step,
+                remaining_steps=[step for _, step in pipeline.steps[i + 1 :]],
+            )
+        else:
+            return None
+    return None
+
+
+def _create(shape: Tuple[int, int], dtype: np.dtype) -> shared_memory.SharedMemory:
+    size = max(int(np.prod(shape)) * np.dtype(dtype).itemsize, 1)
+    return shared_memory.SharedMemory(create=True, size=size)
+
+
+class ShardedPreprocessor:
+    """Fits and applies a preprocessing pipeline on row shards in parallel.
+
+    Supported pipelines drop NA rows and columns with `NADropper` and
+    `ColumnsDropper` and then normalize with a `MinMaxScaler`, followed by
+    any other steps. The dataset is copied once into shared memory and
+    split into one row shard per worker process. Each worker computes the
+    rows it keeps and the column min and max of its shard, the parent
+    reduces them into the fitted scaler, and the workers scale their shards
+    into a shared output array. The steps after the scaler run in the
+    parent. The result is identical to `Pipeline.fit_transform` and
+    `Pipeline.transform`.
+
+    Other pipelines, non-numeric datasets and datasets of fewer than
+    `MIN_PARALLEL_ROWS` rows are processed by the pipeline itself.
+    """
+
+    def __init__(self, pipeline: Pipeline, n_jobs: int):
+        self.pipeline = pipeline
+        self.n_jobs = n_jobs
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def __enter__(self) -> "ShardedPreprocessor":
+        return self
+
+    def __exit__(self, *exc_info):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def _plan(self, dataset: pd.DataFrame) -> Optional[_Plan]:
+        if self.n_jobs < 2 or len(dataset) < MIN_PARALLEL_ROWS:
+            return None
+        return _make_plan(self.pipeline, dataset)
+
+    def _map(self, func, *iterables) -> List[Any]:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.n_jobs,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return list(self._executor.map(func, *iterables))
+
+    def _run(self, dataset: pd.DataFrame, plan: _Plan, fit: bool):
+        # Like `check_array` in the scaler, float32 data stays float32 and
+        #  everything else becomes float64
+        dtypes = list(dataset.dtypes)
+        dtype = np.dtype(np.float64)
+        if all(isinstance(column_dtype, np.dtype) for column_dtype in dtypes):
+            if np.result_type(*dtypes) in (np.float32, np.float16):
+                dtype = np.result_type(*dtypes)
+        bounds = np.linspace(0, len(dataset), self.n_jobs + 1).astype(int)
+        shards = list(zip(bounds[:-1], bounds[1:]))
+
+        shm = _create(dataset.shape, dtype)
+        shm_out = None
+        try:
+            X = np.ndarray(dataset.shape, dtype=dtype, buffer=shm.buf, order="F")
+            for j, column in enumerate(dataset.columns):
+                X[:, j] = dataset[column].to_numpy(dtype=dtype, na_value=np.nan)
+            del X
+            shared = (shm.name, dataset.shape, dtype.str)
+
+            n = len(shards)
+            statistics = self._map(
+                shard_statistics,
+                [shared] * n,
+                shards,
+                [plan.columns] * n,
+                [plan.drop_na] * n,
+            )
+            n_rows = [rows for rows, _, _ in statistics]
+            if fit:
+                self._fit_scaler(plan, statistics, dtype)
+
+            scaler = plan.scaler
+            out_shape = (sum(n_rows), len(plan.columns))
+            shm_out = _create(out_shape, dtype)
+            shared_out = (shm_out.name, out_shape, dtype.str)
+            self._map(
+                shard_transform,
+                [shared] * n,
+                [shared_out] * n,
+                shards,
+                np.cumsum([0] + n_rows[:-1]),
+                [plan.columns] * n,
+                [plan.drop_na] * n,
+                [scaler.scale_] * n,
+                [scaler.min_] * n,
+                [scaler.feature_range if scaler.clip else None] * n,
+            )
+            out = np.ndarray(out_shape, dtype=dtype, buffer=shm_out.buf, order="F")
+            transformed = np.array(out, order="F")
+            del out
+        finally:
+            shm.close()
+            shm.unlink()
+            if shm_out is not None:
+                shm_out.close()
+                shm_out.unlink()
+
+        for step in plan.remaining_steps:
+            if step == "passthrough" or step is None:
+                continue
+            if fit:
+                step.fit(transformed)
+            transformed = step.transform(transformed)
+        return transformed
+
+    @staticmethod
+    def _fit_scaler(plan: _Plan, statistics: List[Any], dtype: np.dtype):
+        mins = np.fmin.reduce([shard_mins for _, shard_mins, _ in statistics])
+        maxs = np.fmax.reduce([shard_maxs for _, _, shard_maxs in statistics])
+        # Fitting on the reduced min and max rows sets every attribute the
+        #  way a fit on the whole dataset does
+        extremes = np.vstack([mins, maxs]).astype(dtype)
+        plan.scaler.fit(pd.DataFrame(extremes, columns=plan.column_names))
+        plan.scaler.n_samples_seen_ = sum(rows for rows, _, _ in statistics)
+
+    def fit_transform(self, dataset: pd.DataFrame):
+        """Fit the pipeline on `dataset` and transform it."""
+        plan = self._plan(dataset)
+        if plan is None:
+            return self.pipeline.fit_transform(dataset)
+        return self._run(dataset, plan, fit=True)
+
+    def transform(self, dataset: pd.DataFrame):
+        """Transform `dataset` with the fitted pipeline."""
+        plan = self._plan(dataset)
+        if plan is None:
+            return self.pipeline.transform(dataset)
+        return self._run(dataset, plan, fit=False)
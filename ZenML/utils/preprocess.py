@@ -23,6 +23,7 @@
 
 from typing import Union
 
+import numpy as np
 import pandas as pd
 
 
@@ -60,3 +61,71 @@ class DataFrameCaster:
 
     def transform(self, X):
         return pd.DataFrame(X, columns=self.columns)
+
+
+class DtypeOptimizer:
+    """Support class to downcast column types in sklearn Pipeline.
+
+    Float columns become float32 when the values seen in `fit` survive the
+    round trip within `rtol`, integer columns take the smallest integer type
+    holding their fitted range and non-numeric columns with at most
+    `max_categories` distinct values become categoricals. Numeric columns
+    stay numeric even with few distinct values, so the steps that only take
+    numeric columns, like the feature sketches and the sharded preprocessing,
+    still see them. The float columns rounded to float32 are listed in
+    `rounded_columns_`.
+    """
+
+    def __init__(self, rtol: float = 1e-6, max_categories: int = 32):
+        self.rtol = rtol
+        self.max_categories = max_categories
+
+    def fit(self, X: pd.DataFrame, *args, **kwargs):
+        self.dtypes_ = {}
+        self.int_ranges_ = {}
+        self.rounded_columns_ = []
+        for column in X.columns:
+            values = X[column]
+            if pd.api.types.is_bool_dtype(values):
+                continue
+            if pd.api.types.is_float_dtype(values):
+                if values.dtype.itemsize > 4 and self._fits_float32(values):
+                    self.dtypes_[column] = np.float32
+                    self.rounded_columns_.append(column)
+            elif pd.api.types.is_integer_dtype(values) and not values.hasnans:
+                low, high = values.min(), values.max()
+                for dtype in (np.int8, np.int16, np.int32):
+                    info = np.iinfo(dtype)
+                    if info.min <= low and high <= info.max:
+                        if np.dtype(dtype).itemsize < values.dtype.itemsize:
+                            self.dtypes_[column] = dtype
+                            self.int_ranges_[column] = (info.min, info.max)
+                        break
+            elif not isinstance(values.dtype, pd.CategoricalDtype):
+                categories = values.dropna().unique()
+                if len(categories) <= self.max_categories:
+                    self.dtypes_[column] = pd.CategoricalDtype(sorted(categories))
+        return self
+
+    def _fits_float32(self, values: pd.Series) -> bool:
+        values = values.to_numpy(dtype=np.float64, na_value=np.nan)
+        finite = values[np.isfinite(values)]
+        if len(finite) == 0:
+            return True
+        with np.errstate(over="ignore"):
+            error = np.abs(finite.astype(np.float32).astype(np.float64) - finite)
+        return bool(np.all(error <= self.rtol * np.abs(finite)))
+
+    def transform(self, X: pd.DataFrame):
+        dtypes = {}
+        for column, dtype in self.dtypes_.items():
+            if column not in X.columns:
+                continue
+            if column in self.int_ranges_:
+                # Never wrap around: keep the original type if unseen values
+                #  fall outside of the range of the smaller one
+                low, high = self.int_ranges_[column]
+                if not (low <= X[column].min() and X[column].max() <= high):
+                    continue
+            dtypes[column] = dtype
+        return X.astype(dtypes)
@@ -0,0 +1,301 @@
+# MIT License
+# 
+# Copyright (c) ZenML GmbH 2024
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+# 
+
+import functools
+import os
+import pickle
+import sys
+import threading
+import time
+import traceback
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+from typing_extensions import Annotated, get_args, get_origin, get_type_hints
+from zenml import log_artifact_metadata
+from zenml.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Set to `1` to profile every step of the project, or to `flame` to also
+#  collect a sampled flame profile of each step.
+PROFILING_ENV = "ZENML_STARTER_PROFILING"
+
+_SAMPLE_INTERVAL = 0.01
+_MAX_FLAME_STACKS = 200
+
+
+def profiling_mode() -> Optional[str]:
+    """Profiling mode requested through the `ZENML_STARTER_PROFILING` variable."""
+    value = os.environ.get(PROFILING_ENV, "").strip().lower()
+    if value in ("", "0", "false", "no", "off"):
+        return None
+    return "flame" if value == "flame" else "basic"
+
+
+def _current_rss() -> Optional[int]:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return None
+
+
+def _max_rss() -> int:
+    import resource
+
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS reports bytes
+    return max_rss if sys.platform == "darwin" else max_rss * 1024
+
+
+class StepProfiler:
+    """Measures the resources used while the profiled block runs.
+
+    A background thread samples the resident set size of the process and,
+    when `flame` is set, the call stack of the profiled thread, so that the
+    peak memory of the step is not hidden by the peak of earlier steps run
+    in the same process.
+    """
+
+    def __init__(self, flame: bool = False):
+        self.flame = flame
+        self.stacks: Counter = Counter()
+        self.peak_rss = 0
+        self._stop = threading.Event()
+
+    def __enter__(self) -> "StepProfiler":
+        self._thread_id = threading.get_ident()
+        self._sampler = threading.Thread(target=self._sample, daemon=True)
+        self.start_rss = _current_rss() or _max_rss()
+        self.peak_rss = self.start_rss
+        self._wall_start = time.perf_counter()
+        self._cpu_start = time.process_time()
+        self._sampler.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.wall_time = time.perf_counter() - self._wall_start
+        self.cpu_time = time.process_time() - self._cpu_start
+        self._stop.set()
+        self._sampler.join()
+        rss = _current_rss()
+        if rss is None:
+            self.peak_rss = _max_rss()
+        else:
+            self.peak_rss = max(self.peak_rss, rss)
+
+    def _sample(self):
+        while not self._stop.wait(_SAMPLE_INTERVAL):
+            rss = _current_rss()
+            if rss is not None and rss > self.peak_rss:
+                self.peak_rss = rss
+            if self.flame:
+                frame = sys._current_frames().get(self._thread_id)
+                if frame is not None:
+                    stack = traceback.extract_stack(frame)
+                    self.stacks[
+                        ";".join(
+                            f"{os.path.basename(entry.filename)}:{entry.name}"
+                            for entry in stack
+                        )
+                    ] += 1
+
+    def folded_stacks(self) -> str:
+        """Most frequent sampled stacks in the folded format of `flamegraph.pl`."""
+        return "\n".join(
+            f"{stack} {count}"
+            for stack, count in self.stacks.most_common(_MAX_FLAME_STACKS)
+        )
+
+
+def _rows(value: Any) -> int:
+    if isinstance(value, (pd.DataFrame, pd.Series)) or hasattr(value, "shape"):
+        return len(value)
+    return 0
+
+
+def _size_in_bytes(value: Any) -> int:
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(deep=True))
+    if hasattr(value, "nbytes"):
+        return int(value.nbytes)
+    try:
+        return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return sys.getsizeof(value)
+
+
+def _output_name(annotation: Any, default: str) -> str:
+    if get_origin(annotation) is Annotated:
+        for marker in get_args(annotation)[1:]:
+            if isinstance(marker, str):
+                return marker
+            if getattr(marker, "name", None):
+                return marker.name
+    return default
+
+
+def output_names(func: Callable[..., Any]) -> List[str]:
+    """Names of the artifacts a step function returns, as ZenML names them."""
+    annotation = get_type_hints(func, include_extras=True).get("return")
+    if get_origin(annotation) in (tuple, Tuple):
+        return [
+            _output_name(item, f"output_{i}")
+            for i, item in enumerate(get_args(annotation))
+        ]
+    return [_output_name(annotation, "output")]
+
+
+def profiled(func: Callable[..., Any]) -> Callable[..., Any]:
+    """Opt-in profiling of a step function.
+
+    Apply it below `@step`. When profiling is enabled through the
+    `ZENML_STARTER_PROFILING` environment variable, the wall time, CPU time,
+    peak RSS and its increase during the call, rows in/out and bytes of the
+    outputs of every call are attached as `profile` metadata to each output
+    artifact of the step. Otherwise the step function is called unchanged.
+
+    Args:
+        func: The step function.
+
+    Returns:
+        The wrapped step function.
+    """
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        mode = profiling_mode()
+        if mode is None:
+            return func(*args, **kwargs)
+
+        with StepProfiler(flame=mode == "flame") as profiler:
+            outputs = func(*args, **kwargs)
+
+        names = output_names(func)
+        values = list(outputs) if len(names) > 1 else [outputs]
+        profile = {
+            "wall_time_s": round(profiler.wall_time, 4),
+            "cpu_time_s": round(profiler.cpu_time, 4),
+            "peak_rss_mb": round(profiler.peak_rss / 2**20, 2),
+            # Memory the step itself needed, without that of the process
+            "peak_rss_increase_mb": round(
+                (profiler.peak_rss - profiler.start_rss) / 2**20, 2
+            ),
+            "rows_in": sum(_rows(value) for value in (*args, *kwargs.values())),
+            "rows_out": sum(_rows(value) for value in values),
+            "bytes_out": sum(_size_in_bytes(value) for value in values),
+        }
+        if profiler.flame:
+            profile["flame"] = profiler.folded_stacks()
+        logger.info(
+            f"Step `{func.__name__}` profile: "
+            + ", ".join(f"{k}={v}" for k, v in profile.items() if k != "flame")
+        )
+        for name in names:
+            log_artifact_metadata(metadata={"profile": profile}, artifact_name=name)
+        return outputs
+
+    return wrapper
+
+
+def step_profiles(run: Any) -> Dict[str, Dict[str, Any]]:
+    """Profiles of the steps of a pipeline run, by step name.
+
+    Args:
+        run: The pipeline run, as returned by the ZenML client.
+
+    Returns:
+        The `profile` metadata of every profiled step of the run, without the
+        flame profile.
+    """
+    profiles: Dict[str, Dict[str, Any]] = {}
+    for step_name, step_run in run.steps.items():
+        for artifacts in step_run.outputs.values():
+            artifact = artifacts[0] if isinstance(artifacts, list) else artifacts
+            profile = artifact.run_metadata.get("profile")
+            if profile is None:
+                continue
+            profile = getattr(profile, "value", profile)
+            profiles[step_name] = {k: v for k, v in profile.items() if k != "flame"}
+            # All outputs of a step carry the same profile
+            break
+    return profiles
+
+
+def step_performance_trend(
+    pipeline_name: str, last_n_runs: int = 10
+) -> pd.DataFrame:
+    """Aggregate the step profiles of the latest runs of a pipeline.
+
+    Args:
+        pipeline_name: Name of the pipeline, e.g. `training`.
+        last_n_runs: How many of the latest runs to aggregate.
+
+    Returns:
+        One row per step with the median and latest measurements over the
+        profiled runs, and the latest wall time relative to the median. Empty
+        if the pipeline has no profiled runs, or never ran.
+    """
+    from zenml.client import Client
+
+    client = Client()
+    try:
+        pipeline = client.get_pipeline(pipeline_name)
+    except KeyError:
+        logger.info(f"Pipeline `{pipeline_name}` has never run, no step history.")
+        return pd.DataFrame()
+    runs = client.list_pipeline_runs(
+        pipeline_id=pipeline.id,
+        sort_by="desc:created",
+        size=last_n_runs,
+    )
+
+    records: List[Dict[str, Any]] = [
+        {"run": run.name, "created": run.created, "step": step_name, **profile}
+        for run in runs
+        for step_name, profile in step_profiles(run).items()
+    ]
+
+    if not records:
+        return pd.DataFrame()
+
+    df = pd.DataFrame(records).sort_values("created")
+    grouped = df.groupby("step")
+    trend = grouped.agg(
+        runs=("run", "count"),
+        wall_time_s_median=("wall_time_s", "median"),
+        wall_time_s_last=("wall_time_s", "last"),
+        cpu_time_s_median=("cpu_time_s", "median"),
+        peak_rss_mb_median=("peak_rss_mb", "median"),
+        peak_rss_mb_last=("peak_rss_mb", "last"),
+        rows_out_last=("rows_out", "last"),
+        bytes_out_last=("bytes_out", "last"),
+    )
+    trend["wall_time_trend"] = (
+        trend["wall_time_s_last"] / trend["wall_time_s_median"]
+    ).round(2)
+    return trend.sort_values("wall_time_s_median", ascending=False)
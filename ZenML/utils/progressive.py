@@ -0,0 +1,186 @@
+# MIT License
+# 
+# Copyright (c) ZenML GmbH 2024
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+# 
+
+"""Accuracy estimated on a growing stratified sample, stopping early.
+
+Scoring every row of a very large test set is often more than a promotion
+decision needs: the decision only depends on which side of a few accuracy
+thresholds the model is. `progressive_accuracy` scores the rows in stratified
+random batches and keeps a confidence interval on the accuracy, and stops as
+soon as no threshold is inside the interval.
+"""
+
+import math
+from dataclasses import dataclass
+from statistics import NormalDist
+from typing import Iterable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from sklearn.base import ClassifierMixin
+
+
+@dataclass
+class AccuracyEstimate:
+    """Accuracy of a model on a dataset, with a confidence interval."""
+
+    accuracy: float
+    lower: float
+    upper: float
+    rows: int
+    total_rows: int
+    confidence: float
+
+    @property
+    def exact(self) -> bool:
+        """Whether every row was scored, so the accuracy is exact."""
+        return self.rows == self.total_rows
+
+    def decides(self, threshold: float) -> bool:
+        """Whether the interval is entirely on one side of `threshold`."""
+        return threshold < self.lower or threshold > self.upper
+
+
+def exact_accuracy(
+    model: ClassifierMixin, dataset: pd.DataFrame, target: str
+) -> AccuracyEstimate:
+    """Accuracy of a model scored on every row of the dataset."""
+    accuracy = float(model.score(dataset.drop(columns=[target]), dataset[target]))
+    return AccuracyEstimate(
+        accuracy=accuracy,
+        lower=accuracy,
+        upper=accuracy,
+        rows=len(dataset),
+        total_rows=len(dataset),
+        confidence=1.0,
+    )
+
+
+def stratified_order(
+    labels: np.ndarray, random_state: Optional[int] = None
+) -> np.ndarray:
+    """Random order of the rows in which every prefix is stratified by label.
+
+    The rows of every label are shuffled and spread evenly over `[0, 1)`,
+    then all rows are sorted by position, so any number of first rows holds
+    every label in about its proportion of the whole dataset.
+    """
+    rng = np.random.default_rng(random_state)
+    position = np.empty(len(labels), dtype=np.float64)
+    for label in np.unique(labels):
+        rows = np.flatnonzero(labels == label)
+        rng.shuffle(rows)
+        position[rows] = (np.arange(len(rows)) + rng.random()) / len(rows)
+    return np.argsort(position, kind="stable")
+
+
+def _estimate(
+    scored: np.ndarray, correct: np.ndarray, totals: np.ndarray, z: float
+) -> Tuple[float, float, float]:
+    """Stratified accuracy and its normal interval, from per label counts."""
+    weights = totals / totals.sum()
+    accuracy = float(weights @ (correct / np.maximum(scored, 1)))
+    # Adding two pseudo rows, one right and one wrong, per label keeps the
+    #  variance positive for labels that were always right or always wrong
+    smoothed = (correct + 1) / (scored + 2)
+    # Finite population correction, no variance once all rows are scored
+    unscored = (totals - scored) / np.maximum(totals - 1, 1)
+    variance = float(
+        weights**2 @ (smoothed * (1 - smoothed) / (scored + 2) * unscored)
+    )
+    half_width = z * math.sqrt(variance)
+    return accuracy, max(0.0, accuracy - half_width), min(1.0, accuracy + half_width)
+
+
+def progressive_accuracy(
+    model: ClassifierMixin,
+    dataset: pd.DataFrame,
+    target: str,
+    thresholds: Iterable[Optional[float]] = (),
+    confidence: float = 0.95,
+    tolerance: float = 0.005,
+    batch_rows: int = 10_000,
+    random_state: Optional[int] = 17,
+) -> AccuracyEstimate:
+    """Estimate the accuracy of a model, scoring only as many rows as needed.
+
+    The rows are scored in batches of `batch_rows`, in a random order
+    stratified by label, and the accuracy is estimated per label and weighted
+    by the label proportions of the whole dataset. Scoring stops once every
+    threshold is outside the confidence interval, or once the interval is
+    narrower than twice `tolerance`: the model is then too close to a
+    threshold for the difference to matter. When all rows are scored, the
+    accuracy is exact.
+
+    The interval is checked after every batch, so the confidence of each
+    check is raised to keep the chance that any of them is wrong below
+    `1 - confidence`.
+
+    Args:
+        model: The model to evaluate.
+        dataset: The dataset, including the target column.
+        target: Name of the target column.
+        thresholds: Accuracies the decision depends on, `None` are ignored.
+        confidence: Confidence level of the interval.
+        tolerance: Half-width of the interval small enough to stop anyway.
+        batch_rows: Number of rows scored between two checks.
+        random_state: Seed of the order of the rows.
+
+    Returns:
+        The accuracy estimate.
+
+    Raises:
+        ValueError: If the dataset has no rows.
+    """
+    if len(dataset) == 0:
+        raise ValueError("Cannot estimate the accuracy of a model on no rows.")
+    X = dataset.drop(columns=[target])
+    y = dataset[target].to_numpy()
+    classes, labels = np.unique(y, return_inverse=True)
+    totals = np.bincount(labels, minlength=len(classes)).astype(np.float64)
+    thresholds = [t for t in thresholds if t is not None]
+    checks = max(1, math.ceil(len(dataset) / batch_rows))
+    z = NormalDist().inv_cdf(1 - (1 - confidence) / checks / 2)
+
+    order = stratified_order(labels, random_state)
+    scored = np.zeros(len(classes))
+    correct = np.zeros(len(classes))
+    for start in range(0, len(order), batch_rows):
+        rows = order[start : start + batch_rows]
+        hits = model.predict(X.iloc[rows]) == y[rows]
+        scored += np.bincount(labels[rows], minlength=len(classes))
+        correct += np.bincount(labels[rows], weights=hits, minlength=len(classes))
+        accuracy, lower, upper = _estimate(scored, correct, totals, z)
+        estimate = AccuracyEstimate(
+            accuracy=accuracy,
+            lower=lower,
+            upper=upper,
+            rows=start + len(rows),
+            total_rows=len(dataset),
+            confidence=confidence,
+        )
+        if upper - lower <= 2 * tolerance or all(
+            estimate.decides(t) for t in thresholds
+        ):
+            break
+    return estimate
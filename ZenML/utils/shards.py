@@ -0,0 +1,111 @@
+# MIT License
+# 
+# Copyright (c) ZenML GmbH 2024
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+# 
+
+"""Worker functions of `utils.parallel_preprocess`.
+
+They only depend on NumPy, so that the worker processes start quickly.
+"""
+
+import warnings
+from multiprocessing import shared_memory
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+# Name, shape and dtype of an array in shared memory, all a worker needs
+#  to attach to it
+SharedArray = Tuple[str, Tuple[int, int], str]
+
+
+def _attach(shared: SharedArray) -> Tuple[shared_memory.SharedMemory, np.ndarray]:
+    name, shape, dtype = shared
+    shm = shared_memory.SharedMemory(name=name)
+    # Column-major, so that every column of a shard is contiguous
+    return shm, np.ndarray(shape, dtype=dtype, buffer=shm.buf, order="F")
+
+
+def _complete_rows(shard: np.ndarray, drop_na: bool) -> Optional[np.ndarray]:
+    if not drop_na:
+        return None
+    complete = ~np.isnan(shard).any(axis=1)
+    return None if complete.all() else complete
+
+
+def shard_statistics(
+    shared: SharedArray, rows: Tuple[int, int], columns: List[int], drop_na: bool
+) -> Tuple[int, np.ndarray, np.ndarray]:
+    """Rows kept, and min and max of the kept columns, of one shard."""
+    shm, X = _attach(shared)
+    try:
+        shard = X[rows[0] : rows[1]]
+        complete = _complete_rows(shard, drop_na)
+        n_rows = len(shard) if complete is None else int(complete.sum())
+        mins = np.full(len(columns), np.nan, dtype=X.dtype)
+        maxs = np.full(len(columns), np.nan, dtype=X.dtype)
+        if n_rows:
+            with warnings.catch_warnings():
+                # All-NaN columns are reduced to NaN, like in a single fit
+                warnings.simplefilter("ignore", RuntimeWarning)
+                for j, column in enumerate(columns):
+                    values = shard[:, column]
+                    if complete is not None:
+                        values = values[complete]
+                    mins[j] = np.nanmin(values)
+                    maxs[j] = np.nanmax(values)
+        return n_rows, mins, maxs
+    finally:
+        del X, shard
+        shm.close()
+
+
+def shard_transform(
+    shared: SharedArray,
+    shared_out: SharedArray,
+    rows: Tuple[int, int],
+    out_start: int,
+    columns: List[int],
+    drop_na: bool,
+    scale: np.ndarray,
+    offset: np.ndarray,
+    clip_range: Optional[Tuple[float, float]],
+):
+    """Scale the kept rows and columns of one shard into the output array."""
+    shm, X = _attach(shared)
+    shm_out, out = _attach(shared_out)
+    try:
+        shard = X[rows[0] : rows[1]]
+        complete = _complete_rows(shard, drop_na)
+        for j, column in enumerate(columns):
+            values = shard[:, column]
+            if complete is not None:
+                values = values[complete]
+            # The same operations as `MinMaxScaler.transform`
+            target = out[out_start : out_start + len(values), j]
+            np.multiply(values, scale[j], out=target)
+            target += offset[j]
+            if clip_range is not None:
+                np.clip(target, clip_range[0], clip_range[1], out=target)
+    finally:
+        del X, out, shard
+        shm.close()
+        shm_out.close()
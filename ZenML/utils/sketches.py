@@ -0,0 +1,237 @@
+# MIT License
+# 
+# Copyright (c) ZenML GmbH 2024
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+# 
+
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+# Pseudo-count added to every bin in the population stability index, so
+#  that empty bins do not dominate it
+_PSI_PSEUDO_COUNT = 0.5
+
+
+class FeatureSketch:
+    """Mergeable summary of the values of one numeric feature.
+
+    The sketch keeps a histogram over fixed bin edges, the count of missing
+    values, the running mean and sum of squared deviations, and the min and
+    max. All of them can be updated chunk by chunk and two sketches with the
+    same edges, e.g. built on parallel chunks, merge into the sketch of the
+    concatenated data.
+    """
+
+    def __init__(self, edges: np.ndarray):
+        self.edges = edges
+        # Bin `i` counts the values in `(edges[i - 1], edges[i]]`, the first
+        #  and last bins are open-ended
+        self.counts = np.zeros(len(edges) + 1, dtype=np.int64)
+        self.n = 0
+        self.n_missing = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+
+    @classmethod
+    def from_values(cls, values: np.ndarray, n_bins: int = 10) -> "FeatureSketch":
+        """Sketch of `values`, with bin edges at their quantiles.
+
+        Args:
+            values: Values of the feature, NaN for missing values.
+            n_bins: Number of equal-frequency bins.
+
+        Returns:
+            The sketch.
+        """
+        present = values[~np.isnan(values)]
+        if len(present):
+            probabilities = np.linspace(0, 1, n_bins + 1)[1:-1]
+            edges = np.unique(np.quantile(present, probabilities))
+        else:
+            edges = np.empty(0)
+        sketch = cls(edges)
+        sketch.update(values)
+        return sketch
+
+    def empty_like(self) -> "FeatureSketch":
+        """Empty sketch with the same bin edges."""
+        return FeatureSketch(self.edges)
+
+    def update(self, values: np.ndarray):
+        """Add a chunk of values, NaN for missing values."""
+        missing = np.isnan(values)
+        present = values[~missing] if missing.any() else values
+        self.n_missing += int(missing.sum())
+        if not len(present):
+            return
+        # One counting pass per edge is faster than a binary search per
+        #  value for the few edges of a sketch
+        at_most = [np.count_nonzero(present <= edge) for edge in self.edges]
+        self.counts += np.diff(at_most, prepend=0, append=len(present))
+        chunk = FeatureSketch(self.edges)
+        chunk.n = len(present)
+        chunk.mean = float(present.mean())
+        deviations = present - chunk.mean
+        chunk.m2 = float(np.dot(deviations, deviations))
+        chunk.min = float(present.min())
+        chunk.max = float(present.max())
+        self._merge_moments(chunk)
+
+    def _merge_moments(self, other: "FeatureSketch"):
+        n = self.n + other.n
+        if n == 0:
+            return
+        delta = other.mean - self.mean
+        self.mean += delta * other.n / n
+        self.m2 += other.m2 + delta**2 * self.n * other.n / n
+        self.n = n
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def merge(self, other: "FeatureSketch") -> "FeatureSketch":
+        """Merge another sketch with the same bin edges into this one.
+
+        Args:
+            other: The sketch to merge.
+
+        Returns:
+            This sketch.
+
+        Raises:
+            ValueError: If the bin edges differ.
+        """
+        if not np.array_equal(self.edges, other.edges):
+            raise ValueError("Only sketches with the same bin edges can be merged.")
+        self.counts += other.counts
+        self.n_missing += other.n_missing
+        self._merge_moments(other)
+        return self
+
+    @property
+    def na_rate(self) -> float:
+        """Fraction of missing values."""
+        total = self.n + self.n_missing
+        return self.n_missing / total if total else 0.0
+
+    @property
+    def std(self) -> float:
+        """Sample standard deviation of the present values."""
+        return float(np.sqrt(self.m2 / (self.n - 1))) if self.n > 1 else 0.0
+
+    def quantiles(self, qs: Iterable[float]) -> np.ndarray:
+        """Approximate quantiles, interpolated linearly within the bins."""
+        qs = list(qs)
+        if self.n == 0:
+            return np.full(len(qs), np.nan)
+        edges = np.clip(self.edges, self.min, self.max)
+        bounds = np.concatenate([[self.min], edges, [self.max]])
+        cumulative = np.concatenate([[0.0], np.cumsum(self.counts) / self.n])
+        return np.interp(qs, cumulative, bounds)
+
+    def psi(self, reference: "FeatureSketch") -> float:
+        """Population stability index of this sketch against `reference`.
+
+        Values below 0.1 are usually read as no drift, above 0.2 as drift.
+        Without drift the index is still around `n_bins / n` for `n` values,
+        so it is only meaningful for many more values than bins.
+        """
+        if self.n == 0 or reference.n == 0:
+            return 0.0
+        expected = reference.counts + _PSI_PSEUDO_COUNT
+        expected /= expected.sum()
+        actual = self.counts + _PSI_PSEUDO_COUNT
+        actual /= actual.sum()
+        return float(((actual - expected) * np.log(actual / expected)).sum())
+
+
+class FeatureSketches:
+    """Sketches of all numeric features of a dataset."""
+
+    def __init__(self, sketches: Dict[str, FeatureSketch]):
+        self.sketches = sketches
+
+    @classmethod
+    def from_frame(
+        cls,
+        df: pd.DataFrame,
+        n_bins: int = 10,
+        exclude: Optional[List[str]] = None,
+    ) -> "FeatureSketches":
+        """Sketch every numeric column of `df`, except the `exclude` ones."""
+        exclude = set(exclude or [])
+        return cls(
+            {
+                str(column): FeatureSketch.from_values(
+                    df[column].to_numpy(dtype=np.float64, na_value=np.nan), n_bins
+                )
+                for column in df.select_dtypes("number").columns
+                if column not in exclude
+            }
+        )
+
+    def empty_like(self) -> "FeatureSketches":
+        """Empty sketches with the same features and bin edges."""
+        return FeatureSketches(
+            {name: sketch.empty_like() for name, sketch in self.sketches.items()}
+        )
+
+    def update(self, df: pd.DataFrame):
+        """Add a chunk of rows, columns without a sketch are ignored."""
+        for name, sketch in self.sketches.items():
+            if name in df.columns:
+                sketch.update(df[name].to_numpy(dtype=np.float64, na_value=np.nan))
+
+    def merge(self, other: "FeatureSketches") -> "FeatureSketches":
+        """Merge the sketches of another chunk into these ones."""
+        for name, sketch in self.sketches.items():
+            sketch.merge(other.sketches[name])
+        return self
+
+    def drift(self, reference: "FeatureSketches") -> pd.DataFrame:
+        """Per-feature drift of these sketches against `reference`.
+
+        Args:
+            reference: Sketches of the training data.
+
+        Returns:
+            One row per feature with the PSI, the NA rates and the shift of
+            the mean in reference standard deviations.
+        """
+        records = []
+        for name, expected in reference.sketches.items():
+            actual = self.sketches.get(name)
+            if actual is None:
+                continue
+            records.append(
+                {
+                    "feature": name,
+                    "psi": actual.psi(expected),
+                    "na_rate_reference": expected.na_rate,
+                    "na_rate": actual.na_rate,
+                    "mean_shift": (actual.mean - expected.mean) / expected.std
+                    if expected.std > 0
+                    else 0.0,
+                }
+            )
+        return pd.DataFrame(records).set_index("feature")
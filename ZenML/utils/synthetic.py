@@ -0,0 +1,95 @@
+# MIT License
+# 
+# Copyright (c) ZenML GmbH 2024
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+# 
+
+import numpy as np
+import pandas as pd
+from sklearn.datasets import load_breast_cancer
+
+_CHUNK_ROWS = 1_000_000
+
+
+def make_breast_cancer_like(
+    n_rows: int,
+    n_features: int = 30,
+    na_rate: float = 0.0,
+    random_state: int = 17,
+    target: str = "target",
+) -> pd.DataFrame:
+    """Generate a synthetic dataset with the schema of the Breast Cancer dataset.
+
+    Every feature is drawn from a normal distribution with the per-class mean
+    and standard deviation of the matching column of the real dataset, so the
+    generated data has the same column names, dtypes, scales and a similar
+    class balance, and stays learnable. Features beyond the 30 real ones are
+    named `feature_<i>` and reuse the statistics of the real columns in turn.
+    With the same seed, a larger dataset starts with the rows of a smaller
+    one, so growing `n_rows` appends rows.
+
+    Args:
+        n_rows: Number of rows to generate.
+        n_features: Number of feature columns.
+        na_rate: Fraction of feature values replaced by NA.
+        random_state: Seed of the random generator.
+        target: Name of the target column.
+
+    Returns:
+        The synthetic dataset with `n_features` float64 columns and an integer
+        target column.
+    """
+    reference = load_breast_cancer(as_frame=True)
+    real_columns = [str(name) for name in reference.feature_names]
+    columns = [
+        real_columns[i] if i < len(real_columns) else f"feature_{i}"
+        for i in range(n_features)
+    ]
+    source = [real_columns[i % len(real_columns)] for i in range(n_features)]
+    by_class = reference.frame.groupby("target")[source]
+    means = by_class.mean().to_numpy()
+    stds = by_class.std().to_numpy()
+    mins = reference.frame[source].min().to_numpy()
+
+    labels = np.empty(n_rows, dtype=np.int64)
+    values = np.empty((n_rows, n_features), dtype=np.float64)
+    # Generate in chunks to keep the temporaries small for large row counts.
+    #  Every chunk draws its labels, values and missing values from their own
+    #  generators, so a dataset is the first rows of any larger one
+    for index, start in enumerate(range(0, n_rows, _CHUNK_ROWS)):
+        chunk = slice(start, min(start + _CHUNK_ROWS, n_rows))
+        size = chunk.stop - chunk.start
+        label_rng, value_rng, na_rng = (
+            np.random.default_rng([random_state, index, stream]) for stream in range(3)
+        )
+        chunk_labels = (label_rng.random(size) < reference.target.mean()).astype(
+            np.int64
+        )
+        labels[chunk] = chunk_labels
+        values[chunk] = value_rng.standard_normal((size, n_features))
+        values[chunk] *= stds[chunk_labels]
+        values[chunk] += means[chunk_labels]
+        np.maximum(values[chunk], mins, out=values[chunk])
+        if na_rate > 0:
+            values[chunk][na_rng.random((size, n_features)) < na_rate] = np.nan
+
+    dataset = pd.DataFrame(values, columns=columns, copy=False)
+    dataset[target] = labels
+    return dataset
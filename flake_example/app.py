@@ -2,17 +2,78 @@
 # upon later.
 from flask import Flask
 from flask_restful import Api, Resource
-from resources.forecast import ForecastHandler, Forecaster
+from resources.forecast import ForecastHandler, Forecaster, ShadowHandler
+from resources.classifier import ClassifyHandler, Classifier
+from resources.feature_store import FeatureStore
+from resources.forecast_table import ForecastTableReader
+from resources.local_transport import LocalForecastServer
+from resources.request_log import RequestTracer, configure_logging, parse_sample_rates
+from resources.shadow import ShadowScorer
+import json
 import logging
+import os
 
-app = Flask(__name__)
-api = Api(app)
 
-forecaster = Forecaster()
-api.add_resource(ForecastHandler, '/forecast', resource_class_kwargs={'forecaster': forecaster})
+def create_app():
+    """The service configured from the environment, with its worker processes, threads and socket started.
+
+    Nothing starts at import time, so call this once per serving process.
+    """
+    app = Flask(__name__)
+    api = Api(app)
+    # Sampled JSON request records with trace IDs, e.g. REQUEST_LOG_SAMPLE_RATES='*=0.01,4xx=1,5xx=1,/forecast=0.1'
+    RequestTracer(app, parse_sample_rates(os.environ.get('REQUEST_LOG_SAMPLE_RATES', '')) or None)
+
+    # Challenger models scored on copies of the /forecast requests by low-priority worker processes, e.g.
+    # SHADOW_CHALLENGERS='{"ar1": {"lags": 1}, "smooth": {"ridge": 10}}'. Created first: the workers are forked, which
+    # is only safe before the feature store and forecast table start their refresh threads.
+    shadow = None
+    if os.environ.get('SHADOW_CHALLENGERS'):
+        shadow = ShadowScorer(json.loads(os.environ['SHADOW_CHALLENGERS']),
+                              workers=int(os.environ.get('SHADOW_WORKERS', '1')),
+                              max_pending=int(os.environ.get('SHADOW_MAX_PENDING', '0')) or None,
+                              niceness=int(os.environ['SHADOW_NICENESS']) if 'SHADOW_NICENESS' in os.environ else None,
+                              cpus=[int(cpu) for cpu in os.environ.get('SHADOW_CPUS', '').split(',') if cpu] or None)
+        api.add_resource(ShadowHandler, '/forecast/shadow', resource_class_kwargs={'shadow': shadow})
+
+    # Forecasts precomputed by precompute_forecasts.py are served from FORECAST_TABLE, misses are computed live
+    forecast_table = ForecastTableReader(os.environ.get('FORECAST_TABLE', 'forecast_table.bin'),
+                                         float(os.environ.get('FORECAST_TABLE_REFRESH_SECONDS', '5'))).start()
+    forecaster = Forecaster({'target': os.environ.get('FORECAST_TARGET', 'sales')}, table=forecast_table,
+                            shadow=shadow)
+    # Per-store features for the forecasts, read from the Parquet files in FEATURE_STORE_DIR and refreshed in the
+    # background
+    feature_store = None
+    feature_store_dir = os.environ.get('FEATURE_STORE_DIR', 'feature_store')
+    if os.path.isdir(feature_store_dir):
+        feature_store = FeatureStore(feature_store_dir,
+                                     max_history=int(os.environ.get('FEATURE_STORE_HISTORY_DAYS', '56')),
+                                     max_bytes=int(float(os.environ.get('FEATURE_STORE_BUDGET_MB', '256')) * 2**20),
+                                     refresh_seconds=float(os.environ.get('FEATURE_STORE_REFRESH_SECONDS', '60')))
+        feature_store.start()
+    api.add_resource(ForecastHandler, '/forecast',
+                     resource_class_kwargs={'forecaster': forecaster, 'feature_store': feature_store})
+
+    # Binary forecasts for batch jobs on the same host, over the FORECAST_SOCKET Unix socket and shared memory
+    if os.environ.get('FORECAST_SOCKET'):
+        LocalForecastServer(os.environ['FORECAST_SOCKET'], forecaster, feature_store,
+                            ring_bytes=int(float(os.environ.get('FORECAST_SOCKET_RING_MB', '64')) * 2**20)).start()
+
+    # Online scoring with the production model exported by `python run.py --export-model-dir ...` in ZenML/
+    model_store = os.environ.get('MODEL_STORE_DIR', 'model_store')
+    if os.path.isdir(model_store):
+        classifier = Classifier(model_store)
+        api.add_resource(ClassifyHandler, '/classify', resource_class_kwargs={'classifier': classifier})
+    return app
+
 
 if __name__ == '__main__':
-    logging.basicConfig(filename='app.log', level=logging.INFO, format='%(asctime)s | %(name)s | %(levelname)s | %(message)s')
+    # JSON lines written by a background thread, dropped rather than delaying requests when LOG_QUEUE_SIZE are pending
+    _, log_writer = configure_logging('app.log', queue_size=int(os.environ.get('LOG_QUEUE_SIZE', '10000')))
     logging.info('Main app sequence begun')
-    app.run(debug=True, host='0.0.0.0', port=5000) # change debug=False in production
+    app = create_app()
+    # The reloader would run this module again in a child process, starting a second set of workers and threads and
+    # taking over the socket
+    app.run(debug=True, use_reloader=False, host='0.0.0.0', port=5000) # change debug=False in production
     logging.info('App finished')
+    log_writer.stop()
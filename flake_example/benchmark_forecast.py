@@ -0,0 +1,67 @@
+"""Throughput of the vectorized seasonal AR forecaster, in series per second.
+
+Synthetic daily store series with a weekly pattern, autocorrelated noise and missing days are fitted and forecast
+all at once, and with a Python loop over the stores calling the same model on one series at a time. The last
+`--steps` days are held out and the mean absolute error is compared with a seasonal naive forecast.
+
+    python benchmark_forecast.py --stores 1000 --stores 10000 --days 56 --steps 14
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from resources.forecasting import SeasonalAR
+
+
+def make_series(stores, days, missing_rate=0.02, seed=0):
+    rng = np.random.default_rng(seed)
+    weekly = rng.normal(1, 0.3, size=(stores, 7))
+    level = rng.uniform(50, 500, size=(stores, 1))
+    noise = np.zeros((stores, days))
+    shocks = rng.normal(0, 0.1, size=(stores, days))
+    for day in range(1, days):
+        noise[:, day] = 0.6 * noise[:, day - 1] + shocks[:, day]
+    series = level * (weekly[:, np.arange(days) % 7] + noise)
+    series[rng.random(series.shape) < missing_rate] = np.nan
+    return series
+
+
+def benchmark(stores, days, steps):
+    series = make_series(stores, days + steps)
+    history, actual = series[:, :days], series[:, days:]
+
+    start = time.perf_counter()
+    model = SeasonalAR().fit(history)
+    fit_s = time.perf_counter() - start
+    start = time.perf_counter()
+    forecast = model.forecast(history, steps)
+    forecast_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    looped = np.vstack([SeasonalAR().fit(row[None]).forecast(row[None], steps) for row in history])
+    loop_s = time.perf_counter() - start
+
+    naive = history[:, days - 7 + np.arange(steps) % 7]
+    return {
+        'stores': stores,
+        'fit_series_per_s': round(stores / fit_s),
+        'forecast_series_per_s': round(stores / forecast_s),
+        'loop_series_per_s': round(stores / loop_s),
+        'speedup': round(loop_s / (fit_s + forecast_s), 1),
+        'same_as_loop': bool(np.allclose(forecast, looped)),
+        'mae': round(float(np.nanmean(np.abs(forecast - actual))), 2),
+        'seasonal_naive_mae': round(float(np.nanmean(np.abs(naive - actual))), 2),
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the vectorized seasonal AR forecaster.')
+    parser.add_argument('--stores', type=int, action='append', help='Number of series, can be repeated (default: 1000 and 10000).')
+    parser.add_argument('--days', type=int, default=56, help='Days of history per series (default: 56).')
+    parser.add_argument('--steps', type=int, default=14, help='Days forecast (default: 14).')
+    args = parser.parse_args()
+
+    results = [benchmark(stores, args.days, args.steps) for stores in sorted(args.stores or [1000, 10000])]
+    print(pd.DataFrame(results).to_string(index=False))
@@ -0,0 +1,125 @@
+"""Round-trip latency and throughput of `/forecast` over HTTP and over the local Unix socket transport.
+
+Builds a synthetic feature store and its precomputed forecast table in a temporary folder, starts the service in a
+separate process with both transports, then measures
+  - the latency of one-store requests served from the table and computed live, over HTTP and over the socket,
+  - the throughput in stores per second of one-store HTTP requests and of socket requests of `--batch` stores, whose
+    results come back through shared memory.
+
+    python benchmark_transport.py --stores 50000 --calls 2000 --batch 10000
+"""
+import argparse
+import http.client
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmark_forecast import make_series
+from resources.feature_store import FeatureStore
+from resources.forecast import Forecaster
+from resources.forecast_table import write_table
+from resources.local_transport import LocalForecastClient
+
+SERVER = """
+import app
+from werkzeug.serving import run_simple
+run_simple('127.0.0.1', {port}, app.create_app(), threaded=True)
+"""
+
+
+def build_data(folder, stores, days, horizon):
+    series = make_series(stores, days)
+    dates = pd.date_range("2024-01-01", periods=days)
+    rows = pd.DataFrame({"store_number": np.repeat(np.arange(stores), days), "date": np.tile(dates, stores),
+                         "sales": series.ravel()})
+    os.makedirs(os.path.join(folder, "features"))
+    rows.dropna().to_parquet(os.path.join(folder, "features", "000.parquet"))
+    snapshot = FeatureStore(os.path.join(folder, "features"), max_history=days).snapshot
+    forecast_dates, values = Forecaster().forecast_stores(snapshot, steps=horizon)
+    write_table(os.path.join(folder, "table.bin"), "sales", forecast_dates[0], snapshot.end_date, snapshot.slots,
+                values)
+    return snapshot.end_date
+
+
+def start_server(folder, port):
+    env = dict(os.environ, FEATURE_STORE_DIR=os.path.join(folder, "features"),
+               FORECAST_TABLE=os.path.join(folder, "table.bin"), FORECAST_SOCKET=os.path.join(folder, "forecast.sock"))
+    server = subprocess.Popen([sys.executable, "-c", SERVER.format(port=port)], env=env,
+                              cwd=os.path.dirname(os.path.abspath(__file__)),
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    for _ in range(600):
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            if os.path.exists(env["FORECAST_SOCKET"]):
+                return server, env["FORECAST_SOCKET"]
+        except OSError:
+            pass
+        time.sleep(0.1)
+    server.kill()
+    raise RuntimeError("the forecast service did not start")
+
+
+def http_forecast(port, body):
+    connection = http.client.HTTPConnection("127.0.0.1", port)
+    connection.request("POST", "/forecast", json.dumps(body), {"Content-Type": "application/json"})
+    response = connection.getresponse()
+    result = json.loads(response.read())
+    connection.close()
+    if response.status != 200:
+        raise RuntimeError(result)
+    return result
+
+
+def latencies(call, requests):
+    """Time `call` on every request, a store number or an array of them."""
+    seconds = []
+    for request in requests:
+        start = time.perf_counter()
+        call(request)
+        seconds.append(time.perf_counter() - start)
+    seconds = np.array(seconds)
+    return {"p50_us": round(np.percentile(seconds, 50) * 1e6), "p99_us": round(np.percentile(seconds, 99) * 1e6),
+            "stores_per_s": round(sum(np.size(request) for request in requests) / seconds.sum())}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the HTTP and the local socket forecast transports.')
+    parser.add_argument('--stores', type=int, default=50000, help='Stores in the feature store (default: 50000).')
+    parser.add_argument('--days', type=int, default=56, help='Days of history per store (default: 56).')
+    parser.add_argument('--steps', type=int, default=14, help='Days forecast per request (default: 14).')
+    parser.add_argument('--calls', type=int, default=2000, help='One-store requests per case (default: 2000).')
+    parser.add_argument('--batch', type=int, default=10000, help='Stores per batched socket request (default: 10000).')
+    parser.add_argument('--port', type=int, default=5057, help='Port of the HTTP server (default: 5057).')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        end_date = build_data(folder, args.stores, args.days, horizon=28)
+        # a start date inside the history is never in the table, so it is forecast live
+        live_start = str(end_date - 7)
+        server, path = start_server(folder, args.port)
+        try:
+            client = LocalForecastClient(path)
+            stores = np.random.default_rng(0).integers(args.stores, size=args.calls)
+            results = []
+            for source, start_date in [("table", None), ("live", live_start)]:
+                body = {"steps": args.steps, "forecast_start_date": start_date}
+                results.append({"transport": "http", "source": source, "stores_per_request": 1, **latencies(
+                    lambda store: http_forecast(args.port, dict(body, store_number=int(store))), stores)})
+                results.append({"transport": "socket", "source": source, "stores_per_request": 1, **latencies(
+                    lambda store: client.forecast([store], start_date, args.steps), stores)})
+                batches = [np.arange(first, min(first + args.batch, args.stores))
+                           for first in range(0, args.stores, args.batch)]
+                results.append({"transport": "socket+shm", "source": source, "stores_per_request": args.batch,
+                                **latencies(lambda batch: client.forecast(batch, start_date, args.steps), batches)})
+            client.close()
+        finally:
+            server.terminate()
+            server.wait()
+    print(pd.DataFrame(results).to_string(index=False))
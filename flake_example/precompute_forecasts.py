@@ -0,0 +1,39 @@
+"""Precompute the forecasts of every store into the table served by `/forecast`.
+
+Loads the feature store, forecasts `--horizon` days after its last day for all stores at once and publishes the
+table atomically, so a running service swaps it in at its next check. Run it whenever new features land, e.g.
+
+    python precompute_forecasts.py --feature-store-dir feature_store --output forecast_table.bin --horizon 28
+"""
+import argparse
+import os
+import time
+
+from resources.feature_store import FeatureStore
+from resources.forecast import Forecaster
+from resources.forecast_table import write_table
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Precompute the forecasts of every store into a forecast table.')
+    parser.add_argument('--feature-store-dir', default=os.environ.get('FEATURE_STORE_DIR', 'feature_store'),
+                        help='Folder of the feature store files (default: $FEATURE_STORE_DIR or feature_store).')
+    parser.add_argument('--output', default=os.environ.get('FORECAST_TABLE', 'forecast_table.bin'),
+                        help='Table file to publish (default: $FORECAST_TABLE or forecast_table.bin).')
+    parser.add_argument('--horizon', type=int, default=28, help='Days forecast for every store (default: 28).')
+    parser.add_argument('--target', default=os.environ.get('FORECAST_TARGET', 'sales'),
+                        help='Feature to forecast (default: $FORECAST_TARGET or sales).')
+    parser.add_argument('--history-days', type=int, default=int(os.environ.get('FEATURE_STORE_HISTORY_DAYS', '56')),
+                        help='Days of history the models are fitted on (default: $FEATURE_STORE_HISTORY_DAYS or 56).')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    snapshot = FeatureStore(args.feature_store_dir, max_history=args.history_days).snapshot
+    if snapshot is None:
+        parser.error(f'no feature files in {args.feature_store_dir}')
+    loaded = time.perf_counter()
+    dates, values = Forecaster({'target': args.target}).forecast_stores(snapshot, steps=args.horizon)
+    forecast = time.perf_counter()
+    write_table(args.output, args.target, dates[0], snapshot.end_date, snapshot.slots, values)
+    print(f'{len(values)} stores x {args.horizon} days from {dates[0]} written to {args.output} '
+          f'({os.path.getsize(args.output) / 2**20:.1f} MiB): load {loaded - start:.2f}s, '
+          f'forecast {forecast - loaded:.2f}s, write {time.perf_counter() - forecast:.2f}s')
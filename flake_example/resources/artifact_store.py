@@ -0,0 +1,35 @@
+import json
+import os
+import pickle
+
+# Same layout as the ZenML exporter (`ZenML/utils/export.py`):
+#   <root>/<model_name>/<version>/{sklearn_classifier.pkl, preprocess_pipeline.pkl, metadata.json}
+METADATA_FILE = "metadata.json"
+
+
+class LocalArtifactStore(object):
+    """File-based stand-in for the ZenML artifact store, so the service runs without a ZenML server."""
+
+    def __init__(self, root):
+        self.root = root
+
+    def path(self, model_name, version):
+        return os.path.join(self.root, model_name, version)
+
+    def load(self, model_name, version, artifact_name):
+        with open(os.path.join(self.path(model_name, version), artifact_name + ".pkl"), "rb") as f:
+            return pickle.load(f)
+
+    def save(self, model_name, version, artifact_name, artifact):
+        os.makedirs(self.path(model_name, version), exist_ok=True)
+        with open(os.path.join(self.path(model_name, version), artifact_name + ".pkl"), "wb") as f:
+            pickle.dump(artifact, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def load_metadata(self, model_name, version):
+        with open(os.path.join(self.path(model_name, version), METADATA_FILE)) as f:
+            return json.load(f)
+
+    def save_metadata(self, model_name, version, metadata):
+        os.makedirs(self.path(model_name, version), exist_ok=True)
+        with open(os.path.join(self.path(model_name, version), METADATA_FILE), "w") as f:
+            json.dump(metadata, f, indent=2)
@@ -0,0 +1,148 @@
+import math
+import queue
+import threading
+from concurrent.futures import Future
+
+import numpy as np
+import pandas as pd
+from flask_restful import Resource, reqparse
+
+from resources.artifact_store import LocalArtifactStore
+from resources.request_log import current_trace
+
+classify_parser = reqparse.RequestParser()
+classify_parser.add_argument(
+    'instances',
+    type=list,
+    required=True,
+    location="json",
+    help='List of feature vectors, each a list of values in model feature order or a dict keyed by feature name'
+)
+
+
+class ClassifyHandler(Resource):
+    def __init__(self, **kwargs):
+        self.classifier = kwargs['classifier']
+
+    def get(self):
+        return {"model_name": self.classifier.model_name,
+                "model_version": self.classifier.model_version,
+                "feature_names": self.classifier.feature_names}
+
+    def post(self):
+        args = classify_parser.parse_args()
+        trace = current_trace()
+        try:
+            rows = self.classifier.validate(args["instances"])
+        except ValueError as e:
+            return {"message": str(e)}, 400
+        trace.tag(instances=len(rows))
+        trace.phase("validate")
+        predictions = self.classifier.predict(rows)
+        trace.phase("predict")
+        return {"model_version": self.classifier.model_version, "predictions": predictions}
+
+
+class MicroBatcher(object):
+    """Groups rows submitted by concurrent requests into one model call.
+
+    A single worker thread takes everything that queued up while it was busy, up to `max_batch_size`
+    rows, so batches form under load without delaying a lone request. `max_wait_ms` optionally waits
+    a little longer for more rows.
+    """
+
+    def __init__(self, predict_batch, max_batch_size=256, max_wait_ms=0.0):
+        self.predict_batch = predict_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = queue.Queue()
+        self._worker = threading.Thread(target=self._run, daemon=True)
+        self._worker.start()
+
+    def submit(self, rows):
+        future = Future()
+        self._queue.put((rows, future))
+        return future
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        size = len(batch[0][0])
+        while size < self.max_batch_size:
+            try:
+                item = self._queue.get(timeout=self.max_wait) if self.max_wait else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            batch.append(item)
+            size += len(item[0])
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            try:
+                predictions = self.predict_batch(np.vstack([rows for rows, _ in batch]))
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            offset = 0
+            for rows, future in batch:
+                future.set_result(predictions[offset:offset + len(rows)])
+                offset += len(rows)
+
+
+class Classifier(object):
+    """Online scoring with a classifier exported from the ZenML training pipeline.
+
+    The classifier and its preprocessing pipeline are loaded once, at startup, from the local artifact
+    store. Requests are validated, preprocessed with the same pipeline as in the ZenML inference
+    pipeline and predicted in micro-batches.
+    """
+
+    def __init__(self, store_root, model_name="breast_cancer_classifier", version="production",
+                 max_batch_size=256, max_wait_ms=0.0):
+        store = LocalArtifactStore(store_root)
+        metadata = store.load_metadata(model_name, version)
+        self.model_name = model_name
+        self.model_version = metadata["model_version"]
+        self.feature_names = metadata["feature_names"]
+        self.target = metadata["target"]
+        self.model = store.load(model_name, version, "sklearn_classifier")
+        self.preprocess_pipeline = store.load(model_name, version, "preprocess_pipeline")
+        self.batcher = MicroBatcher(self.predict_batch, max_batch_size, max_wait_ms)
+
+    def validate(self, instances):
+        if not instances:
+            raise ValueError("`instances` must contain at least one feature vector")
+        rows = np.empty((len(instances), len(self.feature_names)))
+        for i, instance in enumerate(instances):
+            if isinstance(instance, dict):
+                missing = set(self.feature_names) - set(instance)
+                unknown = set(instance) - set(self.feature_names)
+                if missing or unknown:
+                    raise ValueError(f"instance {i}: missing features {sorted(missing)}, "
+                                     f"unknown features {sorted(unknown)}")
+                values = [instance[name] for name in self.feature_names]
+            elif isinstance(instance, list):
+                if len(instance) != len(self.feature_names):
+                    raise ValueError(f"instance {i}: expected {len(self.feature_names)} values, "
+                                     f"got {len(instance)}")
+                values = instance
+            else:
+                raise ValueError(f"instance {i}: expected a list or a dict of feature values")
+            for name, value in zip(self.feature_names, values):
+                if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+                    raise ValueError(f"instance {i}: feature `{name}` must be a finite number")
+            rows[i] = values
+        return rows
+
+    def predict_batch(self, rows):
+        # same steps as the `inference_preprocessor` and `inference_predict` ZenML steps
+        dataset = pd.DataFrame(rows, columns=self.feature_names)
+        dataset[self.target] = 1  # artificially added to avoid Pipeline issues
+        dataset = self.preprocess_pipeline.transform(dataset)
+        dataset.drop(columns=[self.target], inplace=True)
+        return self.model.predict(dataset)
+
+    def predict(self, rows):
+        return self.batcher.submit(rows).result().tolist()
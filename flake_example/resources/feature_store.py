@@ -0,0 +1,183 @@
+import glob
+import logging
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+STORE_COLUMN = "store_number"
+DATE_COLUMN = "date"
+
+
+class FeatureSnapshot(object):
+    """Immutable daily feature history of every store, in one contiguous array.
+
+    `values[slot, day, feature]` holds the features of the store in `slot` on day `end_date - history + 1 + day`,
+    NaN where no row was loaded. `slots[store_number]` gives the slot of a store, -1 for unknown stores, so a
+    lookup is two array reads.
+    """
+
+    def __init__(self, features, end_date, values, slots):
+        self.features = features
+        self.end_date = end_date
+        self.values = values
+        self.slots = slots
+        self.values.setflags(write=False)
+
+    @property
+    def history(self):
+        return self.values.shape[1]
+
+    @property
+    def dates(self):
+        return self.end_date - np.arange(self.history - 1, -1, -1).astype("timedelta64[D]")
+
+    @property
+    def nbytes(self):
+        return self.values.nbytes + self.slots.nbytes
+
+    def lookup(self, store_number):
+        """Feature history of a store, a read-only (days, features) view, or None for unknown stores."""
+        if not 0 <= store_number < len(self.slots) or self.slots[store_number] < 0:
+            return None
+        return self.values[self.slots[store_number]]
+
+
+def _history_within_budget(n_slots, n_features, max_history, max_bytes):
+    day_bytes = max(n_slots, 1) * n_features * np.dtype(np.float32).itemsize
+    history = min(max_history, max_bytes // day_bytes)
+    if history < 1:
+        raise ValueError(f"A memory budget of {max_bytes} bytes cannot hold one day of {n_features} features "
+                         f"for {n_slots} stores")
+    return history
+
+
+def merge_rows(snapshot, rows, features, max_history, max_bytes):
+    """New snapshot with `rows` added to `snapshot` (None for the first load).
+
+    The history window ends at the latest date seen and keeps at most `max_history` days, fewer if the array would
+    exceed `max_bytes`. Rows older than the window are ignored and a later row for the same store and day replaces
+    the earlier one. The arrays of `snapshot` are not modified.
+    """
+    store_numbers = rows[STORE_COLUMN].to_numpy(dtype=np.int64)
+    if (store_numbers < 0).any():
+        raise ValueError("store numbers must be non-negative")
+    dates = rows[DATE_COLUMN].to_numpy(dtype="datetime64[D]")
+    end_date = dates.max() if len(dates) else None
+    if snapshot is not None:
+        end_date = snapshot.end_date if end_date is None else max(end_date, snapshot.end_date)
+        slots = snapshot.slots
+    else:
+        slots = np.empty(0, dtype=np.int32)
+    if end_date is None:
+        return snapshot
+
+    # New stores get the next free slots
+    if len(store_numbers) and store_numbers.max() >= len(slots):
+        slots = np.concatenate([slots, np.full(store_numbers.max() + 1 - len(slots), -1, dtype=np.int32)])
+    new_stores = np.unique(store_numbers[slots[store_numbers] < 0])
+    n_slots = int((slots >= 0).sum()) + len(new_stores)
+    if len(new_stores):
+        slots = slots.copy()
+        slots[new_stores] = np.arange(n_slots - len(new_stores), n_slots, dtype=np.int32)
+
+    history = _history_within_budget(n_slots, len(features), max_history, max_bytes)
+    values = np.full((n_slots, history, len(features)), np.nan, dtype=np.float32)
+    if snapshot is not None:
+        # Days that are still in the new window keep their values
+        shift = int((end_date - snapshot.end_date).astype(int))
+        # The old last day moves to `history - 1 - shift`, days before the new window are dropped
+        kept = min(snapshot.history, history - shift)
+        if kept > 0:
+            values[:len(snapshot.values), history - shift - kept:history - shift] = \
+                snapshot.values[:, snapshot.history - kept:]
+
+    day = history - 1 - (end_date - dates).astype(int)
+    inside = np.flatnonzero(day >= 0)
+    cells = slots[store_numbers[inside]].astype(np.int64) * history + day[inside]
+    # Only the last row of every store and day is written
+    _, last = np.unique(cells[::-1], return_index=True)
+    inside = inside[len(cells) - 1 - last]
+    values[slots[store_numbers[inside]], day[inside]] = rows[features].to_numpy(dtype=np.float32)[inside]
+    return FeatureSnapshot(features, end_date, values, slots)
+
+
+class FeatureStore(object):
+    """Online per-store feature store backed by a folder of Parquet files.
+
+    Every `*.parquet` file in `path` holds rows of `store_number` (a small non-negative integer), `date` and feature
+    columns. They are loaded into a `FeatureSnapshot` at startup. A background thread then looks for new or modified
+    files every `refresh_seconds`, reads only those, and swaps in a new snapshot. Readers take the current snapshot
+    without locking, so lookups never wait for a refresh. `max_bytes` bounds the snapshot array by dropping the oldest
+    days; during a refresh the old and new snapshots are both held briefly.
+    """
+
+    def __init__(self, path, features=None, max_history=56, max_bytes=256 * 2**20, refresh_seconds=60.0):
+        self.path = path
+        self.max_history = max_history
+        self.max_bytes = max_bytes
+        self.refresh_seconds = refresh_seconds
+        self.logger = logging.getLogger(__name__)
+        self._seen = {}
+        self._features = features
+        self._snapshot = None
+        self._stop = threading.Event()
+        self._thread = None
+        self.refresh()
+
+    @property
+    def snapshot(self):
+        return self._snapshot
+
+    def lookup(self, store_number):
+        snapshot = self._snapshot
+        return None if snapshot is None else snapshot.lookup(store_number)
+
+    def _changed_files(self):
+        changed = {}
+        for filename in sorted(glob.glob(os.path.join(self.path, "*.parquet"))):
+            stat = os.stat(filename)
+            if self._seen.get(filename) != (stat.st_mtime_ns, stat.st_size):
+                changed[filename] = (stat.st_mtime_ns, stat.st_size)
+        return changed
+
+    def refresh(self):
+        """Load the new or modified Parquet files, return the number of rows read."""
+        changed = self._changed_files()
+        if not changed:
+            return 0
+        start = time.perf_counter()
+        columns = None if self._features is None else [STORE_COLUMN, DATE_COLUMN] + self._features
+        rows = pd.concat([pd.read_parquet(filename, columns=columns) for filename in changed], ignore_index=True)
+        if self._features is None:
+            self._features = [column for column in rows.columns if column not in (STORE_COLUMN, DATE_COLUMN)]
+        # Files are read in name order, so later files win for the same store and day
+        self._snapshot = merge_rows(self._snapshot, rows, self._features, self.max_history, self.max_bytes)
+        self._seen.update(changed)
+        if self._snapshot.history < self.max_history:
+            self.logger.warning(f"feature history cut to {self._snapshot.history} days by the memory budget")
+        self.logger.info(f"feature store loaded {len(rows)} rows from {len(changed)} files in "
+                         f"{time.perf_counter() - start:.3f}s, {self._snapshot.nbytes / 2**20:.1f} MiB")
+        return len(rows)
+
+    def start(self):
+        """Refresh in a background thread until `stop`."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.refresh_seconds):
+            try:
+                self.refresh()
+            except Exception:
+                self.logger.exception("feature store refresh failed, keeping the current snapshot")
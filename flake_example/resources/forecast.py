@@ -1,6 +1,10 @@
 from flask_restful import Resource, reqparse
 from flask import jsonify
 import numpy as np
+import time
+
+from resources.forecasting import SeasonalAR, forecast_from
+from resources.request_log import current_trace
 
 post_parser = reqparse.RequestParser()
 post_parser.add_argument(
@@ -18,27 +22,174 @@ post_parser.add_argument(
     help='start date for forecast in iso format YYYY-mm-DDTHH:MM:SS'
 )
 
+post_parser.add_argument(
+    'steps',
+    type=int,
+    default=10,
+    location="json",
+    help='number of days to forecast'
+)
+
+
+def _slots_of(slots, store_numbers):
+    rows = np.full(len(store_numbers), -1, dtype=np.int64)
+    known = (store_numbers >= 0) & (store_numbers < len(slots))
+    rows[known] = slots[store_numbers[known]]
+    return rows
+
 
 class ForecastHandler(Resource):
     def __init__(self, **kwargs):
         self.forecaster = kwargs['forecaster']
+        self.feature_store = kwargs.get('feature_store')
 
     def get(self):
         return {}
 
     def post(self):
         args = post_parser.parse_args()
-        print(args)
-        result = {"store_number": args["store_number"], "result": self.forecaster.forecast()}
+        trace = current_trace()
+        trace.tag(**args)
+        trace.phase("parse")
+        params = {"store_number": args["store_number"], "forecast_start_date": args["forecast_start_date"]}
+        # reqparse passes a JSON null through as None
+        if args["steps"] is None or not 1 <= args["steps"] <= self.forecaster.max_steps:
+            return {"message": f"steps must be between 1 and {self.forecaster.max_steps}"}, 400
+        start = time.perf_counter()
+        # one snapshot per request, a background refresh may swap in a new one meanwhile
+        snapshot = None if self.feature_store is None else self.feature_store.snapshot
+        history = None if snapshot is None else snapshot.lookup(args["store_number"])
+        if history is not None:
+            params.update(history=history, features=snapshot.features, history_end_date=str(snapshot.end_date))
+        trace.phase("features")
+        try:
+            precomputed = self.forecaster.lookup(params, args["steps"],
+                                                 history_end_date=None if snapshot is None else snapshot.end_date)
+        except ValueError as e:
+            return {"message": str(e)}, 400
+        trace.phase("table")
+        if precomputed is not None:
+            trace.tag(source="table")
+            dates, values = precomputed
+        elif self.feature_store is None:
+            return {"message": "forecasts need the store history, no feature store is configured"}, 503
+        elif history is None:
+            return {"message": f"no features for store {args['store_number']}"}, 404
+        else:
+            try:
+                dates, values = self.forecaster.forecast(params=params, steps=args["steps"])
+            except ValueError as e:
+                return {"message": str(e)}, 400
+            trace.phase("forecast")
+            trace.tag(source="live")
+        self.forecaster.shadow_score(params, args["steps"], values, time.perf_counter() - start)
+        result = {"store_number": args["store_number"], "dates": dates, "result": values}
         return jsonify(result)
 
 
+class ShadowHandler(Resource):
+    def __init__(self, **kwargs):
+        self.shadow = kwargs['shadow']
+
+    def get(self):
+        return self.shadow.summary()
+
+
 class Forecaster(object):
+    """Daily forecasts of the `target` feature with a seasonal AR model fitted on the store history.
+
+    With a `table` (a `ForecastTableReader`), forecasts precomputed by `precompute_forecasts.py` are served from the
+    memory-mapped table, and computed live only when the table misses the store or the requested days. With a
+    `shadow` (a `ShadowScorer`), the challenger models forecast the same requests in the background.
+    """
+
+    def __init__(self, model_config=None, table=None, shadow=None):
+        model_config = model_config or {}
+        self.target = model_config.get("target", "sales")
+        self.max_steps = model_config.get("max_steps", 365)
+        self.model_params = {name: model_config[name] for name in ("lags", "season", "ridge") if name in model_config}
+        self.table = table
+        self.shadow = shadow
+
+    def model(self):
+        return SeasonalAR(**self.model_params)
+
+    def lookup(self, params={}, steps=10, history_end_date=None):
+        """Precomputed forecast as `forecast` returns it, or None on a miss.
 
-    def __init__(self, model_config=None):
-        # Do stuff using model config, for example configure MLFLow server addresses
-        self.model = None  # placeholder for later
+        A table computed from an older history than `history_end_date`, the last day in the feature store, misses,
+        so a refreshed feature store is never answered with stale forecasts.
+        """
+        table = None if self.table is None else self.table.table
+        if table is None or table.target != self.target:
+            return None
+        if history_end_date is not None and table.history_end_date != history_end_date:
+            return None
+        found = table.lookup(params["store_number"], params.get("forecast_start_date"), steps)
+        if found is None:
+            return None
+        dates, values = found
+        return dates, values.tolist()
+
+    def shadow_score(self, params, steps, values, seconds):
+        """Queue a served forecast, which took `seconds`, to the challengers if the request has a store history."""
+        if self.shadow is None or "history" not in params or self.target not in params["features"]:
+            return
+        history = params["history"][:, params["features"].index(self.target)]
+        self.shadow.submit(history, params["history_end_date"], params.get("forecast_start_date"), steps, values,
+                           seconds)
 
     def forecast(self, params={}, steps=10):
-        if self.model is None:
-            return np.random.random(steps).tolist()  # as a placeholder for actual forecast
+        features = params["features"]
+        if self.target not in features:
+            raise ValueError(f"the feature store has no `{self.target}` feature to forecast")
+        dates, values = forecast_from(params["history"][:, features.index(self.target)], params["history_end_date"],
+                                      params.get("forecast_start_date"), steps, self.model(), self.max_steps)
+        return [str(date) for date in dates], values[0].tolist()
+
+    def forecast_batch(self, store_numbers, snapshot=None, start_date=None, steps=10):
+        """Forecast many stores at once, returns the first date and a float32 (stores, steps) array.
+
+        Stores the table covers are sliced from it, the others are forecast together from the `snapshot` history.
+        Rows of stores neither has are NaN.
+        """
+        store_numbers = np.asarray(store_numbers, dtype=np.int64)
+        table = None if self.table is None else self.table.table
+        if table is not None and (table.target != self.target or
+                                  (snapshot is not None and table.history_end_date != snapshot.end_date)):
+            table = None
+        if start_date is not None:
+            start_date = np.datetime64(start_date, "D")
+        elif snapshot is not None:
+            start_date = snapshot.end_date + 1
+        elif table is not None:
+            start_date = table.start_date
+        else:
+            raise ValueError("forecasts need the store history, no feature store or forecast table is loaded")
+        values = np.full((len(store_numbers), steps), np.nan, dtype=np.float32)
+        missing = np.ones(len(store_numbers), dtype=bool)
+
+        if table is not None:
+            offset = int((start_date - table.start_date).astype(int))
+            if 0 <= offset and offset + steps <= table.horizon:
+                rows = _slots_of(table.slots, store_numbers)
+                found = rows >= 0
+                values[found] = table.values[rows[found], offset:offset + steps]
+                missing &= ~found
+        if snapshot is not None and missing.any():
+            if self.target not in snapshot.features:
+                raise ValueError(f"the feature store has no `{self.target}` feature to forecast")
+            rows = _slots_of(snapshot.slots, store_numbers[missing])
+            found = rows >= 0
+            if found.any():
+                _, forecast = forecast_from(snapshot.values[rows[found], :, snapshot.features.index(self.target)],
+                                            snapshot.end_date, start_date, steps, self.model(), self.max_steps)
+                values[np.flatnonzero(missing)[found]] = forecast
+        return start_date, values
+
+    def forecast_stores(self, snapshot, start_date=None, steps=10):
+        """Forecast every store of a feature snapshot at once, returns the dates and a (slots, steps) array."""
+        if self.target not in snapshot.features:
+            raise ValueError(f"the feature store has no `{self.target}` feature to forecast")
+        return forecast_from(snapshot.values[:, :, snapshot.features.index(self.target)], snapshot.end_date,
+                             start_date, steps, self.model(), self.max_steps)
@@ -0,0 +1,162 @@
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import threading
+
+import numpy as np
+
+# File layout, little-endian:
+#   header, padded to HEADER_BYTES: magic, version, horizon, number of store numbers, number of slots,
+#       first forecast day and last history day (days since 1970-01-01), target feature name
+#   slots   int32[store numbers]      slot of every store number, -1 for stores without forecasts
+#   values  float32[slots, horizon]   at the next multiple of 64 bytes, forecast of every slot from the first day
+MAGIC = b"FCTABLE\0"
+VERSION = 1
+HEADER_BYTES = 128
+_HEADER = struct.Struct("<8sIIqqqq32s")
+
+
+def _values_offset(n_numbers):
+    return -(-(HEADER_BYTES + 4 * n_numbers) // 64) * 64
+
+
+def write_table(path, target, start_date, history_end_date, slots, values):
+    """Publish a forecast table at `path`, replacing any previous one atomically.
+
+    The table is written to a temporary file in the same folder and renamed over `path`, so readers either open the
+    previous table or the complete new one, and readers that mapped the previous table keep a valid mapping.
+    """
+    slots = np.ascontiguousarray(slots, dtype="<i4")
+    values = np.ascontiguousarray(values, dtype="<f4")
+    if values.ndim != 2 or (slots >= len(values)).any():
+        raise ValueError("values must be a (slots, horizon) array covering every slot")
+    target = target.encode()
+    if len(target) > 32:
+        raise ValueError("the target feature name must fit in 32 bytes")
+    header = _HEADER.pack(MAGIC, VERSION, values.shape[1], len(slots), len(values),
+                          int(np.datetime64(start_date, "D").astype(np.int64)),
+                          int(np.datetime64(history_end_date, "D").astype(np.int64)), target)
+    offset = _values_offset(len(slots))
+
+    fd, tmp = tempfile.mkstemp(prefix=".forecast_table-", dir=os.path.dirname(os.path.abspath(path)))
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(header.ljust(HEADER_BYTES, b"\0"))
+            f.write(slots.tobytes())
+            f.write(b"\0" * (offset - HEADER_BYTES - slots.nbytes))
+            f.write(values.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+class ForecastTable(object):
+    """Read-only, memory-mapped forecast table written by `write_table`.
+
+    `values[slots[store_number], day]` is the forecast of a store `day` days after `start_date`, so a lookup is two
+    array reads and a slice. Values are float32, the same precision as the feature store.
+    """
+
+    def __init__(self, path):
+        # The header and the mapping come from the same open file, even if a new table is published meanwhile
+        with open(path, "rb") as f:
+            header = f.read(HEADER_BYTES)
+            if len(header) < _HEADER.size or header[:len(MAGIC)] != MAGIC:
+                raise ValueError(f"{path} is not a forecast table")
+            (_, version, self.horizon, n_numbers, n_slots, start_day, end_day, target) = _HEADER.unpack_from(header)
+            if version != VERSION:
+                raise ValueError(f"{path} has forecast table version {version}, expected {VERSION}")
+            offset = _values_offset(n_numbers)
+            size = offset + 4 * n_slots * self.horizon
+            if os.fstat(f.fileno()).st_size != size:
+                raise ValueError(f"{path} has {os.fstat(f.fileno()).st_size} bytes, expected {size}")
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        self.path = path
+        self.target = target.rstrip(b"\0").decode()
+        self.start_date = np.datetime64(start_day, "D")
+        self.history_end_date = np.datetime64(end_day, "D")
+        # Plain arrays over the mapping, slicing a np.memmap costs several microseconds
+        self.slots = np.frombuffer(self._mmap, dtype="<i4", count=n_numbers, offset=HEADER_BYTES)
+        self.values = np.frombuffer(self._mmap, dtype="<f4", offset=offset).reshape(n_slots, self.horizon)
+        self.dates = np.datetime_as_string(self.start_date + np.arange(self.horizon).astype("timedelta64[D]"))
+        self.dates = self.dates.tolist()
+
+    @property
+    def end_date(self):
+        return self.start_date + (self.horizon - 1)
+
+    def lookup(self, store_number, start_date=None, steps=10):
+        """Forecast dates (ISO strings) and values of a store for `steps` days from `start_date` (default the first
+        day), or None on a miss."""
+        if not 0 <= store_number < len(self.slots) or self.slots[store_number] < 0:
+            return None
+        offset = 0 if start_date is None else int((np.datetime64(start_date, "D") - self.start_date).astype(int))
+        if offset < 0 or offset + steps > self.horizon:
+            return None
+        return self.dates[offset:offset + steps], self.values[self.slots[store_number], offset:offset + steps]
+
+
+class ForecastTableReader(object):
+    """Serves the latest forecast table published at `path`.
+
+    A background thread checks the file every `refresh_seconds` and, when a new table was published, maps it and
+    swaps it in. Readers take the current table without locking; a request that already holds the previous table
+    finishes with it. A missing or invalid file leaves the current table in place.
+    """
+
+    def __init__(self, path, refresh_seconds=5.0):
+        self.path = path
+        self.refresh_seconds = refresh_seconds
+        self.logger = logging.getLogger(__name__)
+        self._seen = None
+        self._table = None
+        self._stop = threading.Event()
+        self._thread = None
+        self.refresh()
+
+    @property
+    def table(self):
+        return self._table
+
+    def refresh(self):
+        """Map the table if a new one was published, return whether it was swapped in."""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return False
+        # A published table is a new file, so its inode changes even within the mtime resolution
+        key = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if key == self._seen:
+            return False
+        self._seen = key
+        self._table = ForecastTable(self.path)
+        self.logger.info(f"forecast table {self.path} loaded: {len(self._table.values)} stores, "
+                         f"{self._table.horizon} days from {self._table.start_date}")
+        return True
+
+    def start(self):
+        """Refresh in a background thread until `stop`."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.refresh_seconds):
+            try:
+                self.refresh()
+            except Exception:
+                self.logger.exception("forecast table refresh failed, keeping the current table")
@@ -0,0 +1,107 @@
+import numpy as np
+
+
+class SeasonalAR(object):
+    """Autoregressive model with a seasonal lag, fitted and run for many series at once.
+
+    Every series is standardized and its mean profile over the `season` (the day of the week for daily data) is
+    removed. The rest is modelled with its own coefficients for an intercept, the lags `1..lags` and the lag `season`:
+    the lagged design matrices of all series are built as one strided view, and the coefficients come from one
+    batched ridge solve of the normal equations. Missing values (NaN) drop the rows they appear in, and series with
+    too few complete rows forecast their seasonal profile. Forecasting is recursive, one vectorized step per day, and
+    expects the rows of `Y` to start on the same day of the season as when fitted.
+    """
+
+    def __init__(self, lags=7, season=7, ridge=1e-2):
+        self.lag_set = np.array(sorted(set(range(1, lags + 1)) | ({season} if season else set())))
+        self.max_lag = int(self.lag_set.max())
+        self.season = season
+        self.ridge = ridge
+        self.coef_ = None
+
+    @property
+    def n_coef(self):
+        return len(self.lag_set) + 1
+
+    def _standardize(self, Y):
+        Y = np.asarray(Y, dtype=np.float64)
+        counts = (~np.isnan(Y)).sum(axis=1)
+        mean = np.where(counts > 0, np.nansum(Y, axis=1) / np.maximum(counts, 1), 0.0)
+        var = np.where(counts > 1, np.nansum((Y - mean[:, None]) ** 2, axis=1) / np.maximum(counts - 1, 1), 0.0)
+        scale = np.where(var > 0, np.sqrt(var), 1.0)
+        return (Y - mean[:, None]) / scale[:, None], mean, scale
+
+    def _profile(self, Z):
+        """Mean of every day of the season, over the days that are not missing, 0 for no such days."""
+        if not self.season or self.season < 2:
+            return np.zeros((len(Z), 1))
+        profile = np.zeros((len(Z), self.season))
+        for phase in range(min(self.season, Z.shape[1])):
+            days = Z[:, phase::self.season]
+            counts = (~np.isnan(days)).sum(axis=1)
+            profile[:, phase] = np.nansum(days, axis=1) / np.maximum(counts, 1)
+        return profile
+
+    def _seasonal(self, start, stop):
+        return self.profile_[:, np.arange(start, stop) % self.profile_.shape[1]]
+
+    def fit(self, Y):
+        """Fit one model per row of `Y`, a (series, days) array with NaN for missing days."""
+        Z, self.mean_, self.scale_ = self._standardize(Y)
+        self.profile_ = self._profile(Z)
+        n, T = Z.shape
+        Z = Z - self._seasonal(0, T)
+        self.coef_ = np.zeros((n, self.n_coef))
+        if T <= self.max_lag:
+            return self
+        windows = np.lib.stride_tricks.sliding_window_view(Z, self.max_lag + 1, axis=1)
+        target = windows[:, :, self.max_lag]
+        X = np.concatenate([np.ones(target.shape + (1,)), windows[:, :, self.max_lag - self.lag_set]], axis=2)
+        valid = ~(np.isnan(target) | np.isnan(X).any(axis=2))
+        X = np.where(valid[:, :, None], X, 0.0)
+        target = np.where(valid, target, 0.0)
+
+        A = np.einsum("nti,ntj->nij", X, X) + self.ridge * np.eye(self.n_coef)
+        b = np.einsum("nti,nt->ni", X, target)
+        enough = valid.sum(axis=1) > self.n_coef
+        self.coef_[enough] = np.linalg.solve(A[enough], b[enough][:, :, None])[:, :, 0]
+        return self
+
+    def forecast(self, Y, steps):
+        """Forecast `steps` days after the end of every row of `Y`, with the coefficients of `fit`."""
+        Z = (np.asarray(Y, dtype=np.float64) - self.mean_[:, None]) / self.scale_[:, None]
+        T = Z.shape[1]
+        Z = Z - self._seasonal(0, T)
+        # Missing days in the recent history are read as their seasonal profile
+        state = np.zeros((len(Z), self.max_lag))
+        recent = Z[:, -self.max_lag:]
+        state[:, self.max_lag - recent.shape[1]:] = np.nan_to_num(recent)
+        out = np.empty((len(Z), steps))
+        for step in range(steps):
+            out[:, step] = self.coef_[:, 0] + np.einsum("ni,ni->n", self.coef_[:, 1:], state[:, self.max_lag - self.lag_set])
+            state = np.concatenate([state[:, 1:], out[:, step:step + 1]], axis=1)
+        return (out + self._seasonal(T, T + steps)) * self.scale_[:, None] + self.mean_[:, None]
+
+
+def forecast_from(history, end_date, start_date, steps, model=None, max_offset=None):
+    """Forecast `steps` days from `start_date` for every row of `history`, daily series ending on `end_date`.
+
+    A start date within the history fits and forecasts from the days before it. A start date later than the day
+    after `end_date` forecasts the gap first, one recursive step per day, so a start date more than `max_offset` days
+    after `end_date` raises a ValueError. Returns the forecast dates and a (series, steps) array.
+    """
+    model = model or SeasonalAR()
+    end_date = np.datetime64(end_date, "D")
+    start_date = end_date + 1 if start_date is None else np.datetime64(start_date, "D")
+    offset = int((start_date - end_date).astype(int))
+    if max_offset is not None and offset > max_offset:
+        raise ValueError(f"forecast_start_date {start_date} is more than {max_offset} days after the history, "
+                         f"which ends on {end_date}")
+    history = np.atleast_2d(history)
+    if offset < 1:
+        days = history.shape[1] + offset - 1
+        if days <= model.max_lag:
+            raise ValueError(f"not enough history before {start_date} to forecast from it")
+        history, offset = history[:, :days], 1
+    forecast = model.fit(history).forecast(history, offset - 1 + steps)[:, offset - 1:]
+    return start_date + np.arange(steps).astype("timedelta64[D]"), forecast
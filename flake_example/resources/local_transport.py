@@ -0,0 +1,213 @@
+import os
+import socket
+import socketserver
+import stat
+import struct
+import threading
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+# Binary protocol over a Unix stream socket, little-endian:
+#   hello, server to client on connect: magic, version, ring bytes, length of the shared memory name, then the name
+#   request: steps, first day (days since 1970-01-01, DEFAULT_START for the day after the history), number of stores,
+#       then the store numbers as int32
+#   response: status (0 ok, 1 error), whether the values are in the ring, steps, first day, number of stores,
+#       length of the payload that follows on the socket, ring offset and the ring position to release up to.
+#       The payload is the float32 (stores, steps) values when they are not in the ring, the message for errors.
+# The ring is a shared memory segment per connection: a RING_HEADER-byte header holding the consumer position at
+# TAIL_OFFSET, then the ring bytes of data. The server writes results after the previous ones, wrapping around, and
+# the client moves the tail past a result once it copied it out.
+MAGIC = b"FCST"
+VERSION = 1
+DEFAULT_START = -2**31
+RING_HEADER = 64
+TAIL_OFFSET = 8
+_HELLO = struct.Struct("<4sHQH")
+_REQUEST = struct.Struct("<HiI")
+_RESPONSE = struct.Struct("<BBHiIIQQ")
+
+
+def _recv_exact(sock, buffer):
+    """Fill `buffer` from the socket, return False if the peer closed the connection first."""
+    view = memoryview(buffer).cast("B")
+    while len(view):
+        received = sock.recv_into(view)
+        if not received:
+            return False
+        view = view[received:]
+    return True
+
+
+class _Ring(object):
+    """Producer side of a single-producer, single-consumer byte ring in shared memory."""
+
+    def __init__(self, shm, capacity):
+        self.shm = shm
+        self.capacity = capacity
+        self.head = 0
+
+    def write(self, values):
+        """Copy `values` into the ring, return its offset and end position, or None if there is not enough room."""
+        data = memoryview(values).cast("B")
+        size = len(data)
+        position = self.head % self.capacity
+        # A result is never split, it starts over at the beginning of the ring instead
+        skip = self.capacity - position if position + size > self.capacity else 0
+        tail, = struct.unpack_from("<Q", self.shm.buf, TAIL_OFFSET)
+        if self.head + skip + size - tail > self.capacity:
+            return None
+        offset = (self.head + skip) % self.capacity
+        self.shm.buf[RING_HEADER + offset:RING_HEADER + offset + size] = data
+        self.head += skip + size
+        return offset, self.head
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    def handle(self):
+        self.server.service.serve_connection(self.request)
+
+
+class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class LocalForecastServer(object):
+    """Forecasts for callers on the same host, over a Unix domain socket instead of HTTP.
+
+    Requests and responses use the fixed binary frames above, so there is no HTTP or JSON parsing, and one request
+    can ask for many stores, which `Forecaster.forecast_batch` answers at once. Results larger than `inline_bytes`
+    are written to a shared memory ring of `ring_bytes` per connection and only their position is sent over the
+    socket; when the client has not released enough of the ring they are sent over the socket instead. Values are
+    float32, rows of unknown stores are NaN.
+    """
+
+    def __init__(self, path, forecaster, feature_store=None, ring_bytes=64 * 2**20, inline_bytes=64 * 2**10,
+                 max_stores=1_000_000):
+        self.path = path
+        self.forecaster = forecaster
+        self.feature_store = feature_store
+        self.ring_bytes = ring_bytes
+        self.inline_bytes = inline_bytes
+        self.max_stores = max_stores
+        self._server = None
+        self._thread = None
+
+    def start(self):
+        """Listen on the socket in a background thread until `stop`."""
+        if self._thread is None:
+            # A socket file left by a previous run would make bind fail
+            if os.path.exists(self.path) and stat.S_ISSOCK(os.stat(self.path).st_mode):
+                os.unlink(self.path)
+            self._server = _UnixServer(self.path, _Handler)
+            self._server.service = self
+            self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        if self._thread is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._thread.join()
+            self._thread = None
+            os.unlink(self.path)
+
+    def _error(self, sock, message):
+        message = message.encode()
+        sock.sendall(_RESPONSE.pack(1, 0, 0, 0, 0, len(message), 0, 0) + message)
+
+    def forecast(self, store_numbers, start_day, steps):
+        snapshot = None if self.feature_store is None else self.feature_store.snapshot
+        start_date = None if start_day == DEFAULT_START else np.datetime64(start_day, "D")
+        start_date, values = self.forecaster.forecast_batch(store_numbers, snapshot, start_date, steps)
+        return int(start_date.astype(np.int64)), values
+
+    def serve_connection(self, sock):
+        shm = SharedMemory(create=True, size=RING_HEADER + self.ring_bytes)
+        try:
+            shm.buf[:RING_HEADER] = bytes(RING_HEADER)
+            ring = _Ring(shm, self.ring_bytes)
+            name = shm.name.encode()
+            sock.sendall(_HELLO.pack(MAGIC, VERSION, self.ring_bytes, len(name)) + name)
+            request = bytearray(_REQUEST.size)
+            while _recv_exact(sock, request):
+                steps, start_day, n_stores = _REQUEST.unpack(request)
+                if n_stores > self.max_stores:
+                    # the store numbers are not read, so the connection cannot continue
+                    self._error(sock, f"at most {self.max_stores} stores per request")
+                    return
+                store_numbers = np.empty(n_stores, dtype="<i4")
+                if not _recv_exact(sock, store_numbers):
+                    return
+                if not 1 <= steps <= self.forecaster.max_steps:
+                    self._error(sock, f"steps must be between 1 and {self.forecaster.max_steps}")
+                    continue
+                try:
+                    start_day, values = self.forecast(store_numbers, start_day, steps)
+                except ValueError as e:
+                    self._error(sock, str(e))
+                    continue
+                placed = ring.write(values) if values.nbytes > self.inline_bytes else None
+                if placed is not None:
+                    sock.sendall(_RESPONSE.pack(0, 1, steps, start_day, n_stores, 0, *placed))
+                else:
+                    sock.sendall(_RESPONSE.pack(0, 0, steps, start_day, n_stores, values.nbytes, 0, 0)
+                                 + values.astype("<f4", copy=False).tobytes())
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            shm.close()
+            shm.unlink()
+
+
+class LocalForecastClient(object):
+    """Client of `LocalForecastServer`, one request at a time, so use one client per thread."""
+
+    def __init__(self, path):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(path)
+        hello = bytearray(_HELLO.size)
+        if not _recv_exact(self.sock, hello):
+            raise ConnectionError(f"{path} closed the connection")
+        magic, version, self.ring_bytes, name_length = _HELLO.unpack(hello)
+        if magic != MAGIC or version != VERSION:
+            raise ConnectionError(f"{path} is not a forecast socket of protocol version {VERSION}")
+        name = bytearray(name_length)
+        _recv_exact(self.sock, name)
+        self.shm = SharedMemory(name=name.decode())
+        # The server owns the segment and unlinks it, the resource tracker would otherwise unlink it when we exit
+        resource_tracker.unregister(self.shm._name, "shared_memory")
+
+    def forecast(self, store_numbers, start_date=None, steps=10):
+        """Forecast `steps` days from `start_date` for every store, returns the dates and a (stores, steps) array."""
+        store_numbers = np.ascontiguousarray(store_numbers, dtype="<i4")
+        start_day = DEFAULT_START if start_date is None else int(np.datetime64(start_date, "D").astype(np.int64))
+        self.sock.sendall(_REQUEST.pack(steps, start_day, len(store_numbers)) + store_numbers.tobytes())
+        response = bytearray(_RESPONSE.size)
+        if not _recv_exact(self.sock, response):
+            raise ConnectionError("the forecast server closed the connection")
+        status, in_ring, steps, start_day, n_stores, length, offset, end = _RESPONSE.unpack(response)
+        if status:
+            message = bytearray(length)
+            _recv_exact(self.sock, message)
+            raise ValueError(message.decode())
+        if in_ring:
+            values = np.frombuffer(self.shm.buf, dtype="<f4", count=n_stores * steps,
+                                   offset=RING_HEADER + offset).reshape(n_stores, steps).copy()
+            struct.pack_into("<Q", self.shm.buf, TAIL_OFFSET, end)
+        else:
+            values = np.empty((n_stores, steps), dtype="<f4")
+            _recv_exact(self.sock, values)
+        return np.datetime64(start_day, "D") + np.arange(steps).astype("timedelta64[D]"), values
+
+    def close(self):
+        self.sock.close()
+        self.shm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,170 @@
+import datetime
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import time
+import uuid
+
+from flask import g, request
+
+TRACE_HEADER = "X-Request-ID"
+# Every error response, one in a hundred of the others
+DEFAULT_SAMPLE_RATES = {"*": 0.01, "4xx": 1.0, "5xx": 1.0}
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Hands records to a bounded queue and drops them when it is full, so logging never waits for the writer."""
+
+    def __init__(self, records):
+        super().__init__(records)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Structured records are turned into JSON by the writer thread, not by the request
+        if isinstance(record.msg, dict):
+            return record
+        return super().prepare(record)
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record: time, level, logger, then the fields of a dict message or the text message."""
+
+    def format(self, record):
+        entry = {"time": datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc)
+                 .isoformat(timespec="milliseconds"),
+                 "level": record.levelname,
+                 "logger": record.name}
+        if isinstance(record.msg, dict):
+            entry.update(record.msg)
+        else:
+            entry["message"] = record.getMessage()
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def configure_logging(filename, queue_size=10000, level=logging.INFO):
+    """Send all logging through a queue of `queue_size` records to a thread writing JSON lines to `filename`.
+
+    A slow disk fills the queue, then records are dropped instead of slowing down the requests. Returns the handler,
+    which counts the dropped records, and the writer, to `stop()` on shutdown so the queued records are written.
+    """
+    records = queue.Queue(queue_size)
+    file_handler = logging.FileHandler(filename)
+    file_handler.setFormatter(JsonFormatter())
+    writer = logging.handlers.QueueListener(records, file_handler, respect_handler_level=True)
+    handler = DroppingQueueHandler(records)
+    root = logging.getLogger()
+    root.handlers = [handler]
+    root.setLevel(level)
+    # Sampled request records replace the development server's access log line per request
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    writer.start()
+    return handler, writer
+
+
+def parse_sample_rates(spec):
+    """Sample rates from a "key=rate,key=rate" string, e.g. "*=0.01,5xx=1,/forecast 404=0.1"."""
+    rates = {}
+    for item in filter(None, (item.strip() for item in spec.split(","))):
+        key, _, rate = item.rpartition("=")
+        rates[key.strip()] = float(rate)
+    return rates
+
+
+class Trace(object):
+    """Trace ID, phase timings and tags of one request."""
+
+    def __init__(self, trace_id):
+        self.trace_id = trace_id
+        self.start = self._last = time.perf_counter()
+        self.phases = {}
+        self.tags = {}
+
+    def phase(self, name):
+        """Record the time since the previous phase, or since the request started, as phase `name`."""
+        now = time.perf_counter()
+        self.phases[name] = round((now - self._last) * 1000, 3)
+        self._last = now
+
+    def tag(self, **tags):
+        self.tags.update(tags)
+
+
+class _NoTrace(object):
+    trace_id = None
+
+    def phase(self, name):
+        pass
+
+    def tag(self, **tags):
+        pass
+
+
+_NO_TRACE = _NoTrace()
+
+
+def current_trace():
+    """Trace of the current request, or one that records nothing when the app has no `RequestTracer`."""
+    return g.get("trace", _NO_TRACE)
+
+
+class RequestTracer(object):
+    """Sampled, structured request log with trace IDs and phase timings.
+
+    Every request gets a trace ID, from its `X-Request-ID` header or a new one, which is returned in the same response
+    header. Handlers add phase timings and tags to `current_trace()`. When the response is ready, the request is
+    logged with the rate of the first `sample_rates` key found among "<route> <status>", "<route> <status class>",
+    "<route>", "<status>", "<status class>" and "*", e.g. "/forecast 404", "/forecast 4xx" or "5xx". The record is a
+    dict that the writer thread of `configure_logging` turns into a JSON line.
+    """
+
+    def __init__(self, app=None, sample_rates=None, logger_name="requests"):
+        self.sample_rates = dict(DEFAULT_SAMPLE_RATES if sample_rates is None else sample_rates)
+        self.logger = logging.getLogger(logger_name)
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.before_request(self._start)
+        app.after_request(self._finish)
+
+    def sample_rate(self, route, status):
+        status_class = f"{status // 100}xx"
+        for key in (f"{route} {status}", f"{route} {status_class}", route, str(status), status_class):
+            rate = self.sample_rates.get(key)
+            if rate is not None:
+                return rate
+        return self.sample_rates.get("*", 0.0)
+
+    def _start(self):
+        trace_id = request.headers.get(TRACE_HEADER)
+        if not trace_id or len(trace_id) > 64 or not trace_id.isprintable():
+            trace_id = uuid.uuid4().hex
+        g.trace = Trace(trace_id)
+
+    def _finish(self, response):
+        trace = g.get("trace")
+        if trace is None:
+            return response
+        response.headers[TRACE_HEADER] = trace.trace_id
+        route = request.url_rule.rule if request.url_rule is not None else "<unmatched>"
+        rate = self.sample_rate(route, response.status_code)
+        if rate >= 1.0 or random.random() < rate:
+            self.logger.info({"trace_id": trace.trace_id,
+                              "method": request.method,
+                              "route": route,
+                              "status": response.status_code,
+                              "duration_ms": round((time.perf_counter() - trace.start) * 1000, 3),
+                              "phases": trace.phases,
+                              "sample_rate": rate,
+                              **trace.tags})
+        return response
@@ -0,0 +1,160 @@
+import collections
+import functools
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+
+from resources.forecasting import SeasonalAR, forecast_from
+
+# Models of the challengers, built once in every worker process
+_challengers = {}
+
+
+def _init_worker(challengers, niceness, cpus):
+    if niceness is None and hasattr(os, "SCHED_IDLE"):
+        # Linux only runs idle-class processes when no other process wants the CPU
+        os.sched_setscheduler(0, os.SCHED_IDLE, os.sched_param(0))
+    else:
+        os.nice(niceness or 19)
+    if cpus and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cpus)
+    _challengers.update({name: SeasonalAR(**params) for name, params in challengers.items()})
+
+
+def _ready():
+    return os.getpid()
+
+
+def _score(history, end_date, start_date, steps):
+    results = {}
+    for name, model in _challengers.items():
+        start = time.perf_counter()
+        _, values = forecast_from(history, end_date, start_date, steps, model)
+        results[name] = (values[0], time.perf_counter() - start)
+    return results
+
+
+def _percentiles(values):
+    if not values:
+        return None
+    p50, p99 = np.percentile(np.fromiter(values, dtype=np.float64), [50, 99])
+    return {"p50": round(p50 * 1000, 3), "p99": round(p99 * 1000, 3)}
+
+
+class ShadowStats(object):
+    """Divergence from the production forecasts and latency of one challenger, over the last `window` requests.
+
+    Not thread-safe, `ShadowScorer` updates and copies it under its lock.
+    """
+
+    def __init__(self, window=2048):
+        self.requests = 0
+        self.total_abs_diff = 0.0
+        self.total_abs_primary = 0.0
+        self.abs_diffs = collections.deque(maxlen=window)
+        self.seconds = collections.deque(maxlen=window)
+
+    def add(self, primary, values, seconds):
+        abs_diff = np.abs(values - primary)
+        self.requests += 1
+        self.total_abs_diff += float(abs_diff.sum())
+        self.total_abs_primary += float(np.abs(primary).sum())
+        self.abs_diffs.append(float(abs_diff.mean()))
+        self.seconds.append(seconds)
+
+    def copy(self):
+        copy = ShadowStats(self.abs_diffs.maxlen)
+        copy.requests, copy.total_abs_diff, copy.total_abs_primary = \
+            self.requests, self.total_abs_diff, self.total_abs_primary
+        copy.abs_diffs.extend(self.abs_diffs)
+        copy.seconds.extend(self.seconds)
+        return copy
+
+    def summary(self):
+        return {"requests": self.requests,
+                # total absolute difference over total absolute production forecast, 0 for identical forecasts
+                "relative_diff": self.total_abs_diff / self.total_abs_primary if self.total_abs_primary else None,
+                "mean_abs_diff": float(np.mean(self.abs_diffs)) if self.abs_diffs else None,
+                "p99_abs_diff": float(np.percentile(self.abs_diffs, 99)) if self.abs_diffs else None,
+                "latency_ms": _percentiles(self.seconds)}
+
+
+class ShadowScorer(object):
+    """Scores challenger models on copies of live forecast requests, off the request path.
+
+    `challengers` maps a name to `SeasonalAR` parameters. Requests are scored by `workers` processes, pinned to the
+    `cpus` if given, so the challengers use their own CPU budget instead of competing with the requests for the GIL.
+    The workers run at `niceness`, or by default in the idle scheduling class on Linux, so on shared CPUs they only
+    get the time the service leaves unused. At most `max_pending` requests wait for a worker; beyond that they are
+    dropped.
+    The workers are forked when the scorer is created, which must happen before the app starts any thread.
+    """
+
+    def __init__(self, challengers, workers=1, max_pending=None, niceness=None, cpus=None, window=2048):
+        self.challengers = dict(challengers)
+        self.max_pending = max_pending or 2 * workers
+        self.logger = logging.getLogger(__name__)
+        self.submitted = self.dropped = self.failed = 0
+        self.stats = {name: ShadowStats(window) for name in self.challengers}
+        self._primary_seconds = collections.deque(maxlen=window)
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._executor = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("fork"),
+                                             initializer=_init_worker, initargs=(self.challengers, niceness, cpus))
+        # Fork every worker now, while the process has a single thread
+        self._executor.submit(_ready).result()
+
+    def submit(self, history, end_date, start_date, steps, primary, primary_seconds):
+        """Queue a request for the challengers, return False if it was dropped."""
+        with self._lock:
+            self._primary_seconds.append(primary_seconds)
+            if self._pending >= self.max_pending:
+                self.dropped += 1
+                return False
+            self._pending += 1
+            self.submitted += 1
+        try:
+            future = self._executor.submit(_score, history, end_date, start_date, steps)
+        except BrokenProcessPool:
+            # a worker died, the production path carries on without shadow scoring
+            with self._lock:
+                self._pending -= 1
+                self.failed += 1
+            return False
+        future.add_done_callback(functools.partial(self._collect, np.asarray(primary, dtype=np.float64)))
+        return True
+
+    def _collect(self, primary, future):
+        with self._lock:
+            self._pending -= 1
+        if future.cancelled():
+            return
+        try:
+            results = future.result()
+        except Exception:
+            with self._lock:
+                self.failed += 1
+            self.logger.exception("shadow scoring failed")
+            return
+        with self._lock:
+            for name, (values, seconds) in results.items():
+                self.stats[name].add(primary, values, seconds)
+
+    def summary(self):
+        # Copied under the lock, as the result callbacks update them from another thread
+        with self._lock:
+            counts = {"submitted": self.submitted, "dropped": self.dropped, "failed": self.failed,
+                      "pending": self._pending}
+            primary_seconds = list(self._primary_seconds)
+            stats = {name: stats.copy() for name, stats in self.stats.items()}
+        return dict(counts, primary_latency_ms=_percentiles(primary_seconds),
+                    challengers={name: stats.summary() for name, stats in stats.items()})
+
+    def close(self):
+        self._executor.shutdown(cancel_futures=True)
@@ -0,0 +1,21 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from resources.feature_store import FeatureStore
+
+END_DATE = np.datetime64("2024-02-25")
+
+
+@pytest.fixture
+def feature_store(tmp_path):
+    """Feature store of 3 stores with 56 days of weekly seasonal sales, ending on END_DATE."""
+    days = pd.date_range(end=str(END_DATE), periods=56)
+    rng = np.random.default_rng(0)
+    frames = [pd.DataFrame({"store_number": store, "date": days,
+                            "sales": 100 + 10 * store + 5 * np.sin(np.arange(56) * 2 * np.pi / 7)
+                            + rng.normal(0, 1, 56)})
+              for store in range(3)]
+    (tmp_path / "features").mkdir()
+    pd.concat(frames).to_parquet(tmp_path / "features" / "000.parquet")
+    return FeatureStore(str(tmp_path / "features"), refresh_seconds=3600)
@@ -0,0 +1,38 @@
+import numpy as np
+import pandas as pd
+
+from resources.feature_store import merge_rows
+
+FEATURES = ["sales"]
+
+
+def rows(store_numbers, dates, sales):
+    return pd.DataFrame({"store_number": store_numbers, "date": pd.to_datetime(dates), "sales": sales})
+
+
+def load(max_history=4):
+    first = rows([0] * 4, ["2024-01-01", "2024-01-02", "2024-01-03", "2024-01-04"], [1.0, 2.0, 3.0, 4.0])
+    return merge_rows(None, first, FEATURES, max_history, 2**20)
+
+
+def test_refresh_moving_the_end_date_forward_keeps_the_history_on_its_dates():
+    snapshot = merge_rows(load(), rows([0], ["2024-01-06"], [6.0]), FEATURES, 4, 2**20)
+    assert snapshot.end_date == np.datetime64("2024-01-06")
+    np.testing.assert_array_equal(snapshot.lookup(0)[:, 0], [3.0, 4.0, np.nan, 6.0])
+
+
+def test_refresh_of_a_new_store_on_the_same_end_date():
+    snapshot = merge_rows(load(), rows([1], ["2024-01-03"], [30.0]), FEATURES, 4, 2**20)
+    assert snapshot.end_date == np.datetime64("2024-01-04")
+    np.testing.assert_array_equal(snapshot.lookup(0)[:, 0], [1.0, 2.0, 3.0, 4.0])
+    np.testing.assert_array_equal(snapshot.lookup(1)[:, 0], [np.nan, np.nan, 30.0, np.nan])
+
+
+def test_refresh_past_the_whole_window_drops_the_old_history():
+    snapshot = merge_rows(load(), rows([0], ["2024-01-10"], [10.0]), FEATURES, 4, 2**20)
+    np.testing.assert_array_equal(snapshot.lookup(0)[:, 0], [np.nan, np.nan, np.nan, 10.0])
+
+
+def test_refresh_keeps_a_longer_window_than_the_old_history():
+    snapshot = merge_rows(load(max_history=4), rows([0], ["2024-01-05"], [5.0]), FEATURES, 6, 2**20)
+    np.testing.assert_array_equal(snapshot.lookup(0)[:, 0], [np.nan, 1.0, 2.0, 3.0, 4.0, 5.0])
@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+from flask import Flask
+from flask_restful import Api
+
+from resources.forecast import ForecastHandler, Forecaster
+from resources.forecasting import forecast_from
+
+
+@pytest.fixture
+def client(feature_store):
+    app = Flask(__name__)
+    api = Api(app)
+    forecaster = Forecaster({"max_steps": 30})
+    api.add_resource(ForecastHandler, "/forecast",
+                     resource_class_kwargs={"forecaster": forecaster, "feature_store": feature_store})
+    return app.test_client()
+
+
+def test_forecast_from_rejects_a_start_date_too_far_after_the_history():
+    history = np.arange(28, dtype=np.float64)
+    dates, _ = forecast_from(history, "2024-01-28", "2024-02-27", 3, max_offset=30)
+    assert dates[0] == np.datetime64("2024-02-27")
+    with pytest.raises(ValueError, match="more than 30 days after the history"):
+        forecast_from(history, "2024-01-28", "2024-02-28", 3, max_offset=30)
+
+
+def test_forecast_handler(client):
+    response = client.post("/forecast", json={"store_number": 1, "steps": 7})
+    assert response.status_code == 200
+    assert response.get_json()["dates"][0] == "2024-02-26"
+    assert len(response.get_json()["result"]) == 7
+
+
+def test_forecast_handler_rejects_a_start_date_too_far_after_the_history(client):
+    response = client.post("/forecast", json={"store_number": 1, "forecast_start_date": "9999-01-01"})
+    assert response.status_code == 400
+    assert "more than 30 days after the history" in response.get_json()["message"]
+
+
+def test_forecast_handler_rejects_missing_or_out_of_range_steps(client):
+    for steps in (None, 0, 31):
+        response = client.post("/forecast", json={"store_number": 1, "steps": steps})
+        assert response.status_code == 400, steps
+        assert response.get_json()["message"] == "steps must be between 1 and 30"
+    response = client.post("/forecast", json={"store_number": 1, "steps": "ten"})
+    assert response.status_code == 400
@@ -0,0 +1,124 @@
+import os
+import struct
+import threading
+
+import numpy as np
+import pytest
+
+from resources.forecast_table import HEADER_BYTES, MAGIC, ForecastTable, ForecastTableReader, write_table
+
+SLOTS = np.array([1, -1, 0, -1, 2])
+VALUES = np.arange(3 * 28, dtype=np.float32).reshape(3, 28) / 7
+
+
+def publish(path, values=VALUES, start_date="2024-02-26"):
+    write_table(str(path), "sales", start_date, "2024-02-25", SLOTS, values)
+
+
+def publish_garbage(path):
+    # Renamed over the table like a published one, truncating the mapped file would change the current table
+    (path.parent / "garbage").write_bytes(b"garbage")
+    os.replace(path.parent / "garbage", path)
+
+
+def wait_for(condition):
+    for _ in range(500):
+        if condition():
+            return
+        threading.Event().wait(0.01)
+    raise AssertionError("the condition was not met in time")
+
+
+def test_table_round_trip_and_layout(tmp_path):
+    path = tmp_path / "forecast_table.bin"
+    publish(path)
+    table = ForecastTable(str(path))
+
+    assert (table.target, table.horizon) == ("sales", 28)
+    assert table.start_date == np.datetime64("2024-02-26") and table.history_end_date == np.datetime64("2024-02-25")
+    assert table.end_date == np.datetime64("2024-03-24")
+    np.testing.assert_array_equal(table.slots, SLOTS)
+    np.testing.assert_array_equal(table.values, VALUES)
+    # The values start at the first multiple of 64 bytes after the slots, and end the file
+    raw = path.read_bytes()
+    assert raw[:len(MAGIC)] == MAGIC
+    assert struct.unpack_from("<IIqq", raw, len(MAGIC)) == (1, 28, len(SLOTS), len(VALUES))
+    assert len(raw) == 192 + VALUES.nbytes
+    np.testing.assert_array_equal(np.frombuffer(raw, "<i4", len(SLOTS), HEADER_BYTES), SLOTS)
+    np.testing.assert_array_equal(np.frombuffer(raw, "<f4", offset=192).reshape(VALUES.shape), VALUES)
+    assert [name for name in os.listdir(tmp_path)] == ["forecast_table.bin"]
+
+
+def test_lookup_hits_and_misses(tmp_path):
+    publish(tmp_path / "forecast_table.bin")
+    table = ForecastTable(str(tmp_path / "forecast_table.bin"))
+
+    dates, values = table.lookup(2, "2024-03-01", steps=3)
+    assert dates == ["2024-03-01", "2024-03-02", "2024-03-03"]
+    np.testing.assert_array_equal(values, VALUES[0, 4:7])
+    dates, values = table.lookup(4, steps=28)
+    assert dates[0] == "2024-02-26" and dates[-1] == "2024-03-24"
+    np.testing.assert_array_equal(values, VALUES[2])
+    assert table.lookup(1) is None  # store without forecasts
+    assert table.lookup(5) is None and table.lookup(-1) is None
+    assert table.lookup(0, "2024-02-25") is None  # before the first day
+    assert table.lookup(0, "2024-03-20", steps=10) is None  # past the horizon
+
+
+def test_invalid_tables_are_rejected(tmp_path):
+    path = tmp_path / "forecast_table.bin"
+    publish(path)
+    raw = path.read_bytes()
+
+    path.write_bytes(b"NOTATABLE" + raw[9:])
+    with pytest.raises(ValueError, match="not a forecast table"):
+        ForecastTable(str(path))
+    path.write_bytes(raw[:len(MAGIC)] + struct.pack("<I", 2) + raw[len(MAGIC) + 4:])
+    with pytest.raises(ValueError, match="version 2"):
+        ForecastTable(str(path))
+    path.write_bytes(raw[:-4])
+    with pytest.raises(ValueError, match="expected"):
+        ForecastTable(str(path))
+    with pytest.raises(ValueError, match="covering every slot"):
+        publish(path, values=VALUES[:2])
+    with pytest.raises(ValueError, match="32 bytes"):
+        write_table(str(path), "s" * 33, "2024-02-26", "2024-02-25", SLOTS, VALUES)
+
+
+def test_reader_swaps_in_a_new_table_of_the_same_size(tmp_path):
+    path = tmp_path / "forecast_table.bin"
+    reader = ForecastTableReader(str(path))
+    assert reader.table is None and not reader.refresh()
+
+    publish(path)
+    assert reader.refresh()
+    previous = reader.table
+    assert not reader.refresh()
+    # Same size and possibly the same mtime, told apart by the inode of the new file
+    publish(path, values=VALUES + 1)
+    assert reader.refresh()
+    np.testing.assert_array_equal(reader.table.values, VALUES + 1)
+    # A request holding the previous table keeps a valid mapping
+    np.testing.assert_array_equal(previous.values, VALUES)
+
+    publish_garbage(path)
+    with pytest.raises(ValueError):
+        reader.refresh()
+    np.testing.assert_array_equal(reader.table.values, VALUES + 1)
+
+
+def test_background_refresh_picks_up_published_tables(tmp_path):
+    path = tmp_path / "forecast_table.bin"
+    publish(path)
+    reader = ForecastTableReader(str(path), refresh_seconds=0.01).start()
+    try:
+        publish_garbage(path)
+        wait_for(lambda: reader._seen[2] == len(b"garbage"))
+        np.testing.assert_array_equal(reader.table.values, VALUES)
+        publish(path, values=VALUES * 2)
+        wait_for(lambda: reader.table.values[0, 1] == VALUES[0, 1] * 2)
+        publish(path, start_date="2024-02-27")
+        wait_for(lambda: reader.table.start_date == np.datetime64("2024-02-27"))
+    finally:
+        reader.stop()
+    assert reader._thread is None
@@ -0,0 +1,144 @@
+import socket
+import struct
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+import pytest
+
+from resources.forecast import Forecaster
+from resources.local_transport import (DEFAULT_START, RING_HEADER, TAIL_OFFSET, LocalForecastClient,
+                                       LocalForecastServer, _Ring)
+
+
+@pytest.fixture
+def server(tmp_path, feature_store):
+    server = LocalForecastServer(str(tmp_path / "forecast.sock"), Forecaster({"max_steps": 30}), feature_store).start()
+    yield server
+    server.stop()
+
+
+def test_a_start_date_too_far_after_the_history_gets_an_error_frame(server):
+    with LocalForecastClient(server.path) as client:
+        with pytest.raises(ValueError, match="more than 30 days after the history"):
+            client.forecast([0, 1], start_date="9999-01-01", steps=5)
+        # the connection carries on after an error
+        dates, values = client.forecast([0, 1], steps=5)
+    assert dates[0] == np.datetime64("2024-02-26")
+    assert values.shape == (2, 5) and not np.isnan(values).any()
+
+
+class Echo(object):
+    """Forecaster stub whose values encode the store number and the day."""
+
+    max_steps = 30
+
+    def forecast_batch(self, store_numbers, snapshot=None, start_date=None, steps=10):
+        start_date = np.datetime64("2024-02-26") if start_date is None else np.datetime64(start_date, "D")
+        values = np.asarray(store_numbers, dtype=np.float32)[:, None] * 100 + np.arange(steps, dtype=np.float32)
+        return start_date, values
+
+
+def ring_tail(client):
+    return struct.unpack_from("<Q", client.shm.buf, TAIL_OFFSET)[0]
+
+
+def test_values_round_trip_inline_and_through_the_ring(tmp_path, server):
+    direct = server.forecaster.forecast_batch([2, 7, 0], server.feature_store.snapshot, None, 5)[1]
+    with LocalForecastClient(server.path) as client:
+        dates, values = client.forecast([2, 7, 0], steps=5)
+        assert ring_tail(client) == 0
+    # the unknown store 7 is a NaN row
+    np.testing.assert_array_equal(values, direct)
+    assert np.isnan(values[1]).all() and not np.isnan(values[[0, 2]]).any()
+
+    ring_server = LocalForecastServer(str(tmp_path / "ring.sock"), server.forecaster, server.feature_store,
+                                      inline_bytes=0).start()
+    try:
+        with LocalForecastClient(ring_server.path) as client:
+            dates, values = client.forecast([2, 7, 0], steps=5)
+            assert ring_tail(client) == values.nbytes
+    finally:
+        ring_server.stop()
+    np.testing.assert_array_equal(values, direct)
+    assert dates.tolist() == (np.datetime64("2024-02-26") + np.arange(5)).tolist()
+
+
+def test_ring_results_wrap_around_and_fall_back_to_the_socket(tmp_path):
+    server = LocalForecastServer(str(tmp_path / "forecast.sock"), Echo(), ring_bytes=1000, inline_bytes=0).start()
+    try:
+        with LocalForecastClient(server.path) as client:
+            assert client.ring_bytes == 1000
+            # 240-byte results: four fit, the fifth skips the last 40 bytes and starts over at offset 0
+            for request in range(6):
+                stores = np.arange(request, request + 12)
+                dates, values = client.forecast(stores, start_date="2024-03-01", steps=5)
+                np.testing.assert_array_equal(values, stores[:, None] * 100 + np.arange(5))
+                assert ring_tail(client) == 240 * (request + 1) + (40 if request >= 4 else 0)
+            assert dates[0] == np.datetime64("2024-03-01")
+            # larger than the whole ring, sent on the socket and nothing to release
+            dates, values = client.forecast(np.arange(300), steps=1)
+            np.testing.assert_array_equal(values[:, 0], np.arange(300) * 100)
+            assert ring_tail(client) == 240 * 6 + 40
+    finally:
+        server.stop()
+
+
+def test_ring_refuses_results_until_the_consumer_releases_room():
+    shm = SharedMemory(create=True, size=RING_HEADER + 100)
+    try:
+        shm.buf[:RING_HEADER] = bytes(RING_HEADER)
+        ring = _Ring(shm, 100)
+        assert ring.write(np.ones(10, dtype="<f4")) == (0, 40)
+        assert ring.write(np.full(10, 2, dtype="<f4")) == (40, 80)
+        # 20 bytes left at the end and none released at the start
+        assert ring.write(np.full(10, 3, dtype="<f4")) is None
+        struct.pack_into("<Q", shm.buf, TAIL_OFFSET, 40)
+        assert ring.write(np.full(10, 3, dtype="<f4")) == (0, 140)
+        np.testing.assert_array_equal(np.frombuffer(shm.buf, "<f4", 10, RING_HEADER), np.full(10, 3))
+        np.testing.assert_array_equal(np.frombuffer(shm.buf, "<f4", 10, RING_HEADER + 40), np.full(10, 2))
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+def test_raw_frames(tmp_path):
+    server = LocalForecastServer(str(tmp_path / "forecast.sock"), Echo(), ring_bytes=4096, max_stores=4).start()
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(server.path)
+        magic, version, ring_bytes, name_length = struct.unpack("<4sHQH", recv(sock, 16))
+        assert (magic, version, ring_bytes) == (b"FCST", 1, 4096)
+        assert recv(sock, name_length).decode().lstrip("/")
+
+        # a request split across writes is read whole
+        request = struct.pack("<HiI", 3, int(np.datetime64("2024-03-01").astype(np.int64)), 2)
+        sock.sendall(request[:5])
+        sock.sendall(request[5:] + np.array([1, 2], dtype="<i4").tobytes()[:3])
+        sock.sendall(np.array([1, 2], dtype="<i4").tobytes()[3:])
+        response = recv(sock, 32 + 24)
+        assert struct.unpack_from("<BBHiIIQQ", response) == (0, 0, 3, 19783, 2, 24, 0, 0)
+        np.testing.assert_array_equal(np.frombuffer(response, "<f4", offset=32), [100, 101, 102, 200, 201, 202])
+
+        sock.sendall(struct.pack("<HiI", 0, DEFAULT_START, 1) + np.array([1], dtype="<i4").tobytes())
+        response = recv(sock, 32)
+        status, _, _, _, _, length, _, _ = struct.unpack("<BBHiIIQQ", response)
+        assert status == 1 and recv(sock, length) == b"steps must be between 1 and 30"
+
+        # too many stores to read, answered with an error and the connection is closed
+        sock.sendall(struct.pack("<HiI", 1, DEFAULT_START, 5))
+        response = recv(sock, 32)
+        length = struct.unpack("<BBHiIIQQ", response)[5]
+        assert recv(sock, length) == b"at most 4 stores per request"
+        assert sock.recv(1) == b""
+    finally:
+        sock.close()
+        server.stop()
+
+
+def recv(sock, size):
+    data = b""
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        assert chunk, "the server closed the connection"
+        data += chunk
+    return data
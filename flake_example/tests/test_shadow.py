@@ -0,0 +1,46 @@
+import os
+import subprocess
+import sys
+import threading
+
+import numpy as np
+
+from resources.shadow import ShadowScorer
+
+HISTORY = 100 + 5 * np.sin(np.arange(56) * 2 * np.pi / 7)
+
+
+def wait_idle(scorer):
+    for _ in range(500):
+        if not scorer.summary()["pending"]:
+            return
+        threading.Event().wait(0.01)
+    raise AssertionError("the shadow workers did not finish")
+
+
+def test_summary_while_results_come_in():
+    scorer = ShadowScorer({"ar1": {"lags": 1}}, max_pending=64)
+    try:
+        for _ in range(20):
+            scorer.submit(HISTORY, "2024-02-25", None, 7, np.full(7, 100.0), 0.001)
+            summary = scorer.summary()
+        # a history shorter than the lags cannot be forecast from a start date inside it
+        scorer.submit(HISTORY, "2024-02-25", "2024-01-02", 7, np.full(7, 100.0), 0.001)
+        wait_idle(scorer)
+        summary = scorer.summary()
+    finally:
+        scorer.close()
+    assert summary["submitted"] == 21 and summary["dropped"] == 0 and summary["failed"] == 1
+    assert summary["challengers"]["ar1"]["requests"] == 20
+    assert summary["challengers"]["ar1"]["latency_ms"]["p99"] > 0
+
+
+def test_importing_the_app_starts_nothing(tmp_path):
+    socket_path = tmp_path / "forecast.sock"
+    env = dict(os.environ, FORECAST_SOCKET=str(socket_path), SHADOW_CHALLENGERS='{"ar1": {"lags": 1}}')
+    code = ("import app, multiprocessing, threading; "
+            "print(threading.active_count(), len(multiprocessing.active_children()))")
+    result = subprocess.run([sys.executable, "-c", code], cwd=os.path.dirname(os.path.dirname(__file__)), env=env,
+                            capture_output=True, text=True, check=True)
+    assert result.stdout.split() == ["1", "0"]
+    assert not socket_path.exists()